@@ -1,17 +1,31 @@
+import logging
 import os
-from tkinter import Toplevel, Listbox, Button, messagebox, filedialog, ttk, Canvas, Frame, Label
+import queue
+from datetime import datetime
+from tkinter import Toplevel, Button, messagebox, filedialog, ttk, Canvas, Frame, Label, BooleanVar
 from ttkthemes import ThemedTk
-import pandas as pd
-import pdfplumber
-from PIL import Image, ImageTk
-import fitz  # Importando a biblioteca PyMuPDF para manipulação de PDFs
-import shutil
+from PIL import ImageTk
 import threading
+from page_deletion import DeletionQueue
+from page_renderer import PageRenderer, RenderKey
+from results_store import ResultsStore
+from virtual_list import VirtualList
+
+logger = logging.getLogger(__name__)
+
+# Páginas vizinhas da lista de pendentes pré-carregadas a cada seleção
+PREFETCH_AHEAD = 2
+PREFETCH_BEHIND = 1
+# Intervalo de verificação das páginas renderizadas em segundo plano (ms)
+RENDER_POLL_MS = 30
+# Tamanho usado enquanto o canvas ainda não foi desenhado
+DEFAULT_CANVAS_SIZE = (800, 1000)
+# Cor das entradas marcadas para exclusão
+MARKED_COLOR = "#f8d7da"
 
 
 class AnalysisScreen:
     def __init__(self, master, analysis_report_path):
-        print("Inicializando AnalysisScreen...")
         self.window = Toplevel(master)
         self.window.title("Análises Pendentes")
         self.window.state('zoomed')
@@ -24,7 +38,7 @@ class AnalysisScreen:
 
         self.analysis_report_path = analysis_report_path
         self.selected_directory = os.path.dirname(analysis_report_path)
-        print(f"Caminho do relatório de análise: {self.analysis_report_path}")
+        logger.debug("Caminho do relatório de análise: %s", self.analysis_report_path)
 
         self.header_frame = ttk.Frame(self.window, style="TFrame")
         self.header_frame.pack(pady=10, padx=20, fill='x')
@@ -34,13 +48,15 @@ class AnalysisScreen:
                                       style="Header.TLabel")
         self.report_label.pack(side='left', padx=5)
 
-        self.date_label = ttk.Label(self.header_frame, text=f"Data: {pd.to_datetime('today').strftime('%d/%m/%Y')}",
+        self.date_label = ttk.Label(self.header_frame, text=f"Data: {datetime.now().strftime('%d/%m/%Y')}",
                                     style="Header.TLabel")
         self.date_label.pack(side='right', padx=5)
 
-        self.pending_files_listbox = Listbox(self.window, width=90, height=25)
-        self.pending_files_listbox.bind('<<ListboxSelect>>', self.on_pdf_select)
-        self.pending_files_listbox.pack(pady=20, padx=10, side='left', fill='y')
+        # Só as linhas visíveis da lista são criadas; as demais são consultadas no store ao rolar
+        self.store = None
+        self.pending_list = VirtualList(self.window, self.fetch_rows, on_select=self.on_pdf_select,
+                                        width=90, height=25)
+        self.pending_list.pack(pady=20, padx=10, side='left', fill='y')
 
         self.pdf_view_frame = ttk.Frame(self.window, padding="10", borderwidth=2, relief="ridge", style="TFrame")
         self.pdf_view_frame.pack(pady=10, padx=10, side='right', fill='both', expand=True)
@@ -48,12 +64,32 @@ class AnalysisScreen:
         self.pdf_canvas = Canvas(self.pdf_view_frame, bg="#2B3E50")
         self.pdf_canvas.pack(expand=True, fill='both')
         self.pdf_canvas.bind('<Configure>', self.center_image)
+        self.pdf_image = None
+        self.pdf_image_id = None
+
+        # Renderização em segundo plano, com cache das páginas e pré-carregamento das vizinhas
+        self.renderer = PageRenderer()
+        self.displayed_key = None
+        self.window.bind('<Destroy>', self.on_destroy)
 
-        # Botão de deletar dentro do pdf_view_frame
-        delete_button = Button(self.pdf_view_frame, text="Deletar Página Selecionada", command=self.delete_selected_pdf,
-                               bg="#f44336", fg="white", font=("Segoe UI", 10, "bold"), activebackground="#e53935",
-                               padx=10, pady=5)
-        delete_button.pack(side='bottom', pady=5)
+        # Páginas marcadas para exclusão: cada documento é regravado uma única vez ao aplicar
+        self.deletion_queue = DeletionQueue()
+        self.deletion_results = queue.Queue()
+        self.incremental_save_var = BooleanVar(value=False)
+
+        # Botões de exclusão dentro do pdf_view_frame
+        deletion_frame = ttk.Frame(self.pdf_view_frame, style="TFrame")
+        deletion_frame.pack(side='bottom', pady=5)
+        mark_button = Button(deletion_frame, text="Marcar/Desmarcar para Exclusão", command=self.toggle_marked,
+                             font=("Segoe UI", 10, "bold"), padx=10, pady=5)
+        mark_button.pack(side='left', padx=5)
+        self.delete_button = Button(deletion_frame, text="Deletar Páginas Marcadas (0)",
+                                    command=self.delete_marked_pages, bg="#f44336", fg="white",
+                                    font=("Segoe UI", 10, "bold"), activebackground="#e53935", padx=10, pady=5)
+        self.delete_button.pack(side='left', padx=5)
+        incremental_check = ttk.Checkbutton(deletion_frame, text="Salvamento incremental (mais rápido, arquivo maior)",
+                                            variable=self.incremental_save_var)
+        incremental_check.pack(side='left', padx=5)
 
         # Botão para abrir o diretório dos PDFs analisados
         open_button = Button(self.window, text="Abrir Diretório dos PDFs", command=self.open_pdf_directory)
@@ -63,144 +99,192 @@ class AnalysisScreen:
         self.loading_label = Label(self.window, text="", bg="#2B3E50", fg="white", font=("Segoe UI", 10, "bold"))
         self.loading_label.pack(pady=5)
 
-        print("Chamando load_pending_files...")
         self.load_pending_files()
+        self.poll_rendered_pages()
 
     def load_pending_files(self):
-        print("Carregando arquivos pendentes...")
         if not os.path.exists(self.analysis_report_path):
-            print(f"Erro: Arquivo de relatório não encontrado no caminho: {self.analysis_report_path}")
+            logger.error("Arquivo de relatório não encontrado no caminho: %s", self.analysis_report_path)
             messagebox.showerror("Erro", "Arquivo de relatório não encontrado!")
             return
 
         try:
-            df = pd.read_excel(self.analysis_report_path)
-            print(f"Relatório carregado com sucesso: {len(df)} registros encontrados.")
-            if 'Status' not in df.columns or 'Arquivo PDF' not in df.columns:
-                raise ValueError("Formato do relatório inválido: colunas necessárias não encontradas.")
-            pending_pages = df[df['Status'] != 'OK'][['Arquivo PDF', 'Página']].drop_duplicates()
-            for _, row in pending_pages.iterrows():
-                pdf_name = row['Arquivo PDF']
-                page_number = row['Página']
-                entry = f"{pdf_name} - Página {page_number}"
-                self.pending_files_listbox.insert('end', entry)
-            print(f"Páginas pendentes encontradas: {len(pending_pages)}")
+            # O SQLite indexado gerado ao lado da planilha evita ler o relatório inteiro
+            store_path = os.path.splitext(self.analysis_report_path)[0] + ".sqlite3"
+            if os.path.exists(store_path):
+                self.store = ResultsStore(store_path)
+            else:
+                self.store = ResultsStore.from_pending(self.read_pending_from_xlsx())
+            self.pending_list.set_total(self.store.pending_count())
+            logger.info("Páginas pendentes encontradas: %d", self.pending_list.total)
         except Exception as e:
-            print(f"Erro ao carregar o relatório: {str(e)}")
+            logger.error("Erro ao carregar o relatório: %s", e)
             messagebox.showerror("Erro", f"Erro ao carregar o relatório: {str(e)}")
 
-    def on_pdf_select(self, event):
-        print("Item selecionado na Listbox...")
-        selected_index = self.pending_files_listbox.curselection()
-        if not selected_index:
-            print("Nenhum item selecionado.")
+    def read_pending_from_xlsx(self):
+        # Relatórios sem o arquivo SQLite (gerados por versões anteriores): lê a planilha inteira
+        import pandas as pd
+        df = pd.read_excel(self.analysis_report_path)
+        logger.debug("Relatório carregado com sucesso: %d registros encontrados.", len(df))
+        if 'Status' not in df.columns or 'Arquivo PDF' not in df.columns:
+            raise ValueError("Formato do relatório inválido: colunas necessárias não encontradas.")
+        pending_pages = df[df['Status'] != 'OK'][['Arquivo PDF', 'Página']].drop_duplicates()
+        return list(pending_pages.itertuples(index=False, name=None))
+
+    def pending_pages(self, offset, limit):
+        # Páginas pendentes nas posições offset .. offset + limit - 1, como (caminho do PDF, índice da página)
+        return [(os.path.join(self.selected_directory, pdf_name), int(page_num) - 1)
+                for pdf_name, page_num in self.store.pending_rows(offset, limit)]
+
+    def fetch_rows(self, offset, limit):
+        # Linhas visíveis da lista: texto e destaque das páginas marcadas para exclusão
+        return [(f"{os.path.basename(pdf_path)} - Página {page_index + 1}",
+                 MARKED_COLOR if (pdf_path, page_index) in self.deletion_queue else "")
+                for pdf_path, page_index in self.pending_pages(offset, limit)]
+
+    def render_key(self, pdf_path, page_index):
+        # Chave de renderização da página, no tamanho atual do canvas
+        width, height = self.pdf_canvas.winfo_width(), self.pdf_canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            width, height = DEFAULT_CANVAS_SIZE
+        return RenderKey(pdf_path, page_index, width, height)
+
+    def on_pdf_select(self):
+        index = self.pending_list.active
+        if index is None:
             return
-        selected_entry = self.pending_files_listbox.get(selected_index)
-        print(f"Entrada selecionada: {selected_entry}")
-        pdf_name, page_info = selected_entry.split(' - Página ')
-        self.selected_pdf = os.path.join(self.selected_directory, pdf_name)
-        self.selected_page_index = int(page_info) - 1  # Ajuste para zero-based index
-        print(f"PDF selecionado: {self.selected_pdf}, Página: {self.selected_page_index + 1}")
-        if os.path.exists(self.selected_pdf):
-            try:
-                print(f"Renderizando página {self.selected_page_index + 1} do PDF {self.selected_pdf}...")
-                self.render_pdf_page(self.selected_pdf, self.selected_page_index + 1)
-            except Exception as e:
-                print(f"Erro ao abrir o PDF: {str(e)}")
-                messagebox.showerror("Erro", f"Não foi possível abrir o PDF: {str(e)}")
-        else:
-            print("Erro: Arquivo PDF não encontrado!")
+        # A página selecionada e as vizinhas, em uma única consulta
+        first = max(0, index - PREFETCH_BEHIND)
+        pages = self.pending_pages(first, index + PREFETCH_AHEAD + 1 - first)
+        key = self.render_key(*pages[index - first])
+        self.selected_pdf, self.selected_page_index = key.pdf_path, key.page_index
+        logger.debug("PDF selecionado: %s, página %d", self.selected_pdf, self.selected_page_index + 1)
+        if not os.path.exists(self.selected_pdf):
+            logger.error("Arquivo PDF não encontrado: %s", self.selected_pdf)
             messagebox.showerror("Erro", "Arquivo PDF não encontrado!")
+            return
+
+        # Pré-carrega as próximas entradas da lista e a anterior, para a navegação ser imediata
+        prefetch = [self.render_key(*page) for page in pages[index - first + 1:] + pages[:index - first][::-1]]
+
+        self.displayed_key = key
+        image = self.renderer.get(key)
+        if image is not None:
+            self.show_image(image)
+            self.renderer.request(None, prefetch)
+        else:
+            self.loading_label.config(text="Carregando página...")
+            self.renderer.request(key, prefetch)
+
+    def poll_rendered_pages(self):
+        # Exibe as páginas renderizadas em segundo plano; ignora as que não são mais a seleção atual
+        try:
+            while True:
+                key, result = self.renderer.results.get_nowait()
+                if key != self.displayed_key:
+                    continue
+                self.loading_label.config(text="")
+                if isinstance(result, Exception):
+                    logger.error("Erro ao renderizar a página do PDF: %s", result)
+                    messagebox.showerror("Erro", f"Erro ao renderizar a página do PDF: {str(result)}")
+                else:
+                    self.show_image(result)
+        except queue.Empty:
+            pass
+        self.window.after(RENDER_POLL_MS, self.poll_rendered_pages)
+
+    def on_destroy(self, event):
+        if event.widget is self.window:
+            self.renderer.close()
+            if self.store is not None:
+                self.store.close()
 
     def open_pdf_directory(self):
-        print(f"Abrindo diretório dos PDFs: {self.selected_directory}")
         # Abre o diretório onde estão os PDFs analisados
         if os.path.exists(self.selected_directory):
             os.startfile(self.selected_directory)  # Somente para Windows
         else:
-            print("Erro: Diretório dos PDFs não encontrado!")
+            logger.error("Diretório dos PDFs não encontrado: %s", self.selected_directory)
             messagebox.showerror("Erro", "Diretório dos PDFs não encontrado!")
 
-    def delete_selected_pdf(self):
-        print("Deletando página selecionada do PDF...")
-        selected_index = self.pending_files_listbox.curselection()
-        if not selected_index:
-            print("Nenhum PDF selecionado para exclusão.")
-            messagebox.showwarning("Aviso", "Nenhum PDF selecionado!")
+    def toggle_marked(self):
+        # Marca (ou desmarca) para exclusão as entradas selecionadas na lista
+        selected = self.pending_list.selection()
+        if not selected:
+            messagebox.showwarning("Aviso", "Nenhuma página selecionada!")
             return
+        for index in selected:
+            self.deletion_queue.toggle(*self.pending_pages(index, 1)[0])
+        self.pending_list.refresh()
+        self.delete_button.config(text=f"Deletar Páginas Marcadas ({len(self.deletion_queue)})")
 
-        # Confirma a exclusão da página
-        if messagebox.askyesno("Confirmação", f"Tem certeza de que deseja deletar a página {self.selected_page_index + 1} de {os.path.basename(self.selected_pdf)}?"):
-            self.loading_label.config(text="Deletando página, por favor aguarde...")
-            delete_thread = threading.Thread(target=self.perform_delete, args=(selected_index,))
+    def delete_marked_pages(self):
+        if not len(self.deletion_queue):
+            messagebox.showwarning("Aviso", "Nenhuma página marcada para exclusão!")
+            return
+
+        # Confirma a exclusão das páginas
+        if messagebox.askyesno("Confirmação",
+                               f"Tem certeza de que deseja deletar as {len(self.deletion_queue)} página(s) marcada(s)?"):
+            self.loading_label.config(text="Deletando páginas, por favor aguarde...")
+            self.delete_button.config(state='disabled')
+            delete_thread = threading.Thread(target=self.perform_delete, args=(self.incremental_save_var.get(),))
             delete_thread.start()
+            self.poll_deletion()
 
-    def perform_delete(self, selected_index):
+    def perform_delete(self, incremental):
+        # Executa fora da thread da interface; o resultado é aplicado na interface por poll_deletion
+        with self.renderer.paused():
+            self.deletion_results.put(self.deletion_queue.apply(incremental))
+
+    def poll_deletion(self):
         try:
-            print(f"Abrindo PDF {self.selected_pdf} para deletar a página {self.selected_page_index + 1}...")
-            # Abre o PDF e exclui a página
-            with fitz.open(self.selected_pdf) as pdf_document:
-                if pdf_document.page_count > 1:
-                    pdf_document.delete_page(self.selected_page_index)
-
-                    # Salva o novo arquivo sem a página deletada em um arquivo temporário
-                    temp_pdf_path = self.selected_pdf.replace('.pdf', '_temp.pdf')
-                    pdf_document.save(temp_pdf_path, garbage=4, deflate=True)
-                    print(f"Página deletada e arquivo temporário salvo em {temp_pdf_path}")
-
-                    # Substitui o arquivo original pelo temporário
-                    shutil.move(temp_pdf_path, self.selected_pdf)
-                    print(f"Arquivo original substituído pelo arquivo temporário {temp_pdf_path}")
-
-                    # Atualiza a interface
-                    print(f"Página {self.selected_page_index + 1} deletada com sucesso. Atualizando interface...")
-                    self.pending_files_listbox.delete(selected_index)
-                    self.pdf_canvas.delete("all")  # Limpa o Canvas após a exclusão
-                    messagebox.showinfo("Sucesso",
-                                        f"A página {self.selected_page_index + 1} de {os.path.basename(self.selected_pdf)} foi deletada com sucesso.")
-                else:
-                    print("Não é possível deletar a única página de um documento PDF.")
-                    messagebox.showwarning("Operação Inválida", "Não é possível deletar a única página de um documento PDF.")
-        except Exception as e:
-            print(f"Erro ao deletar a página do PDF: {str(e)}")
-            messagebox.showerror("Erro", f"Não foi possível deletar a página do PDF: {str(e)}")
-        finally:
-            self.loading_label.config(text="")
+            deleted, errors = self.deletion_results.get_nowait()
+        except queue.Empty:
+            self.window.after(RENDER_POLL_MS, self.poll_deletion)
+            return
+        self.loading_label.config(text="")
+        self.delete_button.config(state='normal', text=f"Deletar Páginas Marcadas ({len(self.deletion_queue)})")
+        for pdf_path in deleted:
+            self.renderer.invalidate(pdf_path)
+        self.remap_pending_entries(deleted)
+
+        # As páginas renderizadas dos documentos alterados não valem mais; esconde a imagem exibida
+        self.displayed_key = None
+        if self.pdf_image_id is not None:
+            self.pdf_canvas.itemconfig(self.pdf_image_id, state='hidden')
+
+        deleted_count = sum(len(pages) for pages in deleted.values())
+        message = f"{deleted_count} página(s) deletada(s) de {len(deleted)} documento(s)."
+        if errors:
+            details = "\n".join(f"{os.path.basename(pdf_path)}: {error}" for pdf_path, error in errors.items())
+            messagebox.showwarning("Exclusão Parcial", f"{message}\n\nNão foi possível alterar:\n{details}")
+        else:
+            messagebox.showinfo("Sucesso", message)
+
+    def remap_pending_entries(self, deleted):
+        """
+        Remove da lista as páginas excluídas e renumera as demais páginas dos documentos alterados.
+
+        Args:
+            deleted (dict): {caminho do PDF: índices excluídos, ordenados}, como retornado por DeletionQueue.apply
+        """
+        self.store.apply_deletions({os.path.basename(pdf_path): pages for pdf_path, pages in deleted.items()})
+        self.pending_list.clear_selection()
+        self.pending_list.set_total(self.store.pending_count())
 
     def center_image(self, event):
-        print("Centralizando imagem no Canvas...")
-        self.pdf_canvas.delete('all')
-        if hasattr(self, 'pdf_image'):
-            self.pdf_canvas.create_image(self.pdf_canvas.winfo_width() // 2, self.pdf_canvas.winfo_height() // 2,
-                                         anchor='center', image=self.pdf_image, tags='pdf_image')
-
-    def render_pdf_page(self, pdf_path, page_number):
-        print(f"Renderizando página {page_number} do PDF {pdf_path}...")
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                if page_number - 1 < len(pdf.pages):
-                    page = pdf.pages[page_number - 1]
-                    pil_image = page.to_image(resolution=100).original
-                    canvas_width = self.pdf_canvas.winfo_width()
-                    canvas_height = self.pdf_canvas.winfo_height()
-                    image_ratio = pil_image.width / pil_image.height
-                    canvas_ratio = canvas_width / canvas_height
-
-                    if image_ratio > canvas_ratio:
-                        new_width = canvas_width
-                        new_height = int(canvas_width / image_ratio)
-                    else:
-                        new_height = canvas_height
-                        new_width = int(canvas_height * image_ratio)
-
-                    pil_image = pil_image.resize((new_width, new_height), Image.LANCZOS)
-
-                    self.pdf_image = ImageTk.PhotoImage(pil_image)
-                    print("Imagem da página renderizada com sucesso.")
-                    self.center_image(None)
-                else:
-                    print(f"Erro: Número de página {page_number} está fora do intervalo.")
-                    messagebox.showerror("Erro", f"Número de página {page_number} está fora do intervalo.")
-        except Exception as e:
-            print(f"Erro ao renderizar a página do PDF: {str(e)}")
-            messagebox.showerror("Erro", f"Erro ao renderizar a página do PDF: {str(e)}")
+        # Só reposiciona a imagem já exibida; nada é redesenhado
+        if self.pdf_image_id is not None:
+            self.pdf_canvas.coords(self.pdf_image_id, self.pdf_canvas.winfo_width() // 2,
+                                   self.pdf_canvas.winfo_height() // 2)
+
+    def show_image(self, pil_image):
+        # A imagem já vem no tamanho do canvas; só é convertida para o Tk e centralizada
+        self.pdf_image = ImageTk.PhotoImage(pil_image)
+        if self.pdf_image_id is None:
+            self.pdf_image_id = self.pdf_canvas.create_image(0, 0, anchor='center', image=self.pdf_image,
+                                                             tags='pdf_image')
+        else:
+            self.pdf_canvas.itemconfig(self.pdf_image_id, image=self.pdf_image, state='normal')
+        self.center_image(None)
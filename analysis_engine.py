@@ -0,0 +1,280 @@
+import logging
+import os
+import sys
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import fitz
+from PIL import Image
+
+from dedup import DedupIndex
+from metrics import Metrics, Profiler
+from pdf_analyzer import PDFAnalyzer, PageVerdict, PREPROCESSING_VERSION
+from pipeline import threaded_stage
+from verdict_cache import VerdictCache
+
+# Tamanho máximo (em pixels) da miniatura enviada para a pré-visualização
+THUMBNAIL_SIZE = 400
+
+# Páginas renderizadas que podem aguardar a etapa de análise em cada worker; limita a memória
+# a algumas páginas em escala de cinza, qualquer que seja o tamanho do documento
+PIPELINE_DEPTH = 2
+
+# Intervalo de páginas [start, stop) de um documento, processado de uma só vez por um worker
+PageTask = namedtuple("PageTask", ["task_index", "file_index", "pdf_path", "start", "stop"])
+
+
+class PageResult(PageVerdict):
+    __slots__ = ("file_index", "pdf_name", "page_num", "thumbnail")
+
+    def __init__(self, file_index, pdf_name, page_num, verdict, thumbnail=None):
+        """
+        Resultado de uma página: o veredito (PageVerdict) identificado pelo arquivo e pelo número da
+        página (1-based), com a miniatura da pré-visualização (ou None).
+        """
+        for name in PageVerdict.__slots__:
+            setattr(self, name, getattr(verdict, name))
+        self.file_index = file_index
+        self.pdf_name = pdf_name
+        self.page_num = page_num
+        self.thumbnail = thumbnail
+
+
+# Analisador do processo atual (um por worker, criado no inicializador do pool)
+_worker_analyzer = None
+# Se o worker gera as miniaturas da pré-visualização
+_worker_thumbnails = True
+# Profiler do processo atual, no modo de profiling
+_worker_profiler = None
+
+
+def make_thumbnail(page, size=THUMBNAIL_SIZE):
+    """
+    Renderiza a página diretamente no tamanho da miniatura (até `size` pixels no maior lado).
+    """
+    scale = min(1.0, size / max(page.rect.width, page.rect.height))
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+
+def _init_worker(analyzer_kwargs, tesseract_cmd, cache_path, thumbnails=True, log_level=None, profile_dir=None,
+                 dedup=True):
+    """
+    Inicializa o processo worker com seu próprio PDFAnalyzer (e SpellChecker).
+    O caminho do Tesseract e o nível de log são repassados explicitamente porque, no Windows,
+    os processos são criados com 'spawn' e não herdam a configuração do processo principal.
+    Cada worker abre sua própria conexão com o cache de vereditos e com o índice de deduplicação, guardado
+    no mesmo arquivo (sem cache, o índice vale só para as páginas do próprio worker).
+    """
+    global _worker_analyzer, _worker_thumbnails, _worker_profiler
+    _worker_thumbnails = thumbnails
+    if log_level is not None:
+        logging.basicConfig(level=log_level)
+    _worker_profiler = Profiler(profile_dir) if profile_dir else None
+    if tesseract_cmd:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    verdict_cache = VerdictCache(cache_path) if cache_path else None
+    dedup_index = DedupIndex(cache_path) if dedup else None
+    _worker_analyzer = PDFAnalyzer(verdict_cache=verdict_cache, dedup_index=dedup_index, **analyzer_kwargs)
+
+
+def page_source(pdf_path, start, stop):
+    """
+    Gera (índice, fitz.Page) das páginas [start, stop) do PDF, com o documento aberto uma única vez
+    e fechado assim que o gerador termina ou é fechado.
+    """
+    with fitz.open(pdf_path) as pdf_document:
+        for page_num in range(start, stop):
+            yield page_num, pdf_document.load_page(page_num)
+
+
+def render_stage(pages, last_page):
+    """
+    Etapa de renderização (PDFAnalyzer.prepare_page) sobre as páginas de page_source.
+    Gera (índice, PreparedPage, miniatura ou None).
+    """
+    metrics = _worker_analyzer.metrics
+    for page_num, page in pages:
+        prepared = _worker_analyzer.prepare_page(page)
+
+        # Miniatura pequena para a pré-visualização (a imagem completa não atravessa processos).
+        # Os resultados de uma tarefa chegam juntos e a interface só exibe o quadro mais recente,
+        # então só a última página da tarefa ganha miniatura
+        thumbnail = None
+        if _worker_thumbnails and page_num == last_page:
+            with metrics.stage("thumbnail"):
+                thumbnail = make_thumbnail(page)
+        yield page_num, prepared, thumbnail
+
+
+def _analyze_task(task):
+    """
+    Analisa todas as páginas de um PageTask em duas etapas encadeadas por uma fila limitada: a renderização
+    (PyMuPDF, em uma thread própria) prepara as próximas páginas enquanto a análise (limiarização, OCR)
+    processa a atual.
+    Retorna:
+        lista de PageResult, métricas da tarefa (Metrics.snapshot) a somar no processo principal
+    """
+    pdf_name = os.path.basename(task.pdf_path)
+    metrics = _worker_analyzer.metrics
+    results = []
+    with _worker_profiler.active() if _worker_profiler else nullcontext():
+        pages = render_stage(page_source(task.pdf_path, task.start, task.stop), task.stop - 1)
+        # A renderização roda na thread da etapa, que precisa do seu próprio perfil (até o Python 3.11)
+        if _worker_profiler:
+            pages = _worker_profiler.profiled(pages)
+        prepared_pages = threaded_stage(pages, maxsize=PIPELINE_DEPTH)
+        for page_num, prepared, thumbnail in prepared_pages:
+            results.append(PageResult(task.file_index, pdf_name, page_num + 1, _worker_analyzer.finish_page(prepared),
+                                      thumbnail))
+    return results, metrics.snapshot(reset=True)
+
+
+class AnalysisEngine:
+    def __init__(self, num_workers=None, pages_per_task=8, analyzer_kwargs=None, cache_path=None, thumbnails=True,
+                 metrics=None, profile_dir=None, dedup=True):
+        """
+        Motor de execução que distribui as páginas dos PDFs entre vários processos.
+
+        Args:
+            num_workers (int): Número de processos workers. None usa todos os núcleos disponíveis;
+                1 executa no próprio processo, sem pool.
+            pages_per_task (int): Quantidade de páginas consecutivas de um documento enviadas a cada tarefa.
+            analyzer_kwargs (dict): Parâmetros repassados ao PDFAnalyzer de cada worker.
+            cache_path (str): Arquivo do cache persistente de vereditos. None desativa o cache.
+            thumbnails (bool): Gera a miniatura da última página de cada tarefa (PageResult.thumbnail; None nas
+                demais), para a pré-visualização; sem interface, é dispensada.
+            metrics (Metrics): Recebe as métricas de todos os workers. None cria um novo.
+            profile_dir (str): Ativa o modo de profiling: cada processo grava o seu cProfile nesse diretório.
+            dedup (bool): Reaproveita o OCR de páginas quase idênticas (ver dedup.DedupIndex).
+        """
+        self.num_workers = max(1, num_workers or os.cpu_count() or 1)
+        self.pages_per_task = max(1, pages_per_task)
+        self.analyzer_kwargs = analyzer_kwargs or {}
+        self.cache_path = cache_path
+        self.thumbnails = thumbnails
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.profile_dir = profile_dir
+        self.dedup = dedup
+        # Contagens de acertos e faltas do cache, atualizadas conforme os resultados são gerados
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Workers mantidos entre execuções (start/close), para análises curtas e frequentes
+        self._started = False
+        self._executor = None
+
+    def signature(self):
+        """
+        Identifica a configuração de análise (versão do pré-processamento e parâmetros do analisador).
+        """
+        return f"{PREPROCESSING_VERSION}|{sorted(self.analyzer_kwargs.items())}"
+
+    def plan(self, pdf_files, done_pages=None):
+        """
+        Divide os PDFs em intervalos de páginas.
+
+        Args:
+            pdf_files (list): PDFs a analisar.
+            done_pages (set): (file_index, page_num) já concluídas (retomada de um checkpoint), que
+                ficam de fora dos intervalos; page_num começa em 1, como em PageResult.
+        Retorna:
+            tasks (list[PageTask]), total_pages (int): páginas a analisar
+        """
+        done_pages = done_pages or set()
+        tasks = []
+        total_pages = 0
+        for file_index, pdf_file in enumerate(pdf_files):
+            with fitz.open(pdf_file) as pdf_document:
+                page_count = pdf_document.page_count
+            start = 0
+            while start < page_count:
+                if (file_index, start + 1) in done_pages:
+                    start += 1
+                    continue
+                # Intervalo de páginas pendentes consecutivas, de no máximo pages_per_task páginas
+                stop = start + 1
+                while stop < min(start + self.pages_per_task, page_count) and \
+                        (file_index, stop + 1) not in done_pages:
+                    stop += 1
+                tasks.append(PageTask(len(tasks), file_index, pdf_file, start, stop))
+                total_pages += stop - start
+                start = stop
+        return tasks, total_pages
+
+    def run(self, tasks):
+        """
+        Executa as tarefas e gera os PageResult na ordem (arquivo, página),
+        independentemente da ordem em que os workers terminam.
+        """
+        for result in self._run(tasks):
+            if result.cache == "hit":
+                self.cache_hits += 1
+            elif result.cache == "miss":
+                self.cache_misses += 1
+            yield result
+
+    def start(self):
+        """
+        Inicia os workers (o pool de processos, ou o analisador do próprio processo) uma única vez e os
+        mantém entre as chamadas de run até close, evitando o custo de iniciá-los a cada execução;
+        usado no modo de pasta monitorada.
+        """
+        if self._started:
+            return
+        if self.num_workers == 1:
+            _init_worker(*self._initargs())
+        else:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers, initializer=_init_worker,
+                                                 initargs=self._initargs())
+        self._started = True
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._started = False
+
+    def _initargs(self):
+        # Se o pytesseract ainda não foi importado, o caminho do Tesseract não foi configurado e o padrão vale
+        pytesseract_module = sys.modules.get("pytesseract.pytesseract")
+        tesseract_cmd = pytesseract_module.tesseract_cmd if pytesseract_module else None
+        log_level = logging.getLogger().getEffectiveLevel()
+        return (self.analyzer_kwargs, tesseract_cmd, self.cache_path, self.thumbnails, log_level,
+                self.profile_dir, self.dedup)
+
+    def _run(self, tasks):
+        if self.num_workers == 1:
+            if not self._started:
+                _init_worker(*self._initargs())
+            for task in tasks:
+                results, metrics = _analyze_task(task)
+                self.metrics.merge(metrics)
+                yield from results
+            return
+
+        if self._executor is not None:
+            yield from self._run_window(self._executor, tasks)
+            return
+        with ProcessPoolExecutor(max_workers=self.num_workers, initializer=_init_worker,
+                                 initargs=self._initargs()) as executor:
+            yield from self._run_window(executor, tasks)
+
+    def _run_window(self, executor, tasks):
+        # Mantém uma janela limitada de tarefas em andamento; os resultados são
+        # consumidos na ordem de submissão, o que já os entrega ordenados.
+        max_pending = self.num_workers * 2
+        pending = deque()
+        task_iter = iter(tasks)
+        for task in task_iter:
+            pending.append(executor.submit(_analyze_task, task))
+            if len(pending) >= max_pending:
+                break
+        while pending:
+            results, metrics = pending.popleft().result()
+            self.metrics.merge(metrics)
+            next_task = next(task_iter, None)
+            if next_task is not None:
+                pending.append(executor.submit(_analyze_task, next_task))
+            yield from results
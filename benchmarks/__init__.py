@@ -0,0 +1,5 @@
+"""
+Benchmarks do analisador. Executados a partir da raiz do repositório, por exemplo:
+
+    python -m benchmarks.startup
+"""
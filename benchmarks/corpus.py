@@ -0,0 +1,174 @@
+"""
+Gerador reprodutível de PDFs digitalizados sintéticos, com o veredito esperado de cada página.
+
+Cada página é desenhada com o PyMuPDF, rasterizada na resolução do "scanner", recebe os efeitos
+do tipo de página (ruído de papel, poeira, transparência do verso, carimbo) e é inserida como
+JPEG em um PDF, como faria um scanner. A mesma semente gera sempre o mesmo corpus.
+
+Uso:
+    python -m benchmarks.corpus DIRETÓRIO [--dpi 150 300] [--pages 4]
+"""
+import argparse
+import io
+import json
+import os
+
+import cv2
+import fitz
+import numpy as np
+from PIL import Image
+
+# Versão do gerador; muda sempre que o conteúdo gerado mudar, para invalidar corpora antigos
+CORPUS_VERSION = 1
+
+LABELS_NAME = "labels.json"
+
+# Veredito esperado: a página deve terminar com um dos BLANK_STATUSES ou não
+LABEL_BLANK = "blank"
+LABEL_CONTENT = "content"
+
+# Tipos de página e o veredito esperado de cada um
+PAGE_KINDS = {
+    "blank": LABEL_BLANK,
+    "scanner_noise": LABEL_BLANK,
+    "bleed_through": LABEL_BLANK,
+    "stamp": LABEL_BLANK,
+    "sparse_text": LABEL_CONTENT,
+    "dense_text": LABEL_CONTENT,
+}
+
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size("a4")
+
+WORDS = ("processo", "documento", "certidão", "registro", "contrato", "cláusula", "pagamento", "prazo",
+         "assinatura", "empresa", "cidade", "estado", "número", "data", "valor", "parte", "termo",
+         "acordo", "serviço", "responsável", "página", "anexo", "declaração", "conforme", "presente")
+
+
+def _lines(rng, count):
+    return [" ".join(rng.choice(WORDS, size=rng.integers(5, 8))).capitalize() for _ in range(count)]
+
+
+def _draw(dpi, draw):
+    """
+    Desenha uma página vetorial com `draw(page)` e a rasteriza em escala de cinza na resolução dada.
+    """
+    with fitz.open() as pdf_document:
+        page = pdf_document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        draw(page)
+        pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), colorspace=fitz.csGRAY, alpha=False)
+        return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width).copy()
+
+
+def _text_page(rng, dpi, line_count):
+    """
+    Página com `line_count` linhas de texto (até 50 cabem na área útil), a partir do topo.
+    """
+    lines = _lines(rng, line_count)
+
+    def write(page):
+        for index, line in enumerate(lines):
+            page.insert_text((72, 80 + index * 14), line, fontsize=11, fontname="helv")
+    return _draw(dpi, write)
+
+
+def _paper(rng, image, tone=242, noise=3.0):
+    """
+    Aplica o tom e o ruído do papel digitalizado sobre uma página (tinta escura, fundo branco).
+    """
+    paper = image.astype(np.float32) * (tone / 255.0) + rng.normal(0, noise, image.shape)
+    return np.clip(paper, 0, 255).astype(np.uint8)
+
+
+def render_kind(kind, rng, dpi):
+    """
+    Gera a imagem em escala de cinza de uma página do tipo `kind`.
+    """
+    height, width = int(PAGE_HEIGHT * dpi / 72), int(PAGE_WIDTH * dpi / 72)
+    if kind == "blank":
+        return np.full((height, width), 255, np.uint8)
+
+    if kind == "scanner_noise":
+        image = _paper(rng, np.full((height, width), 255, np.uint8), noise=6.0)
+        # Poeira: pontos escuros de um ou dois pixels espalhados pela página
+        for _ in range(150):
+            y, x = rng.integers(0, height - 2), rng.integers(0, width - 2)
+            size = rng.integers(1, 3)
+            image[y:y + size, x:x + size] = rng.integers(60, 140)
+        # Sombra da borda do scanner, dentro da margem descartada pelo recorte lateral
+        image[:, :int(width * 0.015)] = 40
+        return image
+
+    if kind == "bleed_through":
+        # Texto do verso espelhado, desfocado e muito claro
+        verso = cv2.GaussianBlur(_text_page(rng, dpi, 40)[:, ::-1], (0, 0), dpi / 100)
+        ink = 255.0 - verso.astype(np.float32)
+        return _paper(rng, np.clip(255.0 - ink * 0.12, 0, 255).astype(np.uint8))
+
+    if kind == "stamp":
+        def stamp(page):
+            rect = fitz.Rect(PAGE_WIDTH - 230, PAGE_HEIGHT - 150, PAGE_WIDTH - 90, PAGE_HEIGHT - 95)
+            page.draw_rect(rect, width=2)
+            page.insert_textbox(rect + (6, 8, -6, -4), "RECEBIDO\n12/03/2024", fontsize=12, fontname="hebo",
+                                align=fitz.TEXT_ALIGN_CENTER)
+        return _paper(rng, _draw(dpi, stamp))
+
+    if kind == "sparse_text":
+        return _paper(rng, _text_page(rng, dpi, 12))
+
+    if kind == "dense_text":
+        return _paper(rng, _text_page(rng, dpi, 48))
+
+    raise ValueError(f"Tipo de página desconhecido: {kind}")
+
+
+def generate_corpus(directory, dpis=(150, 300), pages=4, seed=0):
+    """
+    Gera um PDF por (tipo de página, DPI), com `pages` páginas cada, e o arquivo labels.json com
+    o veredito esperado de cada página. Se o corpus já existir com os mesmos parâmetros, é reaproveitado.
+    Retorna:
+        dict com os parâmetros e os rótulos: {"files": {nome do arquivo: [rótulo por página]}, ...}
+    """
+    labels_path = os.path.join(directory, LABELS_NAME)
+    parameters = {"version": CORPUS_VERSION, "dpis": list(dpis), "pages": pages, "seed": seed}
+    if os.path.exists(labels_path):
+        with open(labels_path, encoding="utf-8") as file:
+            labels = json.load(file)
+        if labels.get("parameters") == parameters:
+            return labels
+
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    files = {}
+    for dpi in dpis:
+        for kind, label in PAGE_KINDS.items():
+            name = f"{kind}_{dpi}dpi.pdf"
+            with fitz.open() as pdf_document:
+                for _ in range(pages):
+                    buffer = io.BytesIO()
+                    Image.fromarray(render_kind(kind, rng, dpi)).save(buffer, format="JPEG", quality=85,
+                                                                       dpi=(dpi, dpi))
+                    page = pdf_document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+                    page.insert_image(page.rect, stream=buffer.getvalue())
+                pdf_document.save(os.path.join(directory, name), garbage=3, deflate=True)
+            files[name] = [label] * pages
+
+    labels = {"parameters": parameters, "files": files}
+    with open(labels_path, "w", encoding="utf-8") as file:
+        json.dump(labels, file, indent=2)
+    return labels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera o corpus sintético de PDFs digitalizados.")
+    parser.add_argument("directory", help="Diretório de saída.")
+    parser.add_argument("--dpi", type=int, nargs="+", default=[150, 300], help="Resoluções das digitalizações.")
+    parser.add_argument("--pages", type=int, default=4, help="Páginas por arquivo.")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do gerador.")
+    args = parser.parse_args(argv)
+    labels = generate_corpus(args.directory, args.dpi, args.pages, args.seed)
+    print(f"{sum(len(pages) for pages in labels['files'].values())} páginas em "
+          f"{len(labels['files'])} arquivos: {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Benchmark do analisador sobre o corpus sintético (ver benchmarks/corpus.py).
+
+Mede, cada um em um processo novo (para isolar o pico de memória):
+- cada etapa do analisador isoladamente (renderização, decodificação direta da digitalização, triagem,
+  limiarização, OCR com pré-processamento): latência por página (média, p50, p95), páginas por segundo e
+  pico de RSS;
+- a análise completa do diretório pelo AnalysisEngine, em cada modo de entrada do analisador ('render' e
+  'auto'): páginas por segundo, latência por etapa (métricas da execução), pico de RSS e os vereditos,
+  conferidos com os rótulos do corpus;
+- a paridade da triagem: o status de cada página com a triagem em baixa resolução deve ser o mesmo do
+  caminho exaustivo (coarse_screening=False).
+
+O resultado é comparado com a linha de base salva (--save-baseline); o código de saída é 1 se
+houver regressão acima dos limites, vereditos errados a mais que na linha de base ou alguma página
+fora da paridade. Com --require-baseline (integração contínua), a falta de uma linha de base medida
+com o mesmo corpus encerra o benchmark com o código 2, em vez de conferir só os vereditos.
+
+Uso:
+    python -m benchmarks.run [--corpus DIR] [--workers 2] [--input-mode render auto] [--save-baseline]
+                             [--require-baseline] [--json resultado.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.corpus import LABEL_BLANK, generate_corpus
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "blank_analyzer_benchmark_corpus")
+
+# Etapas medidas isoladamente
+STAGES = ("render", "decode_scan", "coarse_screen", "threshold", "ocr")
+
+# Modos de entrada do PDFAnalyzer comparados na análise completa
+INPUT_MODES = ("render", "auto")
+
+
+def peak_rss_mb(include_children=False):
+    """
+    Pico de memória residente do processo (e dos filhos já encerrados), em MB. None se indisponível.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss é dado em KB no Linux e em bytes no macOS
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / unit
+
+
+def latency_summary(latencies):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if not len(latencies):
+        return {"count": 0}
+    return {
+        "count": int(len(latencies)),
+        "mean": float(latencies.mean()),
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "pages_per_sec": float(len(latencies) / latencies.sum()) if latencies.sum() else None,
+    }
+
+
+def _run_stage(stage, corpus_dir, labels):
+    """
+    Executa uma etapa do analisador sobre as páginas do corpus, medindo só a etapa (as entradas são
+    preparadas fora da medição). O OCR só é medido nas páginas rotuladas como em branco, as únicas
+    que chegam a ele na análise.
+    """
+    import fitz
+    from pdf_analyzer import PDFAnalyzer
+
+    analyzer = PDFAnalyzer()
+    latencies = []
+    for name, page_labels in sorted(labels.items()):
+        with fitz.open(os.path.join(corpus_dir, name)) as pdf_document:
+            for page, label in zip(pdf_document, page_labels):
+                if stage == "render":
+                    start = time.perf_counter()
+                    analyzer.render_page(page)
+                elif stage == "decode_scan":
+                    # Caminho de input_mode='auto': a imagem embutida é decodificada sem renderizar a página
+                    start = time.perf_counter()
+                    scan_image = analyzer.find_scan_image(page)
+                    if scan_image is None or analyzer.decode_scan_image(page, scan_image) is None:
+                        analyzer.render_page(page)
+                elif stage == "coarse_screen":
+                    start = time.perf_counter()
+                    coarse_image, coarse_pix = analyzer.render_page(page, analyzer.coarse_scale)
+                    analyzer.screen_coarse(coarse_image)
+                elif stage == "threshold":
+                    gray_image, pix = analyzer.render_page(page)
+                    start = time.perf_counter()
+                    analyzer.is_blank_or_noisy(gray_image)
+                elif stage == "ocr":
+                    if label != LABEL_BLANK:
+                        continue
+                    gray_image, pix = analyzer.render_page(page)
+                    # O índice ortográfico e o backend de OCR são carregados fora da medição
+                    analyzer.spell
+                    analyzer.ocr
+                    start = time.perf_counter()
+                    analyzer.perform_ocr_and_reclassify(gray_image)
+                else:
+                    raise ValueError(f"Etapa desconhecida: {stage}")
+                latencies.append(time.perf_counter() - start)
+    result = latency_summary(latencies)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _run_end_to_end(corpus_dir, labels, num_workers, input_mode):
+    """
+    Analisa o diretório do corpus com o AnalysisEngine (sem cache de vereditos) e confere os vereditos.
+    """
+    from analysis_engine import AnalysisEngine
+    from pdf_analyzer import BLANK_STATUSES
+
+    names = sorted(labels)
+    engine = AnalysisEngine(num_workers=num_workers, analyzer_kwargs={"input_mode": input_mode}, thumbnails=False)
+    tasks, total_pages = engine.plan([os.path.join(corpus_dir, name) for name in names])
+    mismatches = []
+    start = time.perf_counter()
+    for result in engine.run(tasks):
+        expected = labels[names[result.file_index]][result.page_num - 1]
+        actual = LABEL_BLANK if result.status in BLANK_STATUSES else "content"
+        if actual != expected:
+            mismatches.append({"file": result.pdf_name, "page": result.page_num, "expected": expected,
+                               "status": result.status, "white_pixel_percentage": result.white_pixel_percentage,
+                               "coarse_white_ratio": result.coarse_white_ratio})
+    elapsed = time.perf_counter() - start
+    summary = engine.metrics.summary()
+    return {
+        "pages": total_pages,
+        "workers": engine.num_workers,
+        "seconds": elapsed,
+        "pages_per_sec": total_pages / elapsed if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(include_children=True),
+        "stages": {name: {"count": stage["count"], "mean": stage["wall_mean"], "p50": stage["wall_p50"],
+                          "p95": stage["wall_p95"]} for name, stage in summary["stages"].items()},
+        "counters": summary["counters"],
+        "mismatches": mismatches,
+    }
+
+
+def _run_parity(corpus_dir, labels, num_workers):
+    """
+    Analisa o corpus com a triagem em baixa resolução e pelo caminho exaustivo (coarse_screening=False) e
+    lista as páginas cujo status difere. Sem cache de vereditos e sem deduplicação: o texto reaproveitado
+    viria da primeira página lida pelo OCR, que não é a mesma nos dois caminhos.
+    """
+    from analysis_engine import AnalysisEngine
+
+    paths = [os.path.join(corpus_dir, name) for name in sorted(labels)]
+    statuses = []
+    for coarse_screening in (True, False):
+        engine = AnalysisEngine(num_workers=num_workers, analyzer_kwargs={"coarse_screening": coarse_screening},
+                                thumbnails=False, dedup=False)
+        tasks, total_pages = engine.plan(paths)
+        statuses.append({(result.pdf_name, result.page_num): result.status for result in engine.run(tasks)})
+    tiered, exhaustive = statuses
+    return [{"file": name, "page": page_num, "tiered": status, "exhaustive": exhaustive[(name, page_num)]}
+            for (name, page_num), status in sorted(tiered.items()) if status != exhaustive[(name, page_num)]]
+
+
+def _in_fresh_process(function, *args):
+    # 'spawn' garante um processo limpo, sem a memória do processo principal
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(function, *args).result()
+
+
+def compare(report, baseline, max_throughput_drop, max_latency_increase, max_rss_increase):
+    """
+    Compara o resultado com a linha de base.
+    Retorna:
+        lista de regressões (mensagens)
+    """
+    regressions = []
+
+    def check(label, current, reference):
+        if not current or not reference:
+            return
+        if current.get("pages_per_sec") and reference.get("pages_per_sec") and \
+                current["pages_per_sec"] < reference["pages_per_sec"] * (1 - max_throughput_drop):
+            regressions.append(f"{label}: {current['pages_per_sec']:.2f} páginas/s "
+                               f"(linha de base {reference['pages_per_sec']:.2f})")
+        if current.get("p50") and reference.get("p50") and \
+                current["p50"] > reference["p50"] * (1 + max_latency_increase):
+            regressions.append(f"{label}: p50 {current['p50'] * 1000:.1f} ms "
+                               f"(linha de base {reference['p50'] * 1000:.1f} ms)")
+        if current.get("peak_rss_mb") and reference.get("peak_rss_mb") and \
+                current["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + max_rss_increase):
+            regressions.append(f"{label}: pico de RSS {current['peak_rss_mb']:.0f} MB "
+                               f"(linha de base {reference['peak_rss_mb']:.0f} MB)")
+
+    for stage, result in report["stages"].items():
+        check(f"etapa {stage}", result, baseline.get("stages", {}).get(stage))
+    for input_mode, end_to_end in report["end_to_end"].items():
+        reference = baseline.get("end_to_end", {}).get(input_mode)
+        check(f"análise completa ({input_mode})", end_to_end, reference)
+
+        baseline_mismatches = len((reference or {}).get("mismatches", []))
+        if len(end_to_end["mismatches"]) > baseline_mismatches:
+            regressions.append(f"vereditos errados ({input_mode}): {len(end_to_end['mismatches'])} "
+                               f"(linha de base {baseline_mismatches})")
+
+    # A paridade não depende da linha de base: a triagem nunca pode mudar o status de uma página
+    if report.get("parity"):
+        regressions.append(f"paridade da triagem: {len(report['parity'])} páginas com status diferente "
+                           f"do caminho exaustivo")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do analisador sobre o corpus sintético.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_DIR, help="Diretório do corpus (gerado se preciso).")
+    parser.add_argument("--dpi", type=int, nargs="+", default=[150, 300], help="Resoluções do corpus.")
+    parser.add_argument("--pages", type=int, default=4, help="Páginas por arquivo do corpus.")
+    parser.add_argument("--workers", type=int, default=2, help="Workers da análise completa.")
+    parser.add_argument("--stages", nargs="*", default=list(STAGES), choices=STAGES, help="Etapas medidas.")
+    parser.add_argument("--input-mode", nargs="+", default=list(INPUT_MODES), choices=INPUT_MODES,
+                        help="Modos de entrada do analisador medidos na análise completa.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Arquivo da linha de base.")
+    parser.add_argument("--save-baseline", action="store_true", help="Salva o resultado como linha de base.")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="Falha (código 2) se não houver linha de base medida com o mesmo corpus; "
+                             "para a integração contínua.")
+    parser.add_argument("--json", default=None, help="Grava o resultado neste arquivo JSON.")
+    parser.add_argument("--max-throughput-drop", type=float, default=0.2,
+                        help="Queda máxima de páginas/s tolerada (fração; padrão 0.2).")
+    parser.add_argument("--max-latency-increase", type=float, default=0.25,
+                        help="Aumento máximo da latência p50 tolerado (fração; padrão 0.25).")
+    parser.add_argument("--max-rss-increase", type=float, default=0.25,
+                        help="Aumento máximo do pico de RSS tolerado (fração; padrão 0.25).")
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(args.corpus, args.dpi, args.pages)
+    labels = corpus["files"]
+    report = {"corpus": corpus["parameters"], "stages": {}, "end_to_end": {}}
+
+    # Sem linha de base (ou com uma de outro corpus), só os vereditos são conferidos
+    baseline = {}
+    if not args.save_baseline:
+        problem = None
+        if not os.path.exists(args.baseline):
+            problem = f"Nenhuma linha de base encontrada em {args.baseline} (use --save-baseline)"
+        else:
+            with open(args.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+            if baseline.get("corpus") != report["corpus"]:
+                problem = "A linha de base foi medida com outro corpus"
+                baseline = {}
+        if problem and args.require_baseline:
+            print(f"ERRO: {problem}.", file=sys.stderr)
+            return 2
+        if problem:
+            print(f"{problem}; só os vereditos serão conferidos.")
+
+    for stage in args.stages:
+        result = _in_fresh_process(_run_stage, stage, args.corpus, labels)
+        report["stages"][stage] = result
+        print(f"{stage:<18}{result.get('mean', 0) * 1000:>10.2f} ms/pág  p95 {result.get('p95', 0) * 1000:>8.2f} ms  "
+              f"{result.get('pages_per_sec') or 0:>8.1f} pág/s  pico {result['peak_rss_mb'] or 0:>6.0f} MB")
+
+    for input_mode in args.input_mode:
+        end_to_end = _in_fresh_process(_run_end_to_end, args.corpus, labels, args.workers, input_mode)
+        report["end_to_end"][input_mode] = end_to_end
+        print(f"{'análise completa':<18}{end_to_end['pages']} páginas em {end_to_end['seconds']:.2f} s "
+              f"({end_to_end['pages_per_sec']:.1f} pág/s, {end_to_end['workers']} workers, modo {input_mode}), "
+              f"pico {end_to_end['peak_rss_mb'] or 0:.0f} MB")
+        # Etapas que dependem do modo de entrada e, só no primeiro modo, cada etapa do pré-processamento do OCR
+        for name, stage in end_to_end["stages"].items():
+            if name in ("render_coarse", "render") or \
+                    (name.startswith("ocr_preprocess:") and input_mode == args.input_mode[0]):
+                print(f"  {name:<28}{stage['mean'] * 1000:>8.2f} ms/pág  p95 {stage['p95'] * 1000:>8.2f} ms  "
+                      f"({stage['count']} páginas)")
+        for mismatch in end_to_end["mismatches"]:
+            print(f"  veredito errado: {mismatch['file']} p. {mismatch['page']}: esperado {mismatch['expected']}, "
+                  f"obtido '{mismatch['status']}'")
+
+    parity = _in_fresh_process(_run_parity, args.corpus, labels, args.workers)
+    report["parity"] = parity
+    print(f"{'paridade':<18}{len(parity)} páginas com status diferente entre a triagem e o caminho exaustivo")
+    for mismatch in parity:
+        print(f"  {mismatch['file']} p. {mismatch['page']}: triagem '{mismatch['tiered']}', "
+              f"exaustivo '{mismatch['exhaustive']}'")
+
+    regressions = compare(report, baseline, args.max_throughput_drop, args.max_latency_increase,
+                          args.max_rss_increase)
+    for regression in regressions:
+        print(f"REGRESSÃO: {regression}")
+    if not regressions:
+        print("Sem regressões.")
+    report["regressions"] = regressions
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+        print(f"Linha de base salva em {args.baseline}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Mede o custo de inicialização do aplicativo e o compara com o orçamento em startup_budget.json:
+
+- import_<módulo>: tempo de importação dos pontos de entrada, medido com `python -X importtime`
+  (o relatório lista também as dependências que mais pesam);
+- time_to_splash: do lançamento do interpretador até a tela inicial desenhada;
+- time_to_first_page: do lançamento do interpretador até o resultado da primeira página de um PDF.
+
+Cada medição roda em um processo novo (partida a frio) e vale a mediana de --repeat execuções.
+
+Uso:
+    python -m benchmarks.startup [--pdf arquivo.pdf] [--repeat 5] [--json startup_report.json]
+Retorna código 1 se alguma medição ultrapassar o orçamento.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+# Pontos de entrada cujo tempo de importação é acompanhado
+ENTRY_MODULES = ("tela_inicial", "gui", "cli")
+
+# Linha impressa pelos processos de medição quando o marco é atingido
+READY_MARKER = "__startup_ready__"
+
+SPLASH_SCRIPT = f"""
+import tela_inicial
+root = tela_inicial.criar_tela_inicial()
+root.update()
+print({READY_MARKER!r}, flush=True)
+root.destroy()
+"""
+
+FIRST_PAGE_SCRIPT = f"""
+import sys
+from analysis_engine import AnalysisEngine
+engine = AnalysisEngine(num_workers=1, thumbnails=False)
+tasks, _ = engine.plan([sys.argv[1]])
+next(iter(engine.run(tasks)))
+print({READY_MARKER!r}, flush=True)
+"""
+
+
+def import_time(module):
+    """
+    Importa o módulo em um processo novo com -X importtime.
+    Retorna:
+        total (float, segundos), dependências diretas mais pesadas [(nome, segundos)]
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    total = 0.0
+    heaviest = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Cabeçalho
+        seconds = int(cumulative) / 1e6
+        depth = (len(name) - len(name.lstrip())) // 2
+        if name.strip() == module and depth == 0:
+            total = seconds
+        elif depth == 1:
+            heaviest.append((name.strip(), seconds))
+    heaviest.sort(key=lambda item: item[1], reverse=True)
+    return total, heaviest[:5]
+
+
+def time_until_ready(script, *args):
+    """
+    Lança o interpretador com o script e mede o tempo até a linha READY_MARKER.
+    Retorna:
+        segundos (float), ou None se o processo terminar sem atingir o marco (por exemplo, sem display).
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", script, *args], cwd=REPO_DIR, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True)
+    elapsed = None
+    for line in process.stdout:
+        if line.strip() == READY_MARKER:
+            elapsed = time.perf_counter() - start
+            break
+    process.stdout.close()
+    process.wait()
+    return elapsed
+
+
+def sample_pdf(directory):
+    """
+    Cria um PDF de uma página com texto, que a triagem decide sem OCR (caso comum).
+    """
+    import fitz
+    path = os.path.join(directory, "startup_sample.pdf")
+    with fitz.open() as pdf_document:
+        page = pdf_document.new_page()
+        for line in range(40):
+            page.insert_text((72, 72 + line * 16), "Documento de exemplo para medir o tempo de inicialização.")
+        pdf_document.save(path)
+    return path
+
+
+def median_or_none(values):
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização do aplicativo.")
+    parser.add_argument("--pdf", default=None, help="PDF usado em time_to_first_page (padrão: gerado).")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por medição (vale a mediana).")
+    parser.add_argument("--budget", default=BUDGET_PATH, help="Arquivo JSON com o orçamento, em segundos.")
+    parser.add_argument("--json", default=None, help="Grava as medições neste arquivo JSON.")
+    args = parser.parse_args(argv)
+
+    with open(args.budget, encoding="utf-8") as file:
+        budget = json.load(file)
+
+    report = {"measurements": {}, "heaviest_imports": {}}
+    for module in ENTRY_MODULES:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        report["measurements"][f"import_{module}"] = median_or_none([total for total, _ in runs])
+        report["heaviest_imports"][module] = runs[-1][1]
+
+    report["measurements"]["time_to_splash"] = median_or_none(
+        [time_until_ready(SPLASH_SCRIPT) for _ in range(args.repeat)])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.abspath(args.pdf) if args.pdf else sample_pdf(temp_dir)
+        report["measurements"]["time_to_first_page"] = median_or_none(
+            [time_until_ready(FIRST_PAGE_SCRIPT, pdf_path) for _ in range(args.repeat)])
+
+    over_budget = []
+    print(f"{'Medição':<24}{'Tempo (s)':>12}{'Orçamento (s)':>16}")
+    for name, seconds in report["measurements"].items():
+        limit = budget.get(name)
+        if seconds is None:
+            print(f"{name:<24}{'indisponível':>12}{limit if limit is not None else '-':>16}")
+            continue
+        flag = ""
+        if limit is not None and seconds > limit:
+            over_budget.append(name)
+            flag = "  <-- acima do orçamento"
+        print(f"{name:<24}{seconds:>12.3f}{limit if limit is not None else '-':>16}{flag}")
+    for module, heaviest in report["heaviest_imports"].items():
+        print(f"Importações mais pesadas de {module}: "
+              + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in heaviest))
+
+    report["over_budget"] = over_budget
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
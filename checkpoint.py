@@ -0,0 +1,166 @@
+import heapq
+import json
+import logging
+import os
+import time
+
+from analysis_engine import PageResult
+from pdf_analyzer import PageVerdict
+
+logger = logging.getLogger(__name__)
+
+# Sufixo do diário de checkpoint, gravado ao lado do relatório
+CHECKPOINT_SUFFIX = "_checkpoint.jsonl"
+# Nome do diário da interface gráfica, no diretório analisado (os relatórios têm nomes com data e hora)
+DIRECTORY_CHECKPOINT_NAME = "analysis_checkpoint.jsonl"
+
+# Páginas concluídas acumuladas em memória antes de gravá-las no diário (com fsync)
+DEFAULT_CHECKPOINT_INTERVAL = 100
+# Tempo máximo (s) entre duas gravações, para que páginas lentas (OCR) também sejam salvas
+DEFAULT_CHECKPOINT_SECONDS = 10.0
+
+
+def checkpoint_path(report_path):
+    return os.path.splitext(report_path)[0] + CHECKPOINT_SUFFIX
+
+
+def describe_inputs(pdf_files):
+    """
+    Identifica os PDFs da análise (nome, tamanho e mtime), na ordem em que são numerados.
+    """
+    inputs = []
+    for pdf_file in pdf_files:
+        stat = os.stat(pdf_file)
+        inputs.append([os.path.basename(pdf_file), stat.st_size, stat.st_mtime])
+    return inputs
+
+
+class CheckpointJournal:
+    def __init__(self, path, signature, pdf_files, interval=DEFAULT_CHECKPOINT_INTERVAL,
+                 interval_seconds=DEFAULT_CHECKPOINT_SECONDS):
+        """
+        Diário (JSON lines) dos resultados já concluídos de uma análise longa, para retomá-la depois
+        de uma falha. A primeira linha identifica a análise (parâmetros e PDFs); cada linha seguinte é
+        uma página. As páginas são gravadas em lote a cada `interval` páginas ou `interval_seconds`
+        segundos, com fsync; uma última linha truncada por uma queda é descartada na retomada.
+
+        Args:
+            path (str): Caminho do diário.
+            signature (str): Parâmetros da análise (AnalysisEngine.signature).
+            pdf_files (list): PDFs analisados, na ordem usada pelo AnalysisEngine.
+            interval (int): Páginas acumuladas antes de cada gravação.
+            interval_seconds (float): Tempo máximo entre duas gravações.
+        """
+        self.path = path
+        self.header = {"signature": signature, "inputs": describe_inputs(pdf_files)}
+        self.interval = max(1, interval)
+        self.interval_seconds = interval_seconds
+        self.journaled = {}  # (file_index, page_num) -> PageResult já gravado no diário
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._file = None
+
+    def open(self, resume=False):
+        """
+        Abre o diário. Com resume, carrega as páginas de um diário anterior da mesma análise e
+        continua gravando nele; caso contrário (ou se a análise for outra), começa um diário novo.
+        Retorna:
+            quantidade de páginas retomadas
+        """
+        valid_size = self._load() if resume and os.path.exists(self.path) else None
+        if valid_size is None:
+            self.journaled = {}
+            dir_path = os.path.dirname(self.path)
+            if dir_path and not os.path.exists(dir_path):
+                os.makedirs(dir_path, exist_ok=True)
+            # O cabeçalho é gravado em um temporário e renomeado, para nunca deixar um diário sem ele
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        else:
+            # Remove a linha incompleta que uma queda possa ter deixado no fim
+            with open(self.path, "r+b") as file:
+                file.truncate(valid_size)
+            logger.info("Retomando a análise: %d páginas já concluídas no checkpoint.", len(self.journaled))
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._last_flush = time.monotonic()
+        return len(self.journaled)
+
+    def _load(self):
+        # Retorna o tamanho da parte válida do diário, ou None se ele for de outra análise
+        valid_size = 0
+        with open(self.path, "rb") as file:
+            for line_number, line in enumerate(file):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                if line_number == 0:
+                    if entry != self.header:
+                        logger.info("O checkpoint é de outra análise (parâmetros ou PDFs alterados) "
+                                    "e será descartado.")
+                        return None
+                else:
+                    result = PageResult(*entry[:3], PageVerdict.from_details(*entry[3:]))
+                    self.journaled[(result.file_index, result.page_num)] = result
+                valid_size += len(line)
+        return valid_size or None
+
+    def done_pages(self):
+        # Páginas a pular no AnalysisEngine.plan
+        return set(self.journaled)
+
+    def add(self, result):
+        """
+        Registra uma página concluída; grava o lote quando o intervalo é atingido.
+        """
+        self._buffer.append(json.dumps([
+            result.file_index, result.pdf_name, result.page_num, result.status,
+            result.white_pixel_percentage, bool(result.ocr_performed), result.extracted_text,
+            result.details], ensure_ascii=False) + "\n")
+        if len(self._buffer) >= self.interval or time.monotonic() - self._last_flush >= self.interval_seconds:
+            self.flush()
+
+    def flush(self):
+        # Uma única escrita por lote e fsync: o que foi gravado sobrevive a uma queda do sistema
+        if self._buffer and self._file is not None:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def merge(self, results):
+        """
+        Junta as páginas retomadas do diário aos novos resultados (ambos em ordem de arquivo e
+        página), registrando os novos no diário à medida que passam.
+        Gera:
+            PageResult na ordem (arquivo, página), como em uma análise sem interrupção
+        """
+        def journal_new(results):
+            for result in results:
+                self.add(result)
+                yield result
+
+        resumed = sorted(self.journaled.values(), key=lambda result: (result.file_index, result.page_num))
+        yield from heapq.merge(resumed, journal_new(results),
+                               key=lambda result: (result.file_index, result.page_num))
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        # Chamado quando o relatório foi gerado: o checkpoint não é mais necessário
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            logger.warning("Erro ao remover o checkpoint %s: %s", self.path, e)
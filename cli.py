@@ -0,0 +1,221 @@
+"""
+Execução em lote, sem interface gráfica (não importa o tkinter), para servidores e agendamentos (cron).
+
+Uso:
+    python cli.py ENTRADA [ENTRADA ...] [--workers N] [--output resultados.jsonl]
+                  [--report relatorio.xlsx --report-format xlsx csv parquet sqlite] [--resume]
+
+Cada página analisada gera uma linha JSON na saída assim que o seu resultado fica pronto,
+na ordem (arquivo, página). As mensagens de progresso vão para a saída de erro.
+
+Com --report, as páginas concluídas são gravadas periodicamente em um checkpoint ao lado do
+relatório; --resume retoma uma análise interrompida a partir dele.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+from report_generator import REPORT_SINKS, ReportGenerator
+from verdict_cache import DEFAULT_CACHE_PATH
+
+
+def find_pdf_files(inputs):
+    """
+    Expande as entradas em uma lista de PDFs: arquivos são usados como estão e diretórios
+    contribuem com os seus PDFs (sem recursão), em ordem alfabética como na interface.
+    """
+    pdf_files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            pdf_files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                    if name.lower().endswith('.pdf')))
+        elif os.path.isfile(path):
+            pdf_files.append(path)
+        else:
+            print(f"Entrada não encontrada, ignorada: {path}", file=sys.stderr)
+    return pdf_files
+
+
+def open_output(output):
+    """
+    Abre o destino das linhas JSON. Na saída padrão, o descritor original é duplicado para os
+    resultados e o descritor 1 passa a apontar para a saída de erro, para que as mensagens do
+    analisador (inclusive as dos processos workers e do Tesseract) não se misturem ao JSON.
+    """
+    if output != "-":
+        return open(output, "w", encoding="utf-8", buffering=1)
+    sys.stdout.flush()
+    stream = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return stream
+
+
+# Parâmetros do PDFAnalyzer repassados pelas opções de mesmo nome de add_analyzer_options
+ANALYZER_OPTIONS = ("input_mode", "coarse_scale", "uncertainty_band", "coarse_ink_gain", "tile_grid", "tile_ink_limit")
+
+
+def add_analyzer_options(parser):
+    """
+    Opções do analisador comuns aos pontos de entrada sem interface (cli, watch_mode e distributed).
+    """
+    parser.add_argument("--preprocessing", default=None, metavar="ARQUIVO",
+                        help='Arquivo JSON com as etapas do pré-processamento do OCR, por exemplo '
+                             '[["median", {"ksize": 3}], ["threshold", {"level": 140}]] '
+                             '(padrão: ocr_preprocessing.DEFAULT_STEPS).')
+    parser.add_argument("--input-mode", default=None, choices=["render", "auto"],
+                        help="'auto' decodifica diretamente a imagem de páginas que são só uma digitalização, "
+                             "em vez de renderizá-las (padrão: render).")
+    # Parâmetros da triagem em baixa resolução (ver PDFAnalyzer); sem a opção, vale o padrão do analisador
+    parser.add_argument("--no-coarse-screening", action="store_true",
+                        help="Desativa a triagem em baixa resolução: todas as páginas passam pela limiarização completa.")
+    parser.add_argument("--coarse-scale", type=float, default=None,
+                        help="Escala da renderização da triagem em relação à completa (padrão: 0.25).")
+    parser.add_argument("--uncertainty-band", type=float, default=None,
+                        help="Faixa em torno do limite de pixels brancos em que a triagem não decide "
+                             "(padrão: 0.01).")
+    parser.add_argument("--coarse-ink-gain", type=float, default=None,
+                        help="Calibração da tinta medida em baixa resolução (padrão: 1.6).")
+    parser.add_argument("--tile-grid", type=int, default=None,
+                        help="Blocos por lado do histograma de tinta da triagem (padrão: 8).")
+    parser.add_argument("--tile-ink-limit", type=float, default=None,
+                        help="Tinta em um único bloco a partir da qual a triagem não aceita a página como "
+                             "em branco (padrão: 0.02).")
+
+
+def analyzer_kwargs_from_args(args):
+    """
+    Monta os parâmetros do PDFAnalyzer (AnalysisEngine.analyzer_kwargs) a partir das opções de add_analyzer_options.
+    """
+    analyzer_kwargs = {name: getattr(args, name) for name in ANALYZER_OPTIONS
+                       if getattr(args, name) is not None}
+    if args.no_coarse_screening:
+        analyzer_kwargs["coarse_screening"] = False
+    if args.preprocessing:
+        from ocr_preprocessing import load_steps
+        try:
+            analyzer_kwargs["preprocessing"] = load_steps(args.preprocessing)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Pré-processamento inválido em {args.preprocessing}: {e}")
+    return analyzer_kwargs
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Analisa PDFs digitalizados em busca de páginas em branco.")
+    parser.add_argument("inputs", nargs="+", help="Arquivos PDF ou diretórios contendo PDFs.")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Número de processos workers (padrão: todos os núcleos).")
+    parser.add_argument("-o", "--output", default="-",
+                        help="Arquivo de saída das linhas JSON (padrão: saída padrão).")
+    parser.add_argument("--report", default=None,
+                        help="Também gera o relatório consolidado neste caminho (a extensão vem do formato).")
+    parser.add_argument("--report-format", nargs="+", default=["xlsx"], choices=sorted(REPORT_SINKS),
+                        help="Formatos do relatório consolidado (padrão: xlsx).")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Diário de checkpoint das páginas concluídas (padrão: ao lado do relatório, "
+                             "com o sufixo _checkpoint.jsonl).")
+    parser.add_argument("--checkpoint-interval", type=int, default=None,
+                        help="Páginas concluídas entre duas gravações do checkpoint (padrão: 100).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retoma uma análise interrompida: pula as páginas já gravadas no checkpoint.")
+    parser.add_argument("--tesseract-cmd", default=None, help="Caminho do executável do Tesseract.")
+    parser.add_argument("--tessdata", default=None, help="Diretório tessdata (define TESSDATA_PREFIX).")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="Arquivo do cache de vereditos (padrão: %(default)s).")
+    parser.add_argument("--no-cache", action="store_true", help="Desativa o cache de vereditos.")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Desativa o reaproveitamento do OCR de páginas quase idênticas.")
+    add_analyzer_options(parser)
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Nível de log (DEBUG inclui as mensagens de cada página; padrão: INFO).")
+    parser.add_argument("--metrics", default=None,
+                        help="Grava o resumo das métricas (tempos por etapa e contadores) neste arquivo JSON.")
+    parser.add_argument("--profile", default=None, metavar="DIR",
+                        help="Modo de profiling: grava um cProfile por processo em DIR.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    pdf_files = find_pdf_files(args.inputs)
+    if not pdf_files:
+        print("Nenhum arquivo PDF encontrado.", file=sys.stderr)
+        return 2
+    output = open_output(args.output)
+
+    # Importados só depois do redirecionamento, para que avisos emitidos na importação não cheguem à saída
+    from analysis_engine import AnalysisEngine
+    from checkpoint import DEFAULT_CHECKPOINT_INTERVAL, CheckpointJournal, checkpoint_path
+    from results_accumulator import ResultsAccumulator
+
+    if args.tesseract_cmd:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = args.tesseract_cmd
+    if args.tessdata:
+        os.environ['TESSDATA_PREFIX'] = args.tessdata
+
+    report_generator = ReportGenerator(formats=args.report_format) if args.report else None
+    engine = AnalysisEngine(num_workers=args.workers, analyzer_kwargs=analyzer_kwargs_from_args(args),
+                            cache_path=None if args.no_cache else args.cache, thumbnails=False,
+                            metrics=report_generator.metrics if report_generator else None,
+                            profile_dir=args.profile, dedup=not args.no_dedup)
+
+    # Sem um caminho explícito, o checkpoint acompanha o relatório
+    journal_path = args.checkpoint or (checkpoint_path(args.report) if args.report else None)
+    journal = None
+    resumed_pages = 0
+    if journal_path:
+        journal = CheckpointJournal(journal_path, engine.signature(), pdf_files,
+                                    interval=args.checkpoint_interval or DEFAULT_CHECKPOINT_INTERVAL)
+        resumed_pages = journal.open(resume=args.resume)
+    tasks, total_pages = engine.plan(pdf_files, journal.done_pages() if journal else None)
+    results = journal.merge(engine.run(tasks)) if journal else engine.run(tasks)
+    # Só as colunas de cada página ficam em memória, para o resumo final
+    accumulator = ResultsAccumulator()
+    try:
+        for result in results:
+            output.write(json.dumps({
+                "pdf_path": pdf_files[result.file_index],
+                "pdf_name": result.pdf_name,
+                "page_num": result.page_num,
+                "status": result.status,
+                "white_pixel_percentage": result.white_pixel_percentage,
+                "ocr_performed": bool(result.ocr_performed),
+                "extracted_text": result.extracted_text,
+                "details": result.details,
+            }, ensure_ascii=False))
+            output.write("\n")
+            accumulator.add_result(result)
+            if report_generator:
+                report_generator.add_record(result.pdf_name, result.page_num, result.status,
+                                            result.white_pixel_percentage, result.ocr_performed,
+                                            result.extracted_text, result.details)
+    finally:
+        output.close()
+        if journal:
+            journal.close()
+
+    if report_generator:
+        report_generator.finalize(args.report)
+    if journal and all(os.path.exists(os.path.splitext(args.report)[0] + sink.extension)
+                       for sink in (report_generator.sinks if report_generator else [])):
+        journal.remove()
+    summary = accumulator.summary()
+    print(f"Páginas analisadas: {total_pages}\n"
+          f"Páginas retomadas do checkpoint: {resumed_pages}\n"
+          f"Páginas em branco: {summary['blank']}\n"
+          f"Cache de vereditos: {engine.cache_hits} acertos, {engine.cache_misses} faltas\n"
+          f"OCR reaproveitado de páginas quase idênticas: {summary['dedup']}", file=sys.stderr)
+    if args.metrics:
+        engine.metrics.save_json(args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Necessário para o pool de processos em executáveis congelados no Windows
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# dHash da página: HASH_SIZE x HASH_SIZE bits (256)
+HASH_SIZE = 16
+# dHash de cada região de texto: CROP_HASH_COLUMNS x CROP_HASH_ROWS bits (256), largo como as linhas de texto;
+# palavras diferentes no mesmo carimbo diferem em mais de 20 bits, uma nova digitalização em menos de 15
+CROP_HASH_COLUMNS = 32
+CROP_HASH_ROWS = 8
+
+# Candidatos comparados (os mais recentes) em cada consulta, em cada índice; limita o custo de uma página
+# cuja chave é compartilhada por muitas outras (o número de página na mesma posição em todo o lote)
+MAX_CANDIDATES = 32
+
+# Impressão digital de uma página que chegou ao OCR: hash da página, caixas das regiões de texto
+# normalizadas pelo tamanho da página (x, y, largura, altura) e hash de cada região
+Fingerprint = namedtuple("Fingerprint", ["page_hash", "boxes", "crop_hashes"])
+
+
+def dhash(image, columns, rows):
+    """
+    Hash de diferenças (dHash): reduz a imagem para (columns + 1) x rows e marca um bit quando um
+    pixel é mais escuro que o vizinho da direita. Áreas uniformes (papel) geram bits zero.
+    Retorna:
+        int com columns * rows bits
+    """
+    small = cv2.resize(image, (columns + 1, rows), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(first, second):
+    return bin(first ^ second).count("1")
+
+
+def page_fingerprint(binary_image, boxes, crops):
+    """
+    Calcula a impressão digital da página binarizada pelo pré-processamento do OCR (sem o ruído do
+    papel, que no tom de cinza bruto domina o hash de uma página quase em branco) e das suas regiões de texto.
+    """
+    height, width = binary_image.shape[:2]
+    normalized_boxes = tuple((left / width, top / height, box_width / width, box_height / height)
+                             for left, top, box_width, box_height in boxes)
+    crop_hashes = tuple(dhash(crop, CROP_HASH_COLUMNS, CROP_HASH_ROWS) for crop in crops)
+    return Fingerprint(dhash(binary_image, HASH_SIZE, HASH_SIZE), normalized_boxes, crop_hashes)
+
+
+def region_key(fingerprint, cell):
+    """
+    Chave de busca da página: número de regiões de texto e célula (em uma grade de lado `cell`, em fração
+    da página) do canto superior esquerdo da primeira região. O hash da página não serve de chave: a
+    página quase em branco binarizada gera quase só bits zero, iguais em todas as páginas do lote.
+    """
+    left, top = fingerprint.boxes[0][:2]
+    return len(fingerprint.boxes), int(left // cell), int(top // cell)
+
+
+def neighbor_keys(key):
+    # Com a célula do tamanho da tolerância das caixas, uma região deslocada dentro da tolerância cai na
+    # mesma célula ou em uma vizinha
+    count, column, row = key
+    return [(count, column + dx, row + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+class DedupIndex:
+    def __init__(self, path=None, tolerance=8, box_tolerance=0.02, crop_tolerance=16, max_entries=200000,
+                 max_memory_entries=50000):
+        """
+        Índice de páginas quase idênticas (folhas separadoras, versos em branco, formulários) que já
+        passaram pelo OCR, para reaproveitar o texto e a decisão do OCR em vez de chamar o Tesseract
+        de novo. As páginas idênticas byte a byte já são resolvidas pelo cache de vereditos; este índice
+        cobre as digitalizações diferentes da mesma folha.
+
+        Duas páginas são quase idênticas quando o hash da página difere em até `tolerance` bits, têm o
+        mesmo número de regiões de texto, nas mesmas posições (até `box_tolerance` do tamanho da página),
+        e o hash de cada região difere em até `crop_tolerance` bits. Os candidatos são buscados pela
+        chave das regiões (region_key), no índice da execução (memória) e no persistente (SQLite,
+        compartilhado entre workers e execuções), até MAX_CANDIDATES por índice. Diferenças de um ou
+        dois caracteres (a data de um carimbo) não mudam o hash: a decisão do OCR reaproveitada vale
+        para a página, mas o texto é o da primeira página lida.
+
+        Args:
+            path (str): Arquivo SQLite do índice persistente (pode ser o do cache de vereditos).
+                None mantém só o índice da execução.
+            tolerance (int): Distância de Hamming máxima entre os hashes das páginas.
+            box_tolerance (float): Deslocamento máximo das caixas das regiões, em fração da página.
+            crop_tolerance (int): Distância de Hamming máxima entre os hashes de cada região.
+            max_entries (int): Entradas do índice persistente; as menos usadas recentemente são descartadas.
+            max_memory_entries (int): Entradas do índice da execução; ao atingir o limite ele é esvaziado
+                (o persistente continua disponível).
+        """
+        self.tolerance = tolerance
+        self.box_tolerance = box_tolerance
+        # Lado da célula da chave de busca (region_key)
+        self._cell = max(box_tolerance, 0.001)
+        self.crop_tolerance = crop_tolerance
+        self.max_entries = max_entries
+        self.max_memory_entries = max_memory_entries
+        self._adds_since_eviction = 0
+        self._entries = {}  # id -> (signature, Fingerprint, ocr_successful, text)
+        self._keys = {}  # (signature, region_key) -> ids, do mais antigo ao mais recente
+        self._next_memory_id = 0
+        self.connection = None
+        if path:
+            dir_path = os.path.dirname(path)
+            if dir_path and not os.path.exists(dir_path):
+                os.makedirs(dir_path, exist_ok=True)
+            # Consulta e gravação podem vir de threads diferentes do worker, como no cache de vereditos
+            self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._lock = threading.Lock()
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            # Tabelas da versão anterior, indexada pelas faixas do hash da página (que em uma página quase em
+            # branco são todas zero e colocavam todas as páginas como candidatas)
+            self.connection.execute("DROP TABLE IF EXISTS dedup_bands")
+            self.connection.execute("DROP TABLE IF EXISTS dedup_entries")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS dedup_pages (id INTEGER PRIMARY KEY, signature TEXT, region_count INTEGER,"
+                " cell_x INTEGER, cell_y INTEGER, page_hash BLOB, regions TEXT, ocr_successful INTEGER, text TEXT,"
+                " last_used REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS dedup_pages_lookup ON dedup_pages"
+                                    " (signature, region_count, cell_x, cell_y)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS dedup_pages_last_used ON dedup_pages (last_used)")
+            self.connection.commit()
+
+    def matches(self, first, second):
+        if len(first.boxes) != len(second.boxes) or hamming(first.page_hash, second.page_hash) > self.tolerance:
+            return False
+        for box, other_box in zip(first.boxes, second.boxes):
+            if any(abs(value - other_value) > self.box_tolerance for value, other_value in zip(box, other_box)):
+                return False
+        return all(hamming(crop_hash, other_hash) <= self.crop_tolerance
+                   for crop_hash, other_hash in zip(first.crop_hashes, second.crop_hashes))
+
+    def find(self, fingerprint, signature):
+        """
+        Procura uma página quase idêntica já analisada com os mesmos parâmetros (signature).
+        Retorna:
+            (ocr_successful, text) ou None
+        """
+        key = region_key(fingerprint, self._cell)
+        candidates = []
+        for neighbor in neighbor_keys(key):
+            candidates.extend(self._keys.get((signature, neighbor), ()))
+        for entry_id in sorted(candidates, reverse=True)[:MAX_CANDIDATES]:
+            _, other, ocr_successful, text = self._entries[entry_id]
+            if self.matches(fingerprint, other):
+                return ocr_successful, text
+
+        if self.connection is None:
+            return None
+        match = self._find_persistent(fingerprint, signature, key)
+        if match is None:
+            return None
+        ocr_successful, text, other = match
+        # Traz a entrada para o índice da execução: as próximas cópias da mesma folha não consultam o SQLite
+        self._remember(signature, other, ocr_successful, text)
+        return ocr_successful, text
+
+    def _find_persistent(self, fingerprint, signature, key):
+        count, column, row = key
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT id, page_hash, regions, ocr_successful, text FROM dedup_pages WHERE signature = ?"
+                " AND region_count = ? AND cell_x BETWEEN ? AND ? AND cell_y BETWEEN ? AND ?"
+                " ORDER BY last_used DESC LIMIT ?",
+                (signature, count, column - 1, column + 1, row - 1, row + 1, MAX_CANDIDATES)).fetchall()
+            for entry_id, page_hash, regions, ocr_successful, text in rows:
+                regions = json.loads(regions)
+                other = Fingerprint(int.from_bytes(page_hash, "big"), tuple(tuple(region[:4]) for region in regions),
+                                    tuple(int(region[4], 16) for region in regions))
+                if self.matches(fingerprint, other):
+                    with self.connection:
+                        self.connection.execute("UPDATE dedup_pages SET last_used = ? WHERE id = ?",
+                                                (time.time(), entry_id))
+                    return bool(ocr_successful), text, other
+        return None
+
+    def add(self, fingerprint, signature, ocr_successful, text):
+        """
+        Registra o resultado do OCR de uma página nos índices da execução e persistente.
+        """
+        self._remember(signature, fingerprint, ocr_successful, text)
+        if self.connection is None:
+            return
+        regions = [list(box) + [format(crop_hash, "x")]
+                   for box, crop_hash in zip(fingerprint.boxes, fingerprint.crop_hashes)]
+        count, column, row = region_key(fingerprint, self._cell)
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO dedup_pages (signature, region_count, cell_x, cell_y, page_hash, regions,"
+                " ocr_successful, text, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (signature, count, column, row, fingerprint.page_hash.to_bytes(HASH_SIZE * HASH_SIZE // 8, "big"),
+                 json.dumps(regions), int(ocr_successful), text, time.time()))
+        self._adds_since_eviction += 1
+        if self._adds_since_eviction >= 1000:
+            self.evict()
+
+    def _remember(self, signature, fingerprint, ocr_successful, text):
+        if len(self._entries) >= self.max_memory_entries:
+            self._entries, self._keys = {}, {}
+        entry_id = self._next_memory_id
+        self._next_memory_id += 1
+        self._entries[entry_id] = (signature, fingerprint, ocr_successful, text)
+        self._keys.setdefault((signature, region_key(fingerprint, self._cell)), []).append(entry_id)
+
+    def evict(self):
+        """
+        Remove do índice persistente as entradas menos usadas recentemente acima de max_entries.
+        """
+        self._adds_since_eviction = 0
+        if self.connection is None:
+            return
+        with self._lock:
+            count = self.connection.execute("SELECT COUNT(*) FROM dedup_pages").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                with self.connection:
+                    self.connection.execute(
+                        "DELETE FROM dedup_pages WHERE id IN (SELECT id FROM dedup_pages ORDER BY last_used"
+                        " LIMIT ?)", (excess,))
+
+    def close(self):
+        if self.connection is not None:
+            self.evict()
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,320 @@
+"""
+Análise distribuída entre várias máquinas, sem interface gráfica.
+
+O coordenador divide os PDFs em jobs (intervalos de páginas) e os publica em uma fila compartilhada
+(job_queue.py): um arquivo SQLite em um sistema de arquivos de rede ou um servidor Redis. Workers em
+qualquer máquina que enxergue os PDFs no mesmo caminho alugam os jobs, analisam as páginas e gravam
+os resultados na fila; jobs de workers que morreram voltam para a fila quando o aluguel expira.
+O coordenador junta os resultados, na ordem (arquivo, página), em um único relatório.
+
+Uso:
+    # Em cada máquina, quantos processos quiser:
+    python distributed.py worker --queue /mnt/rede/fila.sqlite3 [--tesseract-cmd /usr/bin/tesseract]
+    # Em uma máquina: publica, espera os workers e gera o relatório
+    python distributed.py coordinate /mnt/rede/pdfs --queue /mnt/rede/fila.sqlite3 --report /mnt/rede/relatorio
+    # Ou em etapas:
+    python distributed.py submit /mnt/rede/pdfs --queue redis://servidor:6379/0
+    python distributed.py collect RUN_ID --queue redis://servidor:6379/0 --report relatorio --wait
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from cli import add_analyzer_options, analyzer_kwargs_from_args, find_pdf_files
+from job_queue import STATE_LEASED, STATE_PENDING, default_worker_id, new_run_id, open_job_queue
+from metrics import Metrics
+from report_generator import REPORT_SINKS, ReportGenerator
+from verdict_cache import DEFAULT_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Páginas por job: jobs maiores reduzem o tráfego na fila; menores equilibram melhor a carga
+DEFAULT_PAGES_PER_JOB = 32
+
+
+def plan_jobs(pdf_files, pages_per_job=DEFAULT_PAGES_PER_JOB, analyzer_kwargs=None):
+    """
+    Divide os PDFs em jobs de até pages_per_job páginas.
+    Retorna:
+        lista de payloads (dict) dos jobs, na ordem (arquivo, página)
+    """
+    from analysis_engine import AnalysisEngine
+
+    engine = AnalysisEngine(pages_per_task=pages_per_job, analyzer_kwargs=analyzer_kwargs)
+    tasks, total_pages = engine.plan(pdf_files)
+    logger.info("%d páginas de %d arquivos divididas em %d jobs", total_pages, len(pdf_files), len(tasks))
+    return [{"pdf_path": os.path.abspath(task.pdf_path), "pdf_name": os.path.basename(task.pdf_path),
+             "file_index": task.file_index, "start": task.start, "stop": task.stop,
+             "analyzer_kwargs": engine.analyzer_kwargs} for task in tasks]
+
+
+def analyze_job(analyzer, payload):
+    """
+    Analisa as páginas de um job, com a renderização e a análise sobrepostas como no AnalysisEngine.
+    Retorna:
+        lista de registros [page_num, status, white_pixel_percentage, ocr_performed, extracted_text, details]
+    """
+    from analysis_engine import PIPELINE_DEPTH, page_source
+    from pipeline import threaded_stage
+
+    pages = page_source(payload["pdf_path"], payload["start"], payload["stop"])
+    prepared_pages = threaded_stage(((page_num, analyzer.prepare_page(page)) for page_num, page in pages),
+                                    maxsize=PIPELINE_DEPTH)
+    records = []
+    for page_num, prepared in prepared_pages:
+        verdict = analyzer.finish_page(prepared)
+        records.append([page_num + 1, verdict.status, verdict.white_pixel_percentage,
+                        bool(verdict.ocr_performed), verdict.extracted_text, verdict.details])
+    return records
+
+
+class Heartbeat:
+    def __init__(self, job_queue, job, worker_id, interval):
+        """
+        Renova o aluguel do job em uma thread própria enquanto o bloco `with` executa.
+        `lost` indica que o aluguel foi perdido (outro worker pode ter assumido o job).
+        """
+        self.job_queue = job_queue
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.job_queue.heartbeat(self.job.job_id, self.worker_id):
+                    self.lost = True
+                    logger.warning("Aluguel do job %s perdido.", self.job.job_id)
+                    return
+            except Exception as e:
+                # Falha transitória da fila; o aluguel ainda pode ser renovado na próxima vez
+                logger.warning("Falha ao renovar o aluguel do job %s: %s", self.job.job_id, e)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(job_queue, worker_id=None, cache_path=None, idle_exit=False, poll_interval=5.0, max_jobs=None,
+               dedup=True):
+    """
+    Aluga e processa jobs até a fila esvaziar (idle_exit) ou indefinidamente.
+    Retorna:
+        quantidade de jobs concluídos
+    """
+    from dedup import DedupIndex
+    from pdf_analyzer import PDFAnalyzer
+    from verdict_cache import VerdictCache
+
+    worker_id = worker_id or default_worker_id()
+    verdict_cache = VerdictCache(cache_path) if cache_path else None
+    dedup_index = DedupIndex(cache_path) if dedup else None
+    analyzers = {}  # Um PDFAnalyzer por configuração pedida pelos jobs
+    completed = 0
+    logger.info("Worker %s aguardando jobs...", worker_id)
+    while max_jobs is None or completed < max_jobs:
+        job = job_queue.lease(worker_id)
+        if job is None:
+            if idle_exit:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        payload = job.payload
+        config = json.dumps(payload.get("analyzer_kwargs", {}), sort_keys=True)
+        if config not in analyzers:
+            analyzers[config] = PDFAnalyzer(verdict_cache=verdict_cache, dedup_index=dedup_index,
+                                           **payload.get("analyzer_kwargs", {}))
+        analyzer = analyzers[config]
+        logger.info("Job %s: %s, páginas %d-%d (tentativa %d)", job.job_id, payload["pdf_name"],
+                    payload["start"] + 1, payload["stop"], job.attempts)
+        try:
+            with Heartbeat(job_queue, job, worker_id, job_queue.lease_seconds / 3) as heartbeat:
+                records = analyze_job(analyzer, payload)
+        except Exception as e:
+            logger.error("Job %s falhou: %s", job.job_id, e)
+            job_queue.fail(job.job_id, worker_id, e)
+            continue
+        if heartbeat.lost or not job_queue.complete(job.job_id, worker_id, {
+                "records": records, "metrics": analyzer.metrics.snapshot(reset=True)}):
+            logger.warning("Job %s foi assumido por outro worker; resultado descartado.", job.job_id)
+            continue
+        completed += 1
+    return completed
+
+
+def wait_for_run(job_queue, run_id, poll_interval=5.0):
+    """
+    Espera até que todos os jobs da execução estejam concluídos ou falhos, registrando o progresso.
+    """
+    last_progress = None
+    while True:
+        progress = job_queue.progress(run_id)
+        if progress != last_progress:
+            logger.info("Execução %s: %s", run_id, ", ".join(f"{state}: {count}" for state, count in
+                                                             sorted(progress.items())))
+            last_progress = progress
+        if not progress.get(STATE_PENDING) and not progress.get(STATE_LEASED):
+            return progress
+        time.sleep(poll_interval)
+
+
+def collect(job_queue, run_id, report_generator):
+    """
+    Junta os resultados dos jobs da execução no relatório, na ordem (arquivo, página), e soma as
+    métricas dos workers às do relatório.
+    Retorna:
+        ResultsAccumulator com as páginas coletadas, jobs sem resultado [(payload, erro)]
+    """
+    from results_accumulator import ResultsAccumulator
+
+    results = ResultsAccumulator()
+    missing = []
+    for payload, result, error in job_queue.results(run_id):
+        if result is None:
+            missing.append((payload, error))
+            continue
+        report_generator.metrics.merge(result["metrics"])
+        for page_num, status, white_pixel_percentage, ocr_performed, extracted_text, details in result["records"]:
+            report_generator.add_record(payload["pdf_name"], page_num, status, white_pixel_percentage,
+                                        ocr_performed, extracted_text, details)
+            results.add(payload["file_index"], page_num, status, white_pixel_percentage, ocr_performed,
+                        extracted_text, details)
+    return results, missing
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Análise distribuída de PDFs digitalizados.")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Nível de log (padrão: INFO).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_queue(command):
+        command.add_argument("--queue", required=True,
+                             help="Fila de jobs: caminho do arquivo SQLite compartilhado ou URL redis://.")
+        command.add_argument("--lease-seconds", type=float, default=120,
+                             help="Duração do aluguel de um job sem heartbeat (padrão: 120).")
+        command.add_argument("--max-attempts", type=int, default=3,
+                             help="Tentativas de um job antes de ser marcado como falho (padrão: 3).")
+
+    def add_submit_options(command):
+        command.add_argument("inputs", nargs="+", help="Arquivos PDF ou diretórios contendo PDFs.")
+        command.add_argument("--pages-per-job", type=int, default=DEFAULT_PAGES_PER_JOB,
+                             help="Páginas por job (padrão: %(default)s).")
+        add_analyzer_options(command)
+
+    def add_report_options(command):
+        command.add_argument("--report", required=True,
+                             help="Caminho do relatório consolidado (a extensão vem do formato).")
+        command.add_argument("--report-format", nargs="+", default=["xlsx"], choices=sorted(REPORT_SINKS),
+                             help="Formatos do relatório consolidado (padrão: xlsx).")
+        command.add_argument("--metrics", default=None,
+                             help="Grava o resumo das métricas de todos os workers neste arquivo JSON.")
+        command.add_argument("--poll-interval", type=float, default=5.0,
+                             help="Intervalo entre as verificações de progresso, em segundos.")
+
+    submit = commands.add_parser("submit", help="Publica os jobs e imprime o identificador da execução.")
+    add_queue(submit)
+    add_submit_options(submit)
+
+    coordinate = commands.add_parser("coordinate", help="Publica os jobs, espera os workers e gera o relatório.")
+    add_queue(coordinate)
+    add_submit_options(coordinate)
+    add_report_options(coordinate)
+
+    collect_command = commands.add_parser("collect", help="Gera o relatório de uma execução já publicada.")
+    collect_command.add_argument("run_id", help="Identificador impresso pelo submit.")
+    add_queue(collect_command)
+    add_report_options(collect_command)
+    collect_command.add_argument("--wait", action="store_true", help="Espera os jobs pendentes terminarem.")
+
+    worker = commands.add_parser("worker", help="Processa jobs da fila.")
+    add_queue(worker)
+    worker.add_argument("--worker-id", default=None, help="Identificador do worker (padrão: máquina:pid).")
+    worker.add_argument("--idle-exit", action="store_true", help="Encerra quando não houver jobs disponíveis.")
+    worker.add_argument("--poll-interval", type=float, default=5.0,
+                        help="Espera entre as consultas à fila vazia, em segundos.")
+    worker.add_argument("--tesseract-cmd", default=None, help="Caminho do executável do Tesseract.")
+    worker.add_argument("--tessdata", default=None, help="Diretório tessdata (define TESSDATA_PREFIX).")
+    worker.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="Arquivo do cache de vereditos local (padrão: %(default)s).")
+    worker.add_argument("--no-cache", action="store_true", help="Desativa o cache de vereditos.")
+    worker.add_argument("--no-dedup", action="store_true",
+                        help="Desativa o reaproveitamento do OCR de páginas quase idênticas.")
+    return parser
+
+
+def _submit(job_queue, args):
+    pdf_files = find_pdf_files(args.inputs)
+    if not pdf_files:
+        return None
+    run_id = new_run_id()
+    job_queue.publish(run_id, plan_jobs(pdf_files, args.pages_per_job, analyzer_kwargs_from_args(args)))
+    logger.info("Execução %s publicada.", run_id)
+    return run_id
+
+
+def _report(job_queue, run_id, args):
+    report_generator = ReportGenerator(formats=args.report_format, metrics=Metrics())
+    results, missing = collect(job_queue, run_id, report_generator)
+    summary = results.summary()
+    report_generator.finalize(args.report)
+    for payload, error in missing:
+        logger.error("Sem resultado: %s, páginas %d-%d (%s)", payload["pdf_name"], payload["start"] + 1,
+                     payload["stop"], error or "job não concluído")
+    print(f"Páginas analisadas: {summary['pages']}\n"
+          f"Páginas em branco: {summary['blank']}\n"
+          f"Jobs sem resultado: {len(missing)}", file=sys.stderr)
+    if args.metrics:
+        report_generator.metrics.save_json(args.metrics)
+    return 1 if missing else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    job_queue = open_job_queue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+    try:
+        if args.command == "worker":
+            if args.tesseract_cmd:
+                import pytesseract
+                pytesseract.pytesseract.tesseract_cmd = args.tesseract_cmd
+            if args.tessdata:
+                os.environ['TESSDATA_PREFIX'] = args.tessdata
+            run_worker(job_queue, args.worker_id, None if args.no_cache else args.cache, args.idle_exit,
+                       args.poll_interval, dedup=not args.no_dedup)
+            return 0
+
+        if args.command == "collect":
+            run_id = args.run_id
+            if args.wait:
+                wait_for_run(job_queue, run_id, args.poll_interval)
+            return _report(job_queue, run_id, args)
+
+        run_id = _submit(job_queue, args)
+        if run_id is None:
+            print("Nenhum arquivo PDF encontrado.", file=sys.stderr)
+            return 2
+        if args.command == "submit":
+            print(run_id)
+            return 0
+        wait_for_run(job_queue, run_id, args.poll_interval)
+        return _report(job_queue, run_id, args)
+    finally:
+        job_queue.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
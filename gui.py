@@ -1,22 +1,27 @@
+import logging
 import os
 import platform
 import subprocess
 import threading
-from tkinter import filedialog, messagebox, StringVar, Canvas, Label
-import fitz
+from tkinter import filedialog, messagebox, StringVar, BooleanVar, Canvas, Label
 from ttkthemes import ThemedTk
 from tkinter import ttk
 from PIL import Image, ImageTk
 from datetime import datetime
-import io
-import queue
-from pdf_analyzer import PDFAnalyzer
-from report_generator import ReportGenerator
-from analises import AnalysisScreen
+from itertools import groupby
+from preview_channel import PreviewChannel
+# O motor de análise (fitz, cv2, pytesseract), o gerador de relatórios (openpyxl) e a tela de análises
+# (pandas) são importados no primeiro uso, para que a janela abra rapidamente
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de atualização da interface durante a análise (ms): o custo na thread da interface
+# é fixo, qualquer que seja a velocidade da análise
+UI_REFRESH_MS = 100
 
 
 class PDFAnalyzerGUI:
-    def __init__(self):
+    def __init__(self, num_workers=None):
         # Inicializa os componentes da interface gráfica e outros atributos
         self.canvas = None
         self.open_folder_button = None
@@ -27,26 +32,32 @@ class PDFAnalyzerGUI:
         self.progress_label = None
         self.progress_var = None
         self.analyze_button = None
+        self.watch_button = None
         self.select_label = None
         self.timer_label = None  # Label do timer
+        self.workers_var = None
+        self.incremental_var = None
+        self.resume_var = None
+        self.canvas_image_id = None
         self.window = ThemedTk(theme="arc")
         self.window.title("Analisador de PDFs - Digitalizados")
         self.window.state("zoomed")  # Maximiza a janela
 
         # Diretório selecionado e instâncias de classes auxiliares
         self.directory = None
-        self.analyzer = PDFAnalyzer()
-        self.report_generator = ReportGenerator()
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.report_generator = None  # Criado a cada análise
+        self.watcher = None  # HotFolderWatcher enquanto a pasta é monitorada
 
-        # Fila para gerenciar progresso de processamento
-        self.progress_queue = queue.Queue()
+        # Canal com o último progresso e a última miniatura publicados pela thread de análise
+        self.preview = PreviewChannel()
 
         # Configurações de estilo e criação dos componentes da interface
         self.setup_style()
         self.create_widgets()
 
-        # Inicia o processamento da fila de progresso
-        self.process_queue()
+        # Inicia a atualização periódica da interface
+        self.refresh_ui()
 
         # Inicia a interface gráfica
         self.window.mainloop()
@@ -82,6 +93,37 @@ class PDFAnalyzerGUI:
         self.analyze_button = ttk.Button(main_frame, text="Iniciar Análise", state="disabled", command=self.start_analysis, width=25)
         self.analyze_button.pack(pady=10)
 
+        # Modo de pasta monitorada: analisa cada PDF que chega na pasta até ser interrompido
+        self.watch_button = ttk.Button(main_frame, text="Monitorar Pasta", state="disabled", command=self.toggle_watch,
+                                       width=25)
+        self.watch_button.pack(pady=5)
+
+        # Número de processos usados na análise
+        workers_frame = ttk.Frame(main_frame)
+        workers_frame.pack(pady=5)
+        ttk.Label(workers_frame, text="Processos de análise:").pack(side='left', padx=5)
+        self.workers_var = StringVar(value=str(self.num_workers))
+        workers_spinbox = ttk.Spinbox(workers_frame, from_=1, to=max(os.cpu_count() or 1, self.num_workers),
+                                      textvariable=self.workers_var, width=5)
+        workers_spinbox.pack(side='left')
+
+        # Análise incremental: só reanalisa PDFs novos ou modificados desde a última análise
+        self.incremental_var = BooleanVar(value=False)
+        incremental_check = ttk.Checkbutton(main_frame, text="Análise incremental (somente PDFs novos ou alterados)",
+                                            variable=self.incremental_var)
+        incremental_check.pack(pady=5)
+
+        # Retomada: pula as páginas gravadas no checkpoint de uma análise interrompida do mesmo diretório
+        self.resume_var = BooleanVar(value=True)
+        resume_check = ttk.Checkbutton(main_frame, text="Retomar análise interrompida", variable=self.resume_var)
+        resume_check.pack(pady=5)
+
+        # Leitura direta das digitalizações (PDFAnalyzer input_mode='auto'), sem renderizar a página
+        self.input_mode_var = BooleanVar(value=False)
+        input_mode_check = ttk.Checkbutton(main_frame, text="Ler diretamente as imagens digitalizadas",
+                                           variable=self.input_mode_var)
+        input_mode_check.pack(pady=5)
+
         # Barra de progresso
         self.progress_var = StringVar()
         self.progress_var.set("0")
@@ -114,82 +156,193 @@ class PDFAnalyzerGUI:
 
     def select_directory(self):
         # Abre um diálogo para selecionar o diretório contendo os arquivos PDF
+        if self.watcher is not None:
+            messagebox.showerror("Erro", "Pare o monitoramento antes de trocar de diretório.")
+            return
         self.directory = filedialog.askdirectory()
         if self.directory:
             self.select_label.config(text=f"Diretório Selecionado: {self.directory}")
             self.analyze_button.config(state="normal")  # Habilita o botão de análise
+            self.watch_button.config(state="normal")
+
+    def read_num_workers(self):
+        try:
+            self.num_workers = max(1, int(self.workers_var.get()))
+        except ValueError:
+            self.workers_var.set(str(self.num_workers))
+
+    def analyzer_kwargs(self):
+        # Parâmetros do PDFAnalyzer escolhidos na interface
+        return {"input_mode": "auto" if self.input_mode_var.get() else "render"}
 
     def start_analysis(self):
         # Inicia a análise dos PDFs no diretório selecionado em uma nova thread
         if self.directory:
             self.analyze_button.config(state="disabled")  # Desabilita o botão durante a análise
+            self.watch_button.config(state="disabled")
+            self.read_num_workers()
             threading.Thread(target=self.run_analysis_thread, daemon=True).start()
 
+    def toggle_watch(self):
+        # Inicia o monitoramento da pasta selecionada, ou o encerra se já estiver ativo
+        if self.watcher is not None:
+            self.watch_button.config(state="disabled")  # Reabilitado quando o monitoramento terminar
+            self.watcher.stop()
+            return
+        if not self.directory:
+            return
+        from watch_mode import HotFolderWatcher
+
+        self.read_num_workers()
+        self.analyze_button.config(state="disabled")
+        self.watch_button.config(text="Parar Monitoramento")
+        totals = {"pages": 0, "blank": 0}
+
+        def on_file(pdf_name, results, latency):
+            # Chamado na thread de análise: só publica o estado mais recente para a interface
+            from pdf_analyzer import BLANK_STATUSES
+            totals["pages"] += len(results)
+            totals["blank"] += sum(1 for result in results if result.status in BLANK_STATUSES)
+            self.preview.publish_progress(totals["pages"], totals["pages"], totals["blank"])
+            thumbnails = [result.thumbnail for result in results if result.thumbnail is not None]
+            if thumbnails:
+                self.preview.publish_frame(thumbnails[-1])
+
+        self.watcher = HotFolderWatcher(self.directory, on_file=on_file,
+                                        engine_kwargs={"num_workers": self.num_workers, "thumbnails": True,
+                                                       "analyzer_kwargs": self.analyzer_kwargs()})
+        threading.Thread(target=self.run_watch_thread, args=(self.watcher,), daemon=True).start()
+
+    def run_watch_thread(self, watcher):
+        # O loop asyncio do monitoramento roda nesta thread até toggle_watch pedir a parada
+        import asyncio
+        try:
+            asyncio.run(watcher.run())
+        except Exception as e:
+            logger.error("Erro no monitoramento da pasta: %s", e)
+        self.preview.finish(watcher.summary())
+
     def run_analysis_thread(self):
         # Executa a análise dos PDFs e gera um relatório
+        from report_generator import ReportGenerator
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_xlsx = os.path.join(self.directory, f"analysis_report_{timestamp}.xlsx")
+        # Um relatório novo a cada análise; o SQLite indexado ao lado da planilha é lido pela tela de análises
+        self.report_generator = ReportGenerator(formats=("xlsx", "sqlite"))
         self.analyze_pdfs_in_directory(output_xlsx)
 
     def analyze_pdfs_in_directory(self, output_xlsx):
         # Analisa todos os PDFs no diretório selecionado e gera um relatório
-        pdf_files = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.lower().endswith('.pdf')]
-        total_pages = sum(fitz.open(pdf_file).page_count for pdf_file in pdf_files)  # Calcula o total de páginas
+        from analysis_engine import AnalysisEngine
+        from checkpoint import DIRECTORY_CHECKPOINT_NAME, CheckpointJournal
+        from manifest import AnalysisManifest
+        from results_accumulator import ResultsAccumulator
+        from verdict_cache import DEFAULT_CACHE_PATH
+
+        pdf_files = sorted(os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                           if f.lower().endswith('.pdf'))
+        # As métricas dos workers e as da escrita do relatório ficam juntas
+        engine = AnalysisEngine(num_workers=self.num_workers, analyzer_kwargs=self.analyzer_kwargs(),
+                                cache_path=DEFAULT_CACHE_PATH, metrics=self.report_generator.metrics)
+
+        # No modo incremental, só arquivos novos ou modificados são analisados; os demais
+        # reaproveitam os registros do manifesto no relatório consolidado
+        manifest = AnalysisManifest(self.directory, engine.signature()) if self.incremental_var.get() else None
+        plan = manifest.plan(pdf_files) if manifest else [(pdf_file, None) for pdf_file in pdf_files]
+        files_to_analyze = [pdf_file for pdf_file, records in plan if records is None]
+
+        # As páginas concluídas vão para um checkpoint no diretório; se a análise for interrompida,
+        # a próxima (com os mesmos PDFs e parâmetros) pula essas páginas
+        journal = CheckpointJournal(os.path.join(self.directory, DIRECTORY_CHECKPOINT_NAME), engine.signature(),
+                                    files_to_analyze)
+        resumed_pages = journal.open(resume=self.resume_var.get())
+        # Divide os PDFs em intervalos de páginas
+        tasks, total_pages = engine.plan(files_to_analyze, journal.done_pages())
+        total_pages += resumed_pages
         total_pages_processed = 0
+        # Colunas compactas de todas as páginas (analisadas e reaproveitadas), para o progresso e o resumo
+        accumulator = ResultsAccumulator()
 
-        # Itera sobre cada arquivo PDF no diretório
-        for pdf_file in pdf_files:
-            pdf_name = os.path.basename(pdf_file)
-            with fitz.open(pdf_file) as pdf_document:
-                for page_num in range(pdf_document.page_count):
-                    # Carrega a página e converte para imagem
-                    page = pdf_document.load_page(page_num)
-                    pix = page.get_pixmap()
-                    img = Image.open(io.BytesIO(pix.tobytes("png")))
-
-                    # Realiza análise na página
-                    status, white_pixel_percentage, ocr_performed, extracted_text = self.analyzer.analyze_page(img)
-                    # Adiciona os resultados ao gerador de relatórios
-                    self.report_generator.add_record(pdf_name, page_num + 1, status, white_pixel_percentage,
-                                                     ocr_performed, extracted_text)
-
-                    # Atualizar labels e progresso
-                    total_pages_processed += 1
-                    self.update_labels(total_pages_processed)
-                    progress_percentage = (total_pages_processed / total_pages) * 100
-                    self.progress_queue.put(progress_percentage)
-
-                    # Enviar a imagem para ser exibida no canvas
-                    self.progress_queue.put(("image", img))
+        # Os resultados chegam dos workers já ordenados por arquivo e página, intercalados com os do checkpoint
+        try:
+            analyzed = groupby(journal.merge(engine.run(tasks)), key=lambda result: result.file_index)
+            current_group = next(analyzed, None)
+            file_index = 0
+            for plan_index, (pdf_file, records) in enumerate(plan):
+                pdf_name = os.path.basename(pdf_file)
+                if records is None:
+                    records = []
+                    if current_group is not None and current_group[0] == file_index:
+                        for result in current_group[1]:
+                            records.append([result.page_num, result.status, result.white_pixel_percentage,
+                                            result.ocr_performed, result.extracted_text, result.details])
+                            accumulator.add(plan_index, *records[-1])
+                            # Atualizar labels e progresso
+                            total_pages_processed += 1
+                            # Só o estado mais recente é publicado; a interface o lê no seu próprio ritmo
+                            self.preview.publish_progress(total_pages_processed, total_pages,
+                                                          accumulator.blank_count)
+                            if result.thumbnail is not None:
+                                self.preview.publish_frame(result.thumbnail)
+                        current_group = next(analyzed, None)
+                    file_index += 1
+                    if manifest:
+                        manifest.update(pdf_file, len(records), records)
+                else:
+                    for record in records:
+                        accumulator.add(plan_index, *record)
+                    self.preview.publish_progress(total_pages_processed, total_pages, accumulator.blank_count)
+
+                # Adiciona os resultados ao gerador de relatórios
+                for page_num, status, white_pixel_percentage, ocr_performed, extracted_text, details in records:
+                    self.report_generator.add_record(pdf_name, page_num, status, white_pixel_percentage,
+                                                     ocr_performed, extracted_text, details)
+        finally:
+            # Em caso de erro, as páginas concluídas até aqui ficam gravadas no checkpoint
+            journal.close()
 
         # Finaliza o relatório após processar todas as páginas
         self.report_generator.finalize(output_xlsx)
         if not os.path.exists(output_xlsx):
-            print("Erro: O relatório não foi criado.")
+            logger.error("O relatório não foi criado.")
             return
-        self.progress_queue.put("DONE")  # Indica que a análise foi concluída
-
-    def process_queue(self):
-        # Processa os itens da fila para atualizar a interface em tempo real
-        try:
-            while True:
-                message = self.progress_queue.get_nowait()
-                if isinstance(message, tuple) and message[0] == "image":
-                    # Exibe a imagem no canvas
-                    image = message[1]
-                    self.display_image_on_canvas(image)
-                elif isinstance(message, float) or isinstance(message, int):
-                    # Atualiza a barra de progresso
-                    self.update_progress(message)
-                elif message == "DONE":
-                    # Mostra mensagem de conclusão
-                    self.analyze_button.config(state="normal")
-                    messagebox.showinfo("Análise Concluída",
-                                        "A análise foi concluída e o relatório foi gerado com sucesso!")
-        except queue.Empty:
-            pass
-        # Verifica a fila novamente após 100 ms
-        self.window.after(100, self.process_queue)
+        journal.remove()
+        if manifest:
+            manifest.save()
+        summary = (f"Páginas analisadas: {total_pages_processed}\n"
+                   f"Páginas retomadas do checkpoint: {resumed_pages}\n"
+                   f"Arquivos reaproveitados do manifesto: {len(plan) - len(files_to_analyze)}\n"
+                   f"Páginas em branco: {accumulator.summary()['blank']}\n"
+                   f"Cache de vereditos: {engine.cache_hits} acertos, {engine.cache_misses} faltas")
+        logger.info(summary)
+        # Tempos por etapa e contadores da execução, ao lado do relatório
+        engine.metrics.save_json(os.path.splitext(output_xlsx)[0] + "_metrics.json")
+        self.preview.finish(summary)  # Indica que a análise foi concluída
+
+    def refresh_ui(self):
+        # Aplica o estado mais recente da análise: no máximo uma atualização de labels e progresso
+        # e uma miniatura por ciclo, descartando os estados intermediários
+        frame, progress, done = self.preview.take()
+        if progress is not None:
+            self.update_labels(progress.pages_processed, progress.pages_blank)
+            if progress.total_pages:
+                self.update_progress(progress.pages_processed / progress.total_pages * 100)
+        if frame is not None:
+            self.display_image_on_canvas(frame)
+        if done is not None and self.watcher is not None:
+            # Monitoramento encerrado: o relatório do dia já foi regenerado
+            self.watcher = None
+            self.analyze_button.config(state="normal")
+            self.watch_button.config(text="Monitorar Pasta", state="normal")
+            messagebox.showinfo("Monitoramento Encerrado", f"O relatório do dia foi atualizado.\n\n{done}")
+        elif done is not None:
+            # Mostra mensagem de conclusão com o resumo da execução
+            self.analyze_button.config(state="normal")
+            self.watch_button.config(state="normal")
+            messagebox.showinfo("Análise Concluída",
+                                "A análise foi concluída e o relatório foi gerado com sucesso!\n\n"
+                                f"{done}")
+        self.window.after(UI_REFRESH_MS, self.refresh_ui)
 
     def update_progress(self, percentage):
         # Atualiza o valor da barra de progresso e o texto exibido
@@ -198,16 +351,14 @@ class PDFAnalyzerGUI:
         self.progress_bar['value'] = percentage
         self.progress_bar.update_idletasks()
 
-    def update_labels(self, total_pages_checked):
+    def update_labels(self, total_pages_checked, pages_blank_count):
         # Atualiza as labels que exibem informações sobre a análise
         self.pages_blank_after_ocr_label.config(
-            text=f"Página em Branco após análises: {self.analyzer.pages_blank_after_ocr_count}")
+            text=f"Página em Branco após análises: {pages_blank_count}")
         self.pages_total_checked_label.config(
             text=f"Total de Páginas Verificadas: {total_pages_checked}")
 
     def display_image_on_canvas(self, image):
-        print("Exibindo imagem no canvas...")
-
         # Obtenha dimensões do canvas e da imagem
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
@@ -232,12 +383,14 @@ class PDFAnalyzerGUI:
         # Calcula a posição para centralizar a imagem no canvas
         x = (canvas_width - new_size[0]) // 2
         y = (canvas_height - new_size[1]) // 2
-        print(f"Posicionando imagem no canvas: ({x}, {y})")
 
-        # Exibe a imagem no canvas
+        # Exibe a imagem no canvas, reaproveitando o mesmo item a cada quadro
         tk_image = ImageTk.PhotoImage(image)
-        self.canvas.delete("all")
-        self.canvas.create_image(x, y, anchor="nw", image=tk_image)
+        if self.canvas_image_id is None:
+            self.canvas_image_id = self.canvas.create_image(x, y, anchor="nw", image=tk_image)
+        else:
+            self.canvas.coords(self.canvas_image_id, x, y)
+            self.canvas.itemconfig(self.canvas_image_id, image=tk_image)
         self.canvas.image = tk_image  # Evita que o Python faça coleta de lixo da imagem
 
     def open_folder(self):
@@ -259,22 +412,22 @@ class PDFAnalyzerGUI:
             messagebox.showerror("Erro", "Nenhum diretório selecionado.")
             return
 
-        # Encontra o arquivo de relatório mais recente com o padrão analysis_report_YYYYMMDD_HHMMSS.xlsx
-        report_files = [f for f in os.listdir(self.directory) if
-                        f.startswith("analysis_report_") and f.endswith(".xlsx")]
+        # Encontra o relatório mais recente: analysis_report_YYYYMMDD_HHMMSS.xlsx de uma análise ou
+        # analysis_report_YYYYMMDD_watch.sqlite3, o relatório do dia do monitoramento, atualizado a cada
+        # arquivo (a planilha do dia só é regenerada de tempos em tempos)
+        report_files = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if
+                        f.startswith("analysis_report_") and (f.endswith(".xlsx") or f.endswith("_watch.sqlite3"))]
 
         if not report_files:
             messagebox.showerror("Erro", "Nenhum relatório de análise encontrado.")
             return
 
-        # Ordena os relatórios por data de criação em ordem decrescente para obter o mais recente
-        report_files.sort(
-            key=lambda x: datetime.strptime(x.replace("analysis_report_", "").replace(".xlsx", ""), "%Y%m%d_%H%M%S"),
-            reverse=True)
-        analysis_report_path = os.path.join(self.directory, report_files[0])
+        # O relatório do dia é reescrito durante o monitoramento, então vale a data de modificação
+        analysis_report_path = max(report_files, key=os.path.getmtime)
 
         # Minimiza a janela principal antes de abrir a nova tela
         self.window.iconify()
 
         # Cria a tela de análises pendentes
+        from analises import AnalysisScreen
         AnalysisScreen(self.window, analysis_report_path)
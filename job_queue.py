@@ -0,0 +1,369 @@
+"""
+Filas de trabalho para a análise distribuída (ver distributed.py).
+
+Cada job é um intervalo de páginas de um PDF. Um worker "aluga" o job por lease_seconds e renova o
+aluguel (heartbeat) enquanto trabalha; se o worker morrer, o aluguel expira e o job volta a ser
+entregue a outro worker, até max_attempts tentativas. Só o dono atual do aluguel consegue concluir
+o job, então um worker que perdeu o aluguel não sobrescreve o resultado de outro.
+
+Backends:
+- SqliteJobQueue: um arquivo SQLite em um sistema de arquivos compartilhado (sem servidor);
+- RedisJobQueue: um servidor Redis (ou compatível), requer o pacote opcional 'redis'.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Job entregue a um worker: attempts conta também a tentativa atual
+Job = namedtuple("Job", ["job_id", "run_id", "payload", "attempts"])
+
+# Estados de um job
+STATE_PENDING = "pending"
+STATE_LEASED = "leased"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+
+def new_run_id():
+    return time.strftime("%Y%m%d_%H%M%S_") + uuid.uuid4().hex[:8]
+
+
+def default_worker_id():
+    import socket
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SqliteJobQueue:
+    def __init__(self, path, lease_seconds=120, max_attempts=3):
+        """
+        Fila de jobs em um arquivo SQLite, compartilhado entre as máquinas por um sistema de arquivos
+        de rede. O journal é o tradicional (DELETE) porque o WAL não funciona em sistemas de arquivos
+        de rede; cada operação é uma transação curta com BEGIN IMMEDIATE.
+
+        Args:
+            path (str): Caminho do arquivo SQLite.
+            lease_seconds (float): Duração do aluguel de um job sem heartbeat.
+            max_attempts (int): Tentativas de um job antes de ser marcado como falho.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Uma conexão por thread: o heartbeat roda em uma thread própria do worker
+        self._local = threading.local()
+        dir_path = os.path.dirname(path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id INTEGER PRIMARY KEY, run_id TEXT, payload TEXT, state TEXT, worker TEXT,"
+                " lease_expires REAL, attempts INTEGER DEFAULT 0, result TEXT, error TEXT)")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires)")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_run ON jobs (run_id, job_id)")
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # isolation_level=None: as transações são abertas explicitamente em _transaction
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=DELETE")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE reserva a escrita no início, para que dois workers não aluguem o mesmo job
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def publish(self, run_id, payloads):
+        with self._transaction() as connection:
+            connection.executemany("INSERT INTO jobs (run_id, payload, state) VALUES (?, ?, ?)",
+                                   [(run_id, json.dumps(payload), STATE_PENDING) for payload in payloads])
+
+    def lease(self, worker_id):
+        """
+        Aluga o próximo job pendente, ou um job cujo aluguel expirou (worker morto).
+        Retorna:
+            Job, ou None se não houver job disponível
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            self._fail_exhausted(connection, now)
+            row = connection.execute(
+                "SELECT job_id, run_id, payload, attempts FROM jobs WHERE state = ?"
+                " OR (state = ? AND lease_expires < ?) ORDER BY job_id LIMIT 1",
+                (STATE_PENDING, STATE_LEASED, now)).fetchone()
+            if row is None:
+                return None
+            job_id, run_id, payload, attempts = row
+            connection.execute(
+                "UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = ? WHERE job_id = ?",
+                (STATE_LEASED, worker_id, now + self.lease_seconds, attempts + 1, job_id))
+        return Job(job_id, run_id, json.loads(payload), attempts + 1)
+
+    def _fail_exhausted(self, connection, now):
+        # Jobs de workers mortos que já esgotaram as tentativas são encerrados como falhos
+        connection.execute(
+            "UPDATE jobs SET state = ?, error = 'aluguel expirado' WHERE state = ? AND lease_expires < ?"
+            " AND attempts >= ?", (STATE_FAILED, STATE_LEASED, now, self.max_attempts))
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Renova o aluguel. Retorna False se o worker não for mais o dono do job.
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND worker = ? AND state = ?",
+                (time.time() + self.lease_seconds, job_id, worker_id, STATE_LEASED))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result):
+        """
+        Grava o resultado do job. Retorna False se o worker não for mais o dono do job.
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = ?, result = ?, lease_expires = NULL WHERE job_id = ? AND worker = ?"
+                " AND state = ?", (STATE_DONE, json.dumps(result, ensure_ascii=False), job_id, worker_id,
+                                   STATE_LEASED))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Devolve o job à fila, ou o marca como falho se as tentativas se esgotaram.
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, lease_expires = NULL"
+                " WHERE job_id = ? AND worker = ? AND state = ?",
+                (self.max_attempts, STATE_FAILED, STATE_PENDING, str(error), job_id, worker_id, STATE_LEASED))
+
+    def progress(self, run_id):
+        """
+        Retorna:
+            dict {estado: quantidade de jobs} da execução
+        """
+        with self._transaction() as connection:
+            self._fail_exhausted(connection, time.time())
+            rows = connection.execute("SELECT state, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY state",
+                                      (run_id,)).fetchall()
+        return dict(rows)
+
+    def results(self, run_id):
+        """
+        Gera (payload, resultado ou None, erro ou None) de cada job da execução, na ordem de publicação.
+        """
+        cursor = self.connection.execute(
+            "SELECT payload, result, error FROM jobs WHERE run_id = ? ORDER BY job_id", (run_id,))
+        for payload, result, error in cursor:
+            yield json.loads(payload), json.loads(result) if result is not None else None, error
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+# Scripts Lua da fila Redis: cada operação roda inteira no servidor, sem que outro cliente execute comandos
+# no meio, então a verificação do dono do aluguel e a escrita são atômicas. As chaves dos jobs e dos
+# contadores são montadas a partir do prefixo (ARGV[1], ou o último argumento nos scripts de um job), o que
+# exige um Redis sem cluster.
+
+# Muda o estado de um job e atualiza os contadores de estados da execução ({prefix}:counts:{run_id}),
+# lidos por progress sem percorrer os jobs
+_REDIS_SET_STATE = """
+local function set_state(prefix, job_key, state)
+    local job = redis.call('HMGET', job_key, 'state', 'run_id')
+    if job[1] ~= state then
+        local counts_key = prefix .. ':counts:' .. job[2]
+        redis.call('HINCRBY', counts_key, job[1], -1)
+        redis.call('HINCRBY', counts_key, state, 1)
+        redis.call('HSET', job_key, 'state', state)
+    end
+end
+"""
+
+_REDIS_REQUEUE_EXPIRED = _REDIS_SET_STATE + """
+for _, job_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])) do
+    redis.call('ZREM', KEYS[2], job_id)
+    local job_key = ARGV[1] .. ':job:' .. job_id
+    set_state(ARGV[1], job_key, 'pending')
+    redis.call('HSET', job_key, 'worker', '')
+    redis.call('LPUSH', KEYS[1], job_id)
+end
+"""
+
+# KEYS: pending, leases; ARGV: prefixo, agora
+_REDIS_REQUEUE = _REDIS_REQUEUE_EXPIRED + "return 0"
+
+# KEYS: pending, leases; ARGV: prefixo, agora, worker, lease_seconds, max_attempts
+_REDIS_LEASE = _REDIS_REQUEUE_EXPIRED + """
+while true do
+    local job_id = redis.call('LPOP', KEYS[1])
+    if not job_id then
+        return false
+    end
+    local job_key = ARGV[1] .. ':job:' .. job_id
+    local attempts = redis.call('HINCRBY', job_key, 'attempts', 1)
+    if attempts > tonumber(ARGV[5]) then
+        set_state(ARGV[1], job_key, 'failed')
+        redis.call('HSET', job_key, 'error', 'tentativas esgotadas')
+    else
+        set_state(ARGV[1], job_key, 'leased')
+        redis.call('HSET', job_key, 'worker', ARGV[3])
+        redis.call('ZADD', KEYS[2], tonumber(ARGV[2]) + tonumber(ARGV[4]), job_id)
+        return {job_id, redis.call('HGET', job_key, 'run_id'), redis.call('HGET', job_key, 'payload'), attempts}
+    end
+end
+"""
+
+# Verificação do dono, comum às operações abaixo. KEYS: job, leases; ARGV: id, worker
+_REDIS_OWNS = """
+local owner = redis.call('HMGET', KEYS[1], 'worker', 'state')
+if owner[1] ~= ARGV[2] or owner[2] ~= 'leased' then
+    return 0
+end
+"""
+
+# ARGV: id, worker, nova expiração
+_REDIS_HEARTBEAT = _REDIS_OWNS + """
+redis.call('ZADD', KEYS[2], tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# ARGV: id, worker, resultado, prefixo
+_REDIS_COMPLETE = _REDIS_SET_STATE + _REDIS_OWNS + """
+redis.call('ZREM', KEYS[2], ARGV[1])
+set_state(ARGV[4], KEYS[1], 'done')
+redis.call('HSET', KEYS[1], 'result', ARGV[3])
+return 1
+"""
+
+# KEYS: job, leases, pending; ARGV: id, worker, erro, max_attempts, prefixo
+_REDIS_FAIL = _REDIS_SET_STATE + _REDIS_OWNS + """
+redis.call('ZREM', KEYS[2], ARGV[1])
+if tonumber(redis.call('HGET', KEYS[1], 'attempts')) >= tonumber(ARGV[4]) then
+    set_state(ARGV[5], KEYS[1], 'failed')
+    redis.call('HSET', KEYS[1], 'error', ARGV[3])
+else
+    set_state(ARGV[5], KEYS[1], 'pending')
+    redis.call('HSET', KEYS[1], 'error', ARGV[3], 'worker', '')
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+end
+return 1
+"""
+
+
+class RedisJobQueue:
+    # Jobs lidos por pipeline em results
+    batch_size = 500
+
+    def __init__(self, url, lease_seconds=120, max_attempts=3, prefix="blank_analyzer"):
+        """
+        Fila de jobs em um servidor Redis (ou compatível, com suporte a scripts Lua). Requer o pacote
+        'redis', que é opcional. Aluguel, heartbeat, conclusão e falha são scripts Lua, executados
+        atomicamente no servidor.
+
+        Chaves: {prefix}:pending (lista de ids), {prefix}:leases (sorted set id -> expiração do aluguel),
+        {prefix}:job:{id} (hash com o job), {prefix}:run:{run_id} (lista dos ids da execução) e
+        {prefix}:counts:{run_id} (hash estado -> número de jobs da execução, mantido pelos scripts).
+        """
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("A fila Redis requer o pacote 'redis' (pip install redis).")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.prefix = prefix
+        self._requeue_script = self.client.register_script(_REDIS_REQUEUE)
+        self._lease_script = self.client.register_script(_REDIS_LEASE)
+        self._heartbeat_script = self.client.register_script(_REDIS_HEARTBEAT)
+        self._complete_script = self.client.register_script(_REDIS_COMPLETE)
+        self._fail_script = self.client.register_script(_REDIS_FAIL)
+
+    def _key(self, *parts):
+        return ":".join((self.prefix,) + parts)
+
+    def publish(self, run_id, payloads):
+        # O pipeline roda em MULTI/EXEC: os jobs de uma execução são publicados juntos
+        pipe = self.client.pipeline()
+        first_id = self.client.incrby(self._key("next_id"), len(payloads)) - len(payloads) + 1
+        for job_id, payload in enumerate(payloads, start=first_id):
+            pipe.hset(self._key("job", str(job_id)), mapping={
+                "run_id": run_id, "payload": json.dumps(payload), "state": STATE_PENDING, "attempts": 0})
+            pipe.rpush(self._key("run", run_id), job_id)
+            pipe.rpush(self._key("pending"), job_id)
+        pipe.hincrby(self._key("counts", run_id), STATE_PENDING, len(payloads))
+        pipe.execute()
+
+    def _requeue_expired(self):
+        self._requeue_script(keys=[self._key("pending"), self._key("leases")], args=[self.prefix, time.time()])
+
+    def lease(self, worker_id):
+        # Devolve à fila os jobs de aluguel expirado e aluga o próximo, no mesmo script
+        job = self._lease_script(keys=[self._key("pending"), self._key("leases")],
+                                 args=[self.prefix, time.time(), worker_id, self.lease_seconds, self.max_attempts])
+        if job is None:
+            return None
+        job_id, run_id, payload, attempts = job
+        return Job(int(job_id), run_id, json.loads(payload), int(attempts))
+
+    def _job_keys(self, job_id):
+        return [self._key("job", str(job_id)), self._key("leases")]
+
+    def heartbeat(self, job_id, worker_id):
+        return self._heartbeat_script(keys=self._job_keys(job_id),
+                                      args=[job_id, worker_id, time.time() + self.lease_seconds]) == 1
+
+    def complete(self, job_id, worker_id, result):
+        return self._complete_script(keys=self._job_keys(job_id),
+                                     args=[job_id, worker_id, json.dumps(result, ensure_ascii=False),
+                                           self.prefix]) == 1
+
+    def fail(self, job_id, worker_id, error):
+        self._fail_script(keys=self._job_keys(job_id) + [self._key("pending")],
+                          args=[job_id, worker_id, str(error), self.max_attempts, self.prefix])
+
+    def progress(self, run_id):
+        # Contadores mantidos pelos scripts: uma leitura, sem percorrer os jobs da execução
+        self._requeue_expired()
+        return {state: int(count) for state, count in self.client.hgetall(self._key("counts", run_id)).items()
+                if int(count)}
+
+    def results(self, run_id):
+        # Os jobs são lidos em lotes de batch_size por pipeline, não um comando por job
+        job_ids = self.client.lrange(self._key("run", run_id), 0, -1)
+        for start in range(0, len(job_ids), self.batch_size):
+            pipe = self.client.pipeline(transaction=False)
+            for job_id in job_ids[start:start + self.batch_size]:
+                pipe.hgetall(self._key("job", job_id))
+            for job in pipe.execute():
+                result = job.get("result")
+                yield json.loads(job["payload"]), json.loads(result) if result else None, job.get("error") or None
+
+    def close(self):
+        self.client.close()
+
+
+def open_job_queue(location, **kwargs):
+    """
+    Abre a fila indicada por `location`: uma URL redis:// (ou rediss://) ou o caminho do arquivo SQLite.
+    """
+    if location.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobQueue(location, **kwargs)
+    return SqliteJobQueue(location, **kwargs)
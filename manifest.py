@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Nome do manifesto mantido ao lado dos relatórios, no diretório analisado
+MANIFEST_NAME = "analysis_manifest.json"
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """
+    Calcula o hash do conteúdo do arquivo em blocos, sem carregá-lo inteiro na memória.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AnalysisManifest:
+    def __init__(self, directory, signature=""):
+        """
+        Manifesto da análise incremental de um diretório: para cada PDF guarda tamanho, mtime,
+        número de páginas, hash do conteúdo e os registros de relatório da última análise.
+
+        Args:
+            directory (str): Diretório analisado (o manifesto fica nele).
+            signature (str): Identifica os parâmetros de análise; se mudar, todos os arquivos são reanalisados.
+        """
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.signature = signature
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as file:
+                    data = json.load(file)
+                if data.get("signature") == signature:
+                    self.entries = data.get("files", {})
+                else:
+                    logger.info("Parâmetros de análise alterados; o manifesto anterior será descartado.")
+            except (OSError, ValueError) as e:
+                logger.warning("Erro ao carregar o manifesto, todos os arquivos serão analisados: %s", e)
+
+    def is_unchanged(self, pdf_file):
+        """
+        Verifica se o arquivo corresponde à entrada do manifesto. Tamanho e mtime iguais bastam;
+        se só o mtime mudou, o hash do conteúdo decide (e a entrada é atualizada).
+        """
+        entry = self.entries.get(os.path.basename(pdf_file))
+        if entry is None:
+            return False
+        stat = os.stat(pdf_file)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime == entry["mtime"]:
+            return True
+        if file_hash(pdf_file) == entry["content_hash"]:
+            entry["mtime"] = stat.st_mtime
+            return True
+        return False
+
+    def plan(self, pdf_files):
+        """
+        Compara os PDFs atuais com o manifesto e remove as entradas de arquivos excluídos.
+        Retorna:
+            lista de (pdf_file, records), na ordem de pdf_files; records é None para arquivos
+            novos ou modificados, que precisam ser analisados.
+        """
+        current_names = {os.path.basename(pdf_file) for pdf_file in pdf_files}
+        for name in list(self.entries):
+            if name not in current_names:
+                logger.info("Arquivo removido do diretório, excluído do relatório: %s", name)
+                del self.entries[name]
+
+        plan = []
+        for pdf_file in pdf_files:
+            if self.is_unchanged(pdf_file):
+                plan.append((pdf_file, self.entries[os.path.basename(pdf_file)]["records"]))
+            else:
+                plan.append((pdf_file, None))
+        return plan
+
+    def update(self, pdf_file, page_count, records):
+        """
+        Registra o resultado da análise de um arquivo.
+
+        Args:
+            records (list): Registros [página, status, porcentagem de brancos, ocr realizado, texto, detalhes].
+        """
+        stat = os.stat(pdf_file)
+        self.entries[os.path.basename(pdf_file)] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "page_count": page_count,
+            "content_hash": file_hash(pdf_file),
+            "records": records,
+        }
+
+    def save(self):
+        # Grava em um arquivo temporário e substitui o original, para nunca deixar um manifesto truncado
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"signature": self.signature, "files": self.entries}, file, ensure_ascii=False)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,216 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Limites superiores (em milissegundos) dos buckets dos histogramas de tempo; o último bucket é ilimitado
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """
+    Histograma de durações com buckets fixos, que pode ser somado a outro (de outro processo).
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        milliseconds = seconds * 1000
+        index = 0
+        while index < len(BUCKET_BOUNDS_MS) and milliseconds > BUCKET_BOUNDS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, data):
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, data["buckets"])]
+        self.count += data["count"]
+        self.total += data["total"]
+        self.max = max(self.max, data["max"])
+
+    def percentile(self, fraction):
+        """
+        Percentil aproximado pelo limite superior do bucket (em segundos).
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return BUCKET_BOUNDS_MS[index] / 1000 if index < len(BUCKET_BOUNDS_MS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {"buckets": self.buckets, "count": self.count, "total": self.total, "max": self.max}
+
+
+class Metrics:
+    def __init__(self):
+        """
+        Métricas de uma execução: tempo de parede e de CPU por etapa (histogramas) e contadores.
+        Cada processo worker mantém as suas e as envia ao processo principal, que as soma com merge.
+        """
+        self.wall = {}
+        self.cpu = {}
+        self.counters = {}
+        # As etapas de renderização e de análise de um worker registram de threads diferentes
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mede o bloco como a etapa `name`. O tempo de CPU é o da thread atual.
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+
+    def record(self, name, wall_seconds, cpu_seconds):
+        # Registra uma duração já medida (por exemplo, somada de etapas executadas em threads diferentes)
+        with self._lock:
+            self.wall.setdefault(name, Histogram()).add(wall_seconds)
+            self.cpu.setdefault(name, Histogram()).add(cpu_seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self, reset=False):
+        """
+        Retorna as métricas em um dict serializável (e as zera, se reset), para envio entre processos.
+        """
+        with self._lock:
+            data = {
+                "wall": {name: histogram.to_dict() for name, histogram in self.wall.items()},
+                "cpu": {name: histogram.to_dict() for name, histogram in self.cpu.items()},
+                "counters": dict(self.counters),
+            }
+            if reset:
+                self.wall, self.cpu, self.counters = {}, {}, {}
+        return data
+
+    def merge(self, data):
+        # Soma as métricas de outro processo (Metrics.snapshot); as threads do processo podem estar registrando
+        with self._lock:
+            for kind in ("wall", "cpu"):
+                histograms = getattr(self, kind)
+                for name, histogram in data[kind].items():
+                    histograms.setdefault(name, Histogram()).merge(histogram)
+            for name, amount in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """
+        Resumo da execução: por etapa, quantidade, tempos totais e médios de parede e CPU e percentis
+        aproximados (p50, p95) do tempo de parede, em segundos; e os contadores.
+        """
+        stages = {}
+        with self._lock:
+            for name, wall in sorted(self.wall.items()):
+                cpu = self.cpu[name]
+                stages[name] = {
+                    "count": wall.count,
+                    "wall_total": wall.total,
+                    "wall_mean": wall.total / wall.count if wall.count else 0.0,
+                    "wall_p50": wall.percentile(0.5),
+                    "wall_p95": wall.percentile(0.95),
+                    "wall_max": wall.max,
+                    "cpu_total": cpu.total,
+                    "cpu_mean": cpu.total / cpu.count if cpu.count else 0.0,
+                    "histogram_ms": dict(zip([str(bound) for bound in BUCKET_BOUNDS_MS] + ["inf"], wall.buckets)),
+                }
+            counters = dict(sorted(self.counters.items()))
+        return {"stages": stages, "counters": counters}
+
+    def save_json(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2, ensure_ascii=False)
+
+
+class NullMetrics:
+    """
+    Métricas descartadas, com a mesma interface de Metrics: usadas quando quem chama a análise de uma
+    página não informa onde registrar os tempos e os contadores.
+    """
+
+    def stage(self, name):
+        return nullcontext()
+
+    def record(self, name, wall_seconds, cpu_seconds):
+        pass
+
+    def increment(self, name, amount=1):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Profiler:
+    def __init__(self, profile_dir):
+        """
+        Modo de profiling opcional: cada bloco ativo (active, profiled) usa um cProfile próprio, somado ao
+        perfil acumulado do processo ao final do bloco, e a soma é gravada em profile_dir/profile_<pid>.prof
+        (abrir com pstats ou snakeviz). Até o Python 3.11 o cProfile só mede a thread que o ativou, por isso
+        a renderização, que roda em uma thread própria (ver pipeline.threaded_stage), tem o seu bloco; a
+        partir do 3.12 o cProfile usa o sys.monitoring, mede todas as threads e só um pode estar ativo: o
+        bloco aninhado em outra thread não ativa outro perfil, porque o que está ativo já o mede.
+        Para o py-spy, prefira executar com um único worker, no próprio processo.
+        """
+        self.path = os.path.join(profile_dir, f"profile_{os.getpid()}.prof")
+        os.makedirs(profile_dir, exist_ok=True)
+        self._stats = None  # pstats.Stats com a soma dos blocos já encerrados
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def active(self, dump=True):
+        """
+        Ativa um perfil durante o bloco e o soma ao perfil acumulado no final. Com dump, grava a soma
+        (os workers do pool não têm um ponto de encerramento garantido).
+        """
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: outro perfil já está ativo e mede também esta thread
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+            if dump:
+                self.dump()
+
+    def profiled(self, items):
+        """
+        Percorre o gerador items com um perfil ativo na thread que o executa; usado nas etapas que
+        pipeline.threaded_stage executa em outra thread.
+        """
+        with self.active(dump=False):
+            yield from items
+
+    def dump(self):
+        # Os blocos ainda ativos (a renderização de outra tarefa) entram na próxima gravação
+        with self._lock:
+            if self._stats is not None:
+                self._stats.dump_stats(self.path)
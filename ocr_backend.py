@@ -0,0 +1,136 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class OcrError(Exception):
+    """
+    Falha de reconhecimento em um backend de OCR.
+    """
+
+
+def to_pil(image):
+    """
+    Os backends aceitam imagens PIL ou arrays NumPy (saída do pré-processamento).
+    """
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image)
+    return image
+
+
+class PytesseractBackend:
+    """
+    Backend baseado no pytesseract (executável do Tesseract). Uma imagem isolada usa um processo
+    por chamada; um lote de imagens é reconhecido por um único processo, que carrega os modelos
+    de idioma uma vez para todas elas (lista de arquivos como entrada do Tesseract).
+    """
+    name = "pytesseract"
+
+    def __init__(self, language, psm=6, oem=3):
+        # Importado só quando o backend é criado: a importação do pytesseract é lenta (verifica o pandas)
+        import pytesseract
+        self.pytesseract = pytesseract
+        self.language = language
+        self.config = f"--oem {oem} --psm {psm}"
+
+    def recognize(self, image):
+        try:
+            return self.pytesseract.image_to_string(to_pil(image), lang=self.language, config=self.config)
+        except self.pytesseract.TesseractError as e:
+            raise OcrError(str(e)) from e
+
+    def recognize_batch(self, images):
+        if len(images) <= 1:
+            return [self.recognize(image) for image in images]
+
+        temp_dir = tempfile.mkdtemp(prefix="ocr_batch_")
+        try:
+            image_paths = []
+            for index, image in enumerate(images):
+                image_path = os.path.join(temp_dir, f"{index:05d}.png")
+                to_pil(image).save(image_path)
+                image_paths.append(image_path)
+            list_path = os.path.join(temp_dir, "images.txt")
+            with open(list_path, "w", encoding="utf-8") as list_file:
+                list_file.write("\n".join(image_paths))
+
+            command = [self.pytesseract.pytesseract.tesseract_cmd, list_path, "stdout", "-l", self.language]
+            command += self.config.split()
+            completed = subprocess.run(command, capture_output=True)
+            if completed.returncode != 0:
+                raise OcrError(completed.stderr.decode("utf-8", errors="replace"))
+
+            # O Tesseract separa as páginas da saída com form feed
+            texts = completed.stdout.decode("utf-8", errors="replace").split("\f")
+            if texts and not texts[-1].strip():
+                texts.pop()
+            if len(texts) != len(images):
+                return [self.recognize(image) for image in images]
+            return texts
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def close(self):
+        pass
+
+
+class TesserocrBackend:
+    """
+    Backend baseado no tesserocr (API C do Tesseract). O engine e os modelos de idioma são
+    carregados uma única vez e reutilizados em todas as páginas do processo.
+    """
+    name = "tesserocr"
+
+    def __init__(self, language, psm=6, oem=3):
+        import tesserocr
+        tessdata_path = os.environ.get("TESSDATA_PREFIX")
+        kwargs = {"path": tessdata_path} if tessdata_path else {}
+        try:
+            self.api = tesserocr.PyTessBaseAPI(lang=language, psm=tesserocr.PSM(psm), oem=tesserocr.OEM(oem),
+                                               **kwargs)
+        except RuntimeError as e:
+            raise OcrError(str(e)) from e
+
+    def recognize(self, image):
+        image = to_pil(image)
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("L")
+        try:
+            self.api.SetImage(image)
+            return self.api.GetUTF8Text()
+        except RuntimeError as e:
+            raise OcrError(str(e)) from e
+
+    def recognize_batch(self, images):
+        return [self.recognize(image) for image in images]
+
+    def close(self):
+        self.api.End()
+
+
+# Backends disponíveis, por nome
+OCR_BACKENDS = {
+    "pytesseract": PytesseractBackend,
+    "tesserocr": TesserocrBackend,
+}
+
+
+def create_ocr_backend(name, language, psm=6, oem=3):
+    """
+    Cria o backend de OCR. 'auto' usa o tesserocr quando instalado e, caso contrário
+    (ou se ele não conseguir carregar os modelos), o pytesseract.
+    """
+    if name != "auto":
+        return OCR_BACKENDS[name](language, psm=psm, oem=oem)
+    try:
+        return TesserocrBackend(language, psm=psm, oem=oem)
+    except (ImportError, OcrError) as e:
+        logger.info("tesserocr indisponível (%s); usando pytesseract.", e)
+        return PytesseractBackend(language, psm=psm, oem=oem)
@@ -0,0 +1,97 @@
+import json
+from contextlib import nullcontext
+
+import cv2
+import numpy as np
+
+# Etapas padrão, equivalentes ao pré-processamento original feito com PIL: filtro mediano,
+# contraste 3.0, nitidez 2.5, contraste 2.0 e binarização com limiar 140
+DEFAULT_STEPS = [
+    ("median", {"ksize": 3}),
+    ("contrast", {"factor": 3.0}),
+    ("sharpness", {"factor": 2.5}),
+    ("contrast", {"factor": 2.0}),
+    ("threshold", {"level": 140}),
+]
+
+# Kernel do ImageFilter.SMOOTH do PIL, usado como imagem degenerada do ImageEnhance.Sharpness
+_SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13
+
+
+def median(gray_image, ksize=3):
+    return cv2.medianBlur(gray_image, ksize)
+
+
+def contrast(gray_image, factor):
+    """
+    Mesmo resultado do ImageEnhance.Contrast: afasta cada nível da média da imagem por `factor`,
+    aplicado como uma tabela de consulta (LUT).
+    """
+    mean = int(gray_image.mean() + 0.5)
+    lut = np.clip(np.round(mean + factor * (np.arange(256) - mean)), 0, 255).astype(np.uint8)
+    return cv2.LUT(gray_image, lut)
+
+
+def sharpness(gray_image, factor):
+    """
+    Mesmo resultado do ImageEnhance.Sharpness: interpola a partir da imagem suavizada por `factor`.
+    """
+    smooth = cv2.filter2D(gray_image, -1, _SMOOTH_KERNEL, borderType=cv2.BORDER_REPLICATE)
+    return cv2.addWeighted(gray_image, factor, smooth, 1 - factor, 0)
+
+
+def threshold(gray_image, level=140):
+    """
+    Binariza a imagem: níveis abaixo de `level` viram 0 e os demais 255.
+    """
+    return cv2.threshold(gray_image, level - 1, 255, cv2.THRESH_BINARY)[1]
+
+
+# Etapas disponíveis, por nome
+PREPROCESSING_STEPS = {
+    "median": median,
+    "contrast": contrast,
+    "sharpness": sharpness,
+    "threshold": threshold,
+}
+
+
+def load_steps(path):
+    """
+    Carrega a configuração das etapas de um arquivo JSON: [["median", {"ksize": 3}], ...].
+    As etapas são validadas aqui, antes de chegarem aos workers.
+    """
+    with open(path, encoding="utf-8") as file:
+        steps = [[name, params] for name, params in json.load(file)]
+    PreprocessingPipeline(steps)
+    return steps
+
+
+class PreprocessingPipeline:
+    def __init__(self, steps=None):
+        """
+        Pré-processamento da imagem para o OCR, com operações vetorizadas sobre o array em escala de cinza.
+
+        Args:
+            steps (list): Etapas [(nome, parâmetros)], com nomes de PREPROCESSING_STEPS. None usa DEFAULT_STEPS.
+        """
+        self.steps = [(name, dict(params)) for name, params in (steps or DEFAULT_STEPS)]
+        for name, _ in self.steps:
+            if name not in PREPROCESSING_STEPS:
+                raise ValueError(f"Etapa de pré-processamento desconhecida: {name}")
+
+    def signature(self):
+        """
+        Identifica a configuração das etapas (entra na chave do cache de vereditos).
+        """
+        return json.dumps(self.steps, sort_keys=True)
+
+    def run(self, gray_image, metrics=None):
+        """
+        Aplica as etapas em sequência. Com metrics, cada etapa é medida como a etapa
+        "ocr_preprocess:{posição}:{nome}" (a posição distingue etapas repetidas, como os dois contrastes).
+        """
+        for index, (name, params) in enumerate(self.steps):
+            with metrics.stage(f"ocr_preprocess:{index}:{name}") if metrics is not None else nullcontext():
+                gray_image = PREPROCESSING_STEPS[name](gray_image, **params)
+        return gray_image
@@ -0,0 +1,111 @@
+import logging
+import os
+from bisect import bisect_left
+
+import fitz
+
+logger = logging.getLogger(__name__)
+
+
+def remap_page(page_index, deleted_pages):
+    """
+    Novo índice de uma página depois da exclusão de `deleted_pages` (índices ordenados) do mesmo documento.
+    Retorna:
+        int, ou None se a própria página foi excluída
+    """
+    position = bisect_left(deleted_pages, page_index)
+    if position < len(deleted_pages) and deleted_pages[position] == page_index:
+        return None
+    return page_index - position
+
+
+class DeletionQueue:
+    def __init__(self):
+        """
+        Fila de páginas marcadas para exclusão, agrupadas por documento. Cada documento é
+        regravado uma única vez, com todas as suas páginas marcadas excluídas de uma vez.
+        """
+        self._pages = {}
+
+    def __len__(self):
+        return sum(len(pages) for pages in self._pages.values())
+
+    def __contains__(self, item):
+        pdf_path, page_index = item
+        return page_index in self._pages.get(pdf_path, ())
+
+    def add(self, pdf_path, page_index):
+        self._pages.setdefault(pdf_path, set()).add(page_index)
+
+    def discard(self, pdf_path, page_index):
+        pages = self._pages.get(pdf_path)
+        if pages is not None:
+            pages.discard(page_index)
+            if not pages:
+                del self._pages[pdf_path]
+
+    def toggle(self, pdf_path, page_index):
+        """
+        Marca a página ou, se já estiver marcada, desmarca. Retorna True se ficou marcada.
+        """
+        if (pdf_path, page_index) in self:
+            self.discard(pdf_path, page_index)
+            return False
+        self.add(pdf_path, page_index)
+        return True
+
+    def apply(self, incremental=False):
+        """
+        Exclui as páginas marcadas: um único delete_pages e um único salvamento por documento.
+        Documentos que ficariam sem nenhuma página são mantidos como estão.
+
+        Args:
+            incremental (bool): Salva de forma incremental (acrescenta as alterações ao fim do arquivo,
+                muito mais rápido em documentos grandes, mas sem reduzir o tamanho do arquivo). Se o
+                documento não permitir, ele é regravado por inteiro.
+        Retorna:
+            deleted (dict): {caminho do PDF: índices excluídos, ordenados}, para remapear as páginas restantes
+            errors (dict): {caminho do PDF: mensagem} dos documentos que não puderam ser alterados
+        """
+        deleted, errors = {}, {}
+        for pdf_path, pages in list(self._pages.items()):
+            try:
+                pages = self._delete_pages(pdf_path, pages, incremental)
+            except Exception as e:
+                logger.error("Erro ao deletar páginas de %s: %s", pdf_path, e)
+                errors[pdf_path] = str(e)
+                continue
+            del self._pages[pdf_path]
+            if pages is None:
+                errors[pdf_path] = "Não é possível deletar todas as páginas de um documento PDF."
+                continue
+            deleted[pdf_path] = pages
+            logger.info("%d página(s) deletada(s) de %s", len(pages), pdf_path)
+        return deleted, errors
+
+    @staticmethod
+    def _delete_pages(pdf_path, pages, incremental):
+        """
+        Exclui as páginas de um documento e o salva. Retorna os índices excluídos, ou None se
+        o documento ficaria sem páginas.
+        """
+        temp_pdf_path = None
+        pdf_document = fitz.open(pdf_path)
+        try:
+            pages = sorted(page for page in pages if page < pdf_document.page_count)
+            if len(pages) >= pdf_document.page_count:
+                return None
+            if not pages:
+                return pages
+            pdf_document.delete_pages(pages)
+            if incremental and pdf_document.can_save_incrementally():
+                pdf_document.save(pdf_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            else:
+                # Regravação completa em um arquivo temporário, que substitui o original
+                temp_pdf_path = os.path.splitext(pdf_path)[0] + "_temp.pdf"
+                pdf_document.save(temp_pdf_path, garbage=4, deflate=True)
+        finally:
+            pdf_document.close()
+        if temp_pdf_path:
+            os.replace(temp_pdf_path, pdf_path)
+        return pages
@@ -0,0 +1,158 @@
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
+
+import fitz
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Página a renderizar: o tamanho faz parte da chave, pois a imagem é gerada já no tamanho do canvas
+RenderKey = namedtuple("RenderKey", ["pdf_path", "page_index", "width", "height"])
+
+
+def render_page_image(page, width, height):
+    """
+    Renderiza a página com o PyMuPDF diretamente no maior tamanho que cabe em width x height,
+    sem rasterizar em resolução fixa e redimensionar depois.
+    """
+    scale = min(width / page.rect.width, height / page.rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+class PageRenderer:
+    def __init__(self, max_cached_pages=24, max_open_documents=4):
+        """
+        Renderiza páginas em uma thread de fundo, com cache LRU das imagens prontas e pré-carregamento
+        das páginas vizinhas. A página pedida para exibição tem prioridade sobre o pré-carregamento;
+        pedidos antigos ainda não atendidos são descartados quando chega um novo.
+
+        As imagens pedidas para exibição são entregues em `results` (fila de (RenderKey, imagem ou
+        exceção)), que a interface consome na sua própria thread.
+
+        Args:
+            max_cached_pages (int): Quantidade máxima de páginas renderizadas mantidas em memória.
+            max_open_documents (int): Quantidade de PDFs mantidos abertos pela thread de renderização.
+        """
+        self.max_cached_pages = max_cached_pages
+        self.max_open_documents = max_open_documents
+        self.results = queue.Queue()
+        self._cache = OrderedDict()
+        self._wanted = None
+        self._prefetch = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+        # Documentos abertos: usados só sob o _render_lock (o PyMuPDF não é thread-safe)
+        self._documents = OrderedDict()
+        self._render_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="page-renderer", daemon=True)
+        self._thread.start()
+
+    def get(self, key):
+        """
+        Retorna a imagem da página se já estiver no cache, ou None.
+        """
+        with self._condition:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+            return image
+
+    def request(self, key, prefetch=()):
+        """
+        Pede a renderização de `key` para exibição e o pré-carregamento de `prefetch`, substituindo
+        os pedidos anteriores ainda pendentes.
+        """
+        with self._condition:
+            self._wanted = key
+            self._prefetch = deque(prefetch)
+            self._condition.notify()
+
+    def invalidate(self, pdf_path):
+        """
+        Descarta as páginas renderizadas de um PDF (por exemplo, depois de alterá-lo).
+        """
+        with self._condition:
+            for key in [key for key in self._cache if key.pdf_path == pdf_path]:
+                del self._cache[key]
+
+    @contextmanager
+    def paused(self):
+        """
+        Suspende a renderização e fecha os documentos abertos durante o bloco, para que os arquivos
+        possam ser alterados ou substituídos (no Windows, um arquivo aberto não pode ser substituído).
+        """
+        with self._render_lock:
+            self._close_documents()
+            yield
+
+    def _close_documents(self):
+        while self._documents:
+            self._documents.popitem()[1][1].close()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _next_key(self):
+        """
+        Espera o próximo pedido. Retorna (RenderKey, se é para exibição) ou None ao encerrar.
+        """
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                if self._wanted is not None:
+                    key, self._wanted = self._wanted, None
+                    return key, True
+                while self._prefetch:
+                    key = self._prefetch.popleft()
+                    if key not in self._cache:
+                        return key, False
+                self._condition.wait()
+
+    def _document(self, pdf_path):
+        # Reabre o documento se o arquivo mudou desde que foi aberto
+        mtime = os.stat(pdf_path).st_mtime_ns
+        entry = self._documents.get(pdf_path)
+        if entry is not None and entry[0] != mtime:
+            entry[1].close()
+            entry = None
+        if entry is None:
+            entry = (mtime, fitz.open(pdf_path))
+            self._documents[pdf_path] = entry
+            while len(self._documents) > self.max_open_documents:
+                self._documents.popitem(last=False)[1][1].close()
+        self._documents.move_to_end(pdf_path)
+        return entry[1]
+
+    def _run(self):
+        while True:
+            request = self._next_key()
+            if request is None:
+                break
+            key, for_display = request
+            image = self.get(key)
+            if image is None:
+                try:
+                    with self._render_lock:
+                        pdf_document = self._document(key.pdf_path)
+                        image = render_page_image(pdf_document.load_page(key.page_index), key.width, key.height)
+                except Exception as e:
+                    logger.debug("Falha ao renderizar a página %d de %s: %s", key.page_index + 1, key.pdf_path, e)
+                    if for_display:
+                        self.results.put((key, e))
+                    continue
+                with self._condition:
+                    self._cache[key] = image
+                    while len(self._cache) > self.max_cached_pages:
+                        self._cache.popitem(last=False)
+            if for_display:
+                self.results.put((key, image))
+        with self._render_lock:
+            self._close_documents()
@@ -1,14 +1,124 @@
 import cv2
+import fitz
+import logging
 import numpy as np
 import re
-from PIL import Image, ImageEnhance, ImageFilter
+import time
+from collections import namedtuple
+from PIL import Image
 import io
-import pytesseract
-from spellchecker import SpellChecker
+
+from ocr_backend import OcrError, create_ocr_backend
+from metrics import NULL_METRICS, Metrics
+from ocr_preprocessing import PreprocessingPipeline
+from text_regions import TextRegionDetector
+from dedup import page_fingerprint
+from spelling import SymSpellCorrector
+from verdict_cache import page_digest
+
+logger = logging.getLogger(__name__)
+
+# Status possíveis de uma página, atribuídos por classify_page
+STATUS_OK = "OK"
+STATUS_CONTENT_AFTER_OCR = "Identificado conteúdo após reanálise"
+STATUS_BLANK_AFTER_OCR = "Página em branco após reanálise"
+STATUS_BLANK = "Página em branco"
+STATUSES = (STATUS_OK, STATUS_CONTENT_AFTER_OCR, STATUS_BLANK_AFTER_OCR, STATUS_BLANK)
+
+# Status atribuídos às páginas consideradas em branco ao final da análise
+BLANK_STATUSES = (STATUS_BLANK_AFTER_OCR, STATUS_BLANK)
+
+# Proporção removida de cada lateral da página para descartar bordas ruidosas
+CROP_PERCENT = 0.05
+
+# Versão do pré-processamento; deve ser incrementada sempre que uma mudança alterar os vereditos,
+# para invalidar as entradas do cache de vereditos
+PREPROCESSING_VERSION = 6
+
+# Etapa que decidiu se a página é em branco (registrada no relatório)
+TIER_COARSE = "Triagem em baixa resolução"
+TIER_FULL = "Limiarização completa"
+
+# Origem da imagem analisada (registrada no relatório)
+SOURCE_RENDER = "Renderização da página"
+SOURCE_EMBEDDED = "Imagem digitalizada embutida"
+
+
+class PageVerdict:
+    __slots__ = ("status", "white_pixel_percentage", "ocr_performed", "extracted_text", "tier", "source",
+                 "coarse_white_ratio", "text_regions", "text_region_area", "dedup", "cache")
+
+    # Campos gravados no dicionário details (cache de vereditos, checkpoint, relatório, saída JSON)
+    DETAIL_FIELDS = ("tier", "source", "coarse_white_ratio", "text_regions", "text_region_area", "dedup", "cache")
+
+    def __init__(self, status, white_pixel_percentage, ocr_performed, extracted_text, tier=None, source=None,
+                 coarse_white_ratio=None, text_regions=None, text_region_area=None, dedup=False, cache=None):
+        """
+        Veredito de uma página. Com __slots__, não há um dicionário por instância.
+
+        Args:
+            status (str): Um dos STATUSES.
+            white_pixel_percentage (float): Proporção de pixels brancos medida na limiarização completa;
+                None quando a triagem em baixa resolução decidiu a página.
+            ocr_performed (bool): Se o OCR foi executado na página (False quando o resultado veio da deduplicação).
+            extracted_text (str): Texto extraído pelo OCR.
+            tier (str): Etapa que decidiu se a página é em branco (TIER_COARSE ou TIER_FULL).
+            source (str): Origem da imagem analisada (SOURCE_RENDER ou SOURCE_EMBEDDED).
+            coarse_white_ratio (float): Estimativa da proporção de pixels brancos feita pela triagem em baixa
+                resolução, quando foi ela que decidiu a página (não é comparável à limiarização completa).
+            text_regions (int): Número de regiões de texto encontradas; None se a página não chegou ao OCR.
+            text_region_area (float): Fração da página ocupada pelas regiões de texto.
+            dedup (bool): Se o resultado do OCR veio de uma página quase idêntica do índice de deduplicação.
+            cache (str): "hit" se o veredito veio do cache de vereditos, "miss" se foi calculado e gravado nele.
+        """
+        self.status = status
+        self.white_pixel_percentage = white_pixel_percentage
+        self.ocr_performed = ocr_performed
+        self.extracted_text = extracted_text
+        self.tier = tier
+        self.source = source
+        self.coarse_white_ratio = coarse_white_ratio
+        self.text_regions = text_regions
+        self.text_region_area = text_region_area
+        self.dedup = dedup
+        self.cache = cache
+
+    @property
+    def details(self):
+        """
+        Campos de DETAIL_FIELDS preenchidos, no formato serializado (dict) usado pelo cache de vereditos,
+        pelo checkpoint e pelos relatórios.
+        """
+        details = {}
+        for name in self.DETAIL_FIELDS:
+            value = getattr(self, name)
+            if value is not None and value is not False:
+                details[name] = value
+        return details
+
+    @classmethod
+    def from_details(cls, status, white_pixel_percentage, ocr_performed, extracted_text, details):
+        """
+        Reconstrói um veredito gravado como (status, ..., details); chaves desconhecidas são ignoradas.
+        """
+        return cls(status, white_pixel_percentage, ocr_performed, extracted_text,
+                   **{name: details[name] for name in cls.DETAIL_FIELDS if name in details})
+
+
+# Página preparada pela etapa de renderização (prepare_page) para a etapa de análise (finish_page).
+# result: veredito (PageVerdict) já decidido (cache ou triagem), ou None;
+# gray_image/screening: entradas de analyze_page;
+# cache_key: chave no cache de vereditos; cached: se o veredito veio do cache;
+# wall/cpu: tempo gasto na preparação, somado ao page_total
+PreparedPage = namedtuple("PreparedPage", ["result", "gray_image", "screening", "source", "cache_key", "cached",
+                                           "wall", "cpu"])
 
 
 class PDFAnalyzer:
-    def __init__(self, min_text_length=20, pixel_threshold=0.98, language='eng+por'):
+    def __init__(self, min_text_length=20, pixel_threshold=0.98, language='eng+por', coarse_screening=True,
+                 coarse_scale=0.25, uncertainty_band=0.01, coarse_ink_gain=1.6, tile_grid=8, tile_ink_limit=0.02,
+                 input_mode='render', verdict_cache=None, ocr_backend='auto', preprocessing=None,
+                 text_regions=None, metrics=None, dedup_index=None):
         """
         Inicializa o analisador com parâmetros para OCR e métricas.
 
@@ -16,42 +126,226 @@ class PDFAnalyzer:
             min_text_length (int): Comprimento mínimo do texto para considerar OCR bem-sucedido.
             pixel_threshold (float): Limite de proporção de pixels brancos para considerar a página em branco.
             language (str): Idiomas para o Tesseract OCR.
+            coarse_screening (bool): Faz a triagem em baixa resolução antes da limiarização completa.
+                False reproduz o caminho exaustivo (limiarização completa em todas as páginas).
+            coarse_scale (float): Escala da renderização da triagem em relação à renderização completa.
+            uncertainty_band (float): Faixa em torno de pixel_threshold em que a triagem não decide
+                e a página segue para a limiarização completa.
+            coarse_ink_gain (float): Fator que calibra a tinta medida em baixa resolução para a escala
+                da limiarização completa (o traço fino perde contraste ao ser reduzido).
+            tile_grid (int): Número de blocos por lado usados no histograma de tinta da triagem.
+            tile_ink_limit (float): Proporção de tinta em um único bloco a partir da qual a triagem
+                não classifica a página como em branco (carimbos, números de página).
+            input_mode (str): 'render' sempre renderiza a página inteira; 'auto' decodifica diretamente,
+                em escala reduzida, a imagem de páginas que contêm apenas uma imagem digitalizada e
+                renderiza as demais. O MuPDF já reduz JPEGs na decodificação ao renderizar em baixa
+                escala, então o ganho de 'auto' depende do formato das digitalizações.
+            verdict_cache (VerdictCache): Cache persistente de vereditos consultado por analyze_pdf_page.
+            ocr_backend (str): Backend de OCR ('auto', 'tesserocr' ou 'pytesseract'), criado no primeiro uso
+                e mantido durante toda a vida do analisador.
+            preprocessing (list): Etapas do pré-processamento da imagem para o OCR
+                (ver ocr_preprocessing.PreprocessingPipeline). None usa as etapas padrão.
+            text_regions (dict): Parâmetros do detector de regiões de texto (ver text_regions.TextRegionDetector).
+                Só as regiões detectadas são enviadas ao OCR.
+            metrics (Metrics): Onde as etapas prepare_page e finish_page registram os tempos e os contadores.
+                None cria um novo.
+            dedup_index (DedupIndex): Índice de páginas quase idênticas já lidas pelo OCR, usado por finish_page;
+                uma página reconhecida nele reaproveita o resultado do OCR anterior sem chamar o Tesseract.
         """
-        print("Inicializando PDFAnalyzer...")
+        logger.debug("Inicializando PDFAnalyzer...")
         self.min_text_length = min_text_length
         self.pixel_threshold = pixel_threshold
         self.language = language
-        # Contadores para rastrear vários status de página
-        self.pages_blank_count = 0
-        self.pages_blank_after_ocr_count = 0
-        self.pages_ocr_analyzed_count = 0
-        self.total_characters = 0
-        self.correct_characters = 0
-        self.total_words = 0
-        self.correct_words = 0
-        # Inicializa o corretor ortográfico
-        self.spell = SpellChecker(language='pt')  # Ajuste o idioma conforme necessário
-        print("PDFAnalyzer inicializado com sucesso.")
-
-    def is_blank_or_noisy(self, image):
+        self.coarse_screening = coarse_screening
+        self.coarse_scale = coarse_scale
+        self.uncertainty_band = uncertainty_band
+        self.coarse_ink_gain = coarse_ink_gain
+        self.tile_grid = tile_grid
+        self.tile_ink_limit = tile_ink_limit
+        self.input_mode = input_mode
+        self.verdict_cache = verdict_cache
+        self.ocr_backend_name = ocr_backend
+        self._ocr = None
+        self.preprocessing = PreprocessingPipeline(preprocessing)
+        self.text_regions = TextRegionDetector(**(text_regions or {}))
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.dedup_index = dedup_index
+        # Corretor ortográfico (índice SymSpell sobre o dicionário do pyspellchecker), carregado no primeiro uso
+        self._spell = None
+        logger.debug("PDFAnalyzer inicializado com sucesso.")
+
+    def render_page(self, page, scale=1.0):
         """
-        Determina se a imagem é em branco ou ruidosa.
+        Renderiza a página do PDF diretamente em escala de cinza, já recortada em
+        CROP_PERCENT de cada lateral, sem passar por PNG nem por PIL.
+
+        Args:
+            page (fitz.Page): Página a ser renderizada.
+            scale (float): Escala em relação à renderização padrão (72 DPI).
+        Retorna:
+            gray_image (np.ndarray), pix (fitz.Pixmap)
+        O array é uma view sobre pix.samples; o pixmap precisa permanecer vivo enquanto o array for usado.
+        """
+        rect = page.rect
+        margin = rect.width * CROP_PERCENT
+        clip = fitz.Rect(rect.x0 + margin, rect.y0, rect.x1 - margin, rect.y1)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, clip=clip, alpha=False)
+        gray_image = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        return gray_image, pix
+
+    @property
+    def ocr(self):
+        """
+        Backend de OCR do analisador, criado (e com os modelos de idioma carregados) no primeiro uso.
+        """
+        if self._ocr is None:
+            self._ocr = create_ocr_backend(self.ocr_backend_name, self.language)
+            logger.info("Backend de OCR: %s", self._ocr.name)
+        return self._ocr
+
+    @property
+    def spell(self):
+        """
+        Corretor ortográfico, carregado só quando alguma página chega ao OCR.
+        """
+        if self._spell is None:
+            with self.metrics.stage("spelling_index_load"):
+                self._spell = SymSpellCorrector(language='pt')  # Ajuste o idioma conforme necessário
+        return self._spell
+
+    def find_scan_image(self, page):
+        """
+        Verifica se a página é uma digitalização: uma única imagem, sem máscara, cobrindo a página
+        inteira sem rotação, e nenhum texto visível ou desenho vetorial por cima.
+        Retorna:
+            (xref, image_rect) da imagem, ou None para páginas com conteúdo misto.
+        """
+        images = page.get_images(full=True)
+        if len(images) != 1 or page.rotation != 0:
+            return None
+        xref, smask = images[0][0], images[0][1]
+        if smask or page.parent.xref_get_key(xref, "ImageMask")[1] == "true":
+            return None
+
+        # get_image_info sem hashes é barato (não decodifica a imagem)
+        image_info = page.get_image_info()
+        if len(image_info) != 1 or image_info[0]["has-mask"]:
+            return None
+        a, b, c, d = image_info[0]["transform"][:4]
+        if b or c or a <= 0 or d <= 0:
+            return None
+        image_rect = fitz.Rect(image_info[0]["bbox"])
+        if not (image_rect + (-1, -1, 1, 1)).contains(page.rect):
+            return None
+
+        # Texto invisível (camada de OCR do scanner, tipo 3) não altera a imagem da página
+        if any(span["type"] != 3 for span in page.get_texttrace()) or page.get_drawings():
+            return None
+        return xref, image_rect
+
+    def decode_scan_image(self, page, scan_image, scale=1.0):
+        """
+        Decodifica a imagem digitalizada da página diretamente do stream (xref), já em escala reduzida,
+        e devolve o mesmo recorte em escala de cinza que render_page produziria nessa escala.
+        JPEGs usam o modo draft do PIL (escala DCT no decodificador); os demais filtros
+        (JBIG2, CCITT, Flate...) são decodificados pelo PyMuPDF e reduzidos com shrink.
         Retorna:
-            is_blank (bool), white_pixel_percentage (float), cropped_image (PIL.Image)
+            gray_image (np.ndarray), ou None se a imagem não puder ser decodificada por este caminho.
         """
-        print("Verificando se a imagem é em branco ou ruidosa...")
+        xref, image_rect = scan_image
+        pdf_document = page.parent
+        target_width = max(1, int(round(image_rect.width * scale)))
+        target_height = max(1, int(round(image_rect.height * scale)))
+
+        gray_image = None
+        if pdf_document.xref_get_key(xref, "Filter")[1] == "/DCTDecode":
+            with Image.open(io.BytesIO(pdf_document.xref_stream_raw(xref))) as jpeg:
+                if jpeg.mode in ("L", "RGB"):
+                    jpeg.draft("L", (target_width, target_height))
+                    gray_image = np.asarray(jpeg.convert("L"))
+        if gray_image is None:
+            pix = fitz.Pixmap(pdf_document, xref)
+            if pix.alpha:
+                return None
+            if pix.n != 1:
+                pix = fitz.Pixmap(fitz.csGRAY, pix)
+            factor = min(pix.width // target_width, pix.height // target_height)
+            if factor >= 2:
+                pix.shrink(int(np.log2(factor)))
+            gray_image = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+        if gray_image.shape != (target_height, target_width):
+            gray_image = cv2.resize(gray_image, (target_width, target_height), interpolation=cv2.INTER_AREA)
+
+        # Mesmo recorte lateral de render_page, convertido para as coordenadas da imagem
+        margin = page.rect.width * CROP_PERCENT
+        left = int(round((page.rect.x0 + margin - image_rect.x0) * scale))
+        right = int(round((page.rect.x1 - margin - image_rect.x0) * scale))
+        top = int(round((page.rect.y0 - image_rect.y0) * scale))
+        bottom = int(round((page.rect.y1 - image_rect.y0) * scale))
+        return np.ascontiguousarray(gray_image[max(0, top):bottom, max(0, left):right])
 
-        # Recorta 5% de cada lado para remover bordas potencialmente ruidosas
+    def to_cropped_gray(self, image):
+        """
+        Converte uma imagem PIL de página inteira para o formato usado pela análise:
+        array em escala de cinza com CROP_PERCENT removido de cada lateral.
+        """
         width, height = image.size
-        crop_percent = 0.05
-        left = int(width * crop_percent)
-        right = int(width * (1 - crop_percent))
-        cropped_image = image.crop((left, 0, right, height))
-        print(f"Imagem cortada para remover bordas: {left}px à {right}px")
+        left = int(width * CROP_PERCENT)
+        right = int(width * (1 - CROP_PERCENT))
+        logger.debug("Imagem cortada para remover bordas: %dpx à %dpx", left, right)
+        return np.asarray(image.crop((left, 0, right, height)).convert('L'))
+
+    def downsample(self, gray_image):
+        """
+        Reduz a página em escala de cinza para a escala da triagem (coarse_scale).
+        """
+        height, width = gray_image.shape[:2]
+        size = (max(1, int(width * self.coarse_scale)), max(1, int(height * self.coarse_scale)))
+        return cv2.resize(gray_image, size, interpolation=cv2.INTER_AREA)
+
+    def screen_coarse(self, coarse_image):
+        """
+        Triagem barata sobre a página em baixa resolução.
+
+        A tinta é medida como o quanto cada pixel é mais escuro que o fundo local (máximo
+        em uma vizinhança), o que se mantém aproximadamente constante na redução de escala,
+        e é calibrada por coarse_ink_gain. Também calcula a tinta de cada bloco de uma grade
+        tile_grid x tile_grid, para que pequenas marcas concentradas não passem como página em branco.
+        Retorna:
+            is_blank (bool | None), white_pixel_percentage (float)
+            is_blank é None quando a estimativa cai na faixa de incerteza.
+        """
+        background = cv2.dilate(coarse_image, np.ones((7, 7), np.uint8))
+        darkness = cv2.subtract(background, coarse_image)
+        darkness[darkness < 24] = 0  # Ignora a textura do papel e ruídos leves
+        ink = darkness.astype(np.float32) * (self.coarse_ink_gain / 255.0)
+
+        white_pixel_percentage = max(0.0, 1.0 - float(ink.mean()))
+        grid = (min(self.tile_grid, ink.shape[1]), min(self.tile_grid, ink.shape[0]))
+        max_tile_ink = float(cv2.resize(ink, grid, interpolation=cv2.INTER_AREA).max())
+        logger.debug("Triagem: proporção estimada de pixels brancos %.2f%%, maior tinta em bloco %.2f%%",
+                     white_pixel_percentage * 100, max_tile_ink * 100)
+
+        if white_pixel_percentage < self.pixel_threshold - self.uncertainty_band:
+            return False, white_pixel_percentage
+        if white_pixel_percentage >= self.pixel_threshold + self.uncertainty_band and \
+                max_tile_ink < self.tile_ink_limit:
+            return True, white_pixel_percentage
+        return None, white_pixel_percentage
+
+    def is_blank_or_noisy(self, gray_image):
+        """
+        Determina se a imagem é em branco ou ruidosa.
 
-        # Converte a imagem recortada para escala de cinza
-        gray_image = cv2.cvtColor(np.array(cropped_image), cv2.COLOR_RGB2GRAY)
-        print("Imagem convertida para escala de cinza.")
+        Args:
+            gray_image (np.ndarray): Página recortada em escala de cinza (ver render_page).
+                Uma imagem PIL de página inteira também é aceita e convertida.
+        Retorna:
+            is_blank (bool), white_pixel_percentage (float), gray_image (np.ndarray)
+        """
+        if not isinstance(gray_image, np.ndarray):
+            gray_image = self.to_cropped_gray(gray_image)
 
         # Aplica limiarização adaptativa para binarizar a imagem
         binary_image = cv2.adaptiveThreshold(
@@ -61,81 +355,103 @@ class PDFAnalyzer:
             blockSize=15,
             C=10
         )
-        print("Binarização adaptativa aplicada.")
 
         # Calcula a porcentagem de pixels brancos na imagem binarizada
         white_pixel_percentage = np.mean(binary_image == 255)
-        print(f"Proporção de pixels brancos: {white_pixel_percentage:.2%}")
 
         # Determina se a página é considerada em branco com base na porcentagem de pixels brancos
         is_blank = white_pixel_percentage >= self.pixel_threshold
-        print(f"Imagem é em branco: {is_blank}")
+        logger.debug("Proporção de pixels brancos: %.2f%%; em branco: %s", white_pixel_percentage * 100, is_blank)
 
-        return is_blank, white_pixel_percentage, cropped_image
+        return is_blank, white_pixel_percentage, gray_image
 
-    def perform_ocr_and_reclassify(self, cropped_image):
+    def perform_ocr_and_reclassify(self, cropped_image, metrics=NULL_METRICS, dedup_index=None):
+        """
+        Pré-processa a página, detecta as regiões de texto e faz o OCR apenas dos recortes dessas regiões.
 
-        print("Iniciando o processo de OCR e reclassificação...")
+        Args:
+            cropped_image (np.ndarray | PIL.Image): Página em escala de cinza já recortada.
+            metrics (Metrics): Onde registrar os tempos e os contadores (por padrão, descartados).
+            dedup_index (DedupIndex): Índice consultado antes do OCR e alimentado depois dele; None desativa.
+        Retorna:
+            ocr_successful (bool), corrected_text (str), regions (dict)
+            regions traz o número de regiões ("text_regions") e a fração da página que ocupam ("text_region_area");
+            "dedup" indica que o resultado veio de uma página quase idêntica do índice de deduplicação.
+        """
+        logger.debug("Iniciando o processo de OCR e reclassificação...")
+
+        # O pré-processamento trabalha sobre o array em escala de cinza; imagens PIL são convertidas
+        if not isinstance(cropped_image, np.ndarray):
+            cropped_image = np.asarray(cropped_image.convert('L'))
+
+        # Filtro mediano, contraste, nitidez e binarização, sem passar por PIL nem por PNG
+        with metrics.stage("ocr_preprocess"):
+            image_bw = self.preprocessing.run(cropped_image, metrics)
+
+        # Localiza as regiões com aparência de texto; o restante da página (papel em branco) não vai ao OCR
+        with metrics.stage("text_regions"):
+            boxes = self.text_regions.detect(image_bw)
+        regions = {
+            "text_regions": len(boxes),
+            "text_region_area": sum(width * height for _, _, width, height in boxes) / image_bw.size,
+        }
+        logger.debug("Regiões de texto encontradas: %d (%.2f%% da página)", regions["text_regions"],
+                     regions["text_region_area"] * 100)
+        if not boxes:
+            logger.debug("Nenhuma região de texto; OCR dispensado.")
+            metrics.increment("ocr_skipped_no_regions")
+            return False, "", regions
+
+        crops = self.text_regions.crops(image_bw, boxes)
+        fingerprint = None
+        if dedup_index is not None:
+            with metrics.stage("dedup_lookup"):
+                fingerprint = page_fingerprint(image_bw, boxes, crops)
+                match = dedup_index.find(fingerprint, self.cache_signature())
+            if match is not None:
+                ocr_successful, corrected_text = match
+                logger.debug("Página quase idêntica a uma já lida pelo OCR; resultado reaproveitado.")
+                metrics.increment("dedup_hit")
+                regions["dedup"] = True
+                return ocr_successful, corrected_text, regions
 
         try:
-            # Aplica filtro mediano para reduzir o ruído na imagem
-            cropped_image = cropped_image.filter(ImageFilter.MedianFilter(size=3))
-            print("Filtro mediano aplicado para reduzir ruído.")
-
-            # Aumenta o contraste e a nitidez para melhorar a precisão do OCR
-            cropped_image = ImageEnhance.Contrast(cropped_image).enhance(3.0)
-            print("Contraste da imagem aumentado.")
-            cropped_image = ImageEnhance.Sharpness(cropped_image).enhance(2.5)
-            print("Nitidez da imagem aumentada.")
-
-            # Ajusta o DPI e converte para preto e branco para melhores resultados de OCR
-            with io.BytesIO() as output:
-                cropped_image.save(output, format="PNG", dpi=(600, 600))
-                output.seek(0)
-                with Image.open(output) as image_dpi:
-                    image_bw = image_dpi.convert('L')
-                    image_bw = ImageEnhance.Contrast(image_bw).enhance(2.0)
-                    # Converte a imagem para binária (preto e branco) usando um limiar
-                    image_bw = image_bw.point(lambda x: 0 if x < 140 else 255, '1')
-                    print("Imagem convertida para preto e branco para OCR.")
-                    # Configuração do Tesseract para OCR
-                    custom_config = r'--oem 3 --psm 6'
-                    text = pytesseract.image_to_string(image_bw, lang=self.language, config=custom_config)
-                    print("OCR realizado com Tesseract.")
+            # OCR dos recortes em lote, com o backend persistente (--oem 3 --psm 6)
+            with metrics.stage("tesseract"):
+                text = "\n".join(self.ocr.recognize_batch(crops))
+            metrics.increment("ocr_regions", len(boxes))
 
             # Limpa o texto extraído removendo caracteres indesejados, mas preserva espaços para correção
             text = re.sub(r'[^A-Za-z0-9À-ÿ\s]', ' ', text)
             # Substitui múltiplos espaços por um único espaço
             text = re.sub(r'\s+', ' ', text).strip()
-            print(f"Texto extraído pelo OCR: {text[:50]}... (truncado)" if len(
-                text) > 50 else f"Texto extraído pelo OCR: {text}")
+            logger.debug("Texto extraído pelo OCR: %.50s", text)
 
             # Remove linhas, manchas e ruídos
             lines = text.splitlines()
             cleaned_lines = [line for line in lines if len(line.strip()) > 1 and not re.match(r'^[\W_]+$', line)]
             cleaned_text = ' '.join(cleaned_lines)
-            print(f"Texto limpo após remoção de linhas e ruídos: {cleaned_text[:50]}... (truncado)" if len(
-                cleaned_text) > 50 else f"Texto limpo após remoção de linhas e ruídos: {cleaned_text}")
+            logger.debug("Texto limpo após remoção de linhas e ruídos: %.50s", cleaned_text)
 
             # Realiza correção ortográfica
-            corrected_text = self.correct_spelling(cleaned_text)
-            print(f"Texto após correção ortográfica: {corrected_text[:50]}... (truncado)" if len(
-                corrected_text) > 50 else f"Texto após correção ortográfica: {corrected_text}")
+            with metrics.stage("spelling"):
+                corrected_text = self.correct_spelling(cleaned_text)
 
             # Determina se o OCR foi bem-sucedido com base no comprimento do texto limpo
             ocr_successful = len(corrected_text) >= self.min_text_length
-            print(f"OCR foi bem-sucedido: {ocr_successful}")
-            return ocr_successful, corrected_text
+            logger.debug("OCR foi bem-sucedido: %s", ocr_successful)
+            if fingerprint is not None:
+                dedup_index.add(fingerprint, self.cache_signature(), ocr_successful, corrected_text)
+            return ocr_successful, corrected_text, regions
 
-        except pytesseract.TesseractError as e:
-            print(f"Erro no OCR: {e}")
-            return False, ""
+        except OcrError as e:
+            logger.error("Erro no OCR: %s", e)
+            return False, "", regions
 
     def correct_spelling(self, text):
         """
-        Corrige erros ortográficos no texto utilizando SpellChecker.
+        Corrige erros ortográficos no texto utilizando o índice SymSpell (ver spelling.SymSpellCorrector).
         """
-        print("Iniciando correção ortográfica...")
         words = text.split()
         corrected_words = []
         for word in words:
@@ -147,49 +463,182 @@ class PDFAnalyzer:
                 correction = self.spell.correction(word)
                 if correction:
                     corrected_words.append(correction)
-                    print(f"Corrigido '{word}' para '{correction}'")
+                    logger.debug("Corrigido '%s' para '%s'", word, correction)
                 else:
                     corrected_words.append(word)
-                    print(f"Nenhuma correção encontrada para '{word}', mantendo original.")
+                    logger.debug("Nenhuma correção encontrada para '%s', mantendo original.", word)
         corrected_text = ' '.join(corrected_words)
-        print(f"Texto após correção ortográfica: {corrected_text[:50]}... (truncado)" if len(
-            corrected_text) > 50 else f"Texto após correção ortográfica: {corrected_text}")
+        logger.debug("Texto após correção ortográfica: %.50s", corrected_text)
         return corrected_text
 
-    def analyze_page(self, img):
+    def cache_signature(self):
+        """
+        Identifica os parâmetros que influenciam o veredito, para compor a chave do cache.
+        """
+        return "|".join(str(value) for value in (
+            PREPROCESSING_VERSION, self.min_text_length, self.pixel_threshold, self.language,
+            self.coarse_screening, self.coarse_scale, self.uncertainty_band, self.coarse_ink_gain,
+            self.tile_grid, self.tile_ink_limit, self.input_mode, self.preprocessing.signature(),
+            self.text_regions.signature(),
+        ))
+
+    def analyze_pdf_page(self, page):
+        """
+        Renderiza e analisa uma página do PDF (fitz.Page), consultando antes o cache de vereditos.
+        Páginas decididas como tendo conteúdo pela triagem nem chegam a ser renderizadas em resolução completa.
+        Equivale a finish_page(prepare_page(page)), com as duas etapas na mesma thread.
+        Retorna:
+            PageVerdict; cache indica se o veredito veio do cache ("hit") ou foi calculado ("miss").
+        """
+        return self.finish_page(self.prepare_page(page))
+
+    def prepare_page(self, page):
         """
-        Analisa a imagem de uma única página do PDF.
+        Etapa de renderização: consulta o cache de vereditos, faz a triagem em baixa resolução e renderiza
+        a página em resolução completa se a triagem não a decidir. É a única etapa que usa o PyMuPDF e deve
+        rodar na thread que abriu o documento; o PreparedPage retornado não referencia objetos do PyMuPDF
+        e pode seguir para finish_page em outra thread.
         Retorna:
-            status (str), white_pixel_percentage (float), ocr_performed (bool), extracted_text (str)
+            PreparedPage
         """
+        cache_key = None
+        if self.verdict_cache is not None:
+            with self.metrics.stage("cache_lookup"):
+                cache_key = self.verdict_cache.make_key(page_digest(page), self.cache_signature())
+                cached = self.verdict_cache.get(cache_key)
+            if cached is not None:
+                return PreparedPage(PageVerdict.from_details(*cached), None, None, None, cache_key, True, 0.0, 0.0)
+
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        scan_image = self.find_scan_image(page) if self.input_mode == 'auto' else None
+        source = SOURCE_EMBEDDED if scan_image else SOURCE_RENDER
+
+        screening = None
+        result = gray_image = None
+        if self.coarse_screening:
+            with self.metrics.stage("render_coarse"):
+                coarse_image = self.decode_scan_image(page, scan_image, self.coarse_scale) if scan_image else None
+                if coarse_image is None:
+                    scan_image, source = None, SOURCE_RENDER
+                    coarse_image, coarse_pix = self.render_page(page, self.coarse_scale)
+            with self.metrics.stage("coarse_screen"):
+                screening = self.screen_coarse(coarse_image)
+            if screening[0] is False:
+                result = self.classify_page(False, screening[1], None, TIER_COARSE, self.metrics)
+
+        if result is None:
+            with self.metrics.stage("render"):
+                gray_image = self.decode_scan_image(page, scan_image) if scan_image else None
+                if gray_image is None:
+                    gray_image, pix = self.render_page(page)
+                    source = SOURCE_RENDER
+                # Cópia própria quando o array é uma view sobre um pixmap, que não deve ser usado
+                # (nem liberado) fora desta thread
+                if not gray_image.flags.owndata:
+                    gray_image = gray_image.copy()
+        return PreparedPage(result, gray_image, screening, source, cache_key, False,
+                            time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+
+    def finish_page(self, prepared):
+        """
+        Etapa de análise: limiarização, OCR e classificação de uma página preparada por prepare_page,
+        e gravação do veredito no cache. As métricas e o índice de deduplicação do analisador são
+        repassados a analyze_page.
+        Retorna:
+            PageVerdict
+        """
+        if prepared.cached:
+            prepared.result.cache = "hit"
+            self.metrics.increment("cache_hit")
+            return prepared.result
+
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        result = prepared.result
+        if result is None:
+            result = self.analyze_page(prepared.gray_image, prepared.screening, self.metrics, self.dedup_index)
+        result.source = prepared.source
+        self.metrics.record("page_total", prepared.wall + time.perf_counter() - wall_start,
+                            prepared.cpu + time.thread_time() - cpu_start)
+        self.metrics.increment("pages")
+        self.metrics.increment(f"tier:{result.tier}")
+
+        if prepared.cache_key is not None:
+            self.verdict_cache.put(prepared.cache_key, result.status, result.white_pixel_percentage,
+                                   result.ocr_performed, result.extracted_text, result.details)
+            result.cache = "miss"
+            self.metrics.increment("cache_miss")
+        return result
+
+    def analyze_page(self, img, screening=None, metrics=NULL_METRICS, dedup_index=None):
+        """
+        Analisa a imagem de uma única página do PDF. Não altera o estado do analisador: as métricas e o
+        índice de deduplicação são os de quem chama (finish_page passa os do analisador), então pode ser
+        chamado por várias threads com a mesma instância.
+
+        Args:
+            img (np.ndarray | PIL.Image): Página em escala de cinza já recortada, ou imagem PIL da página inteira.
+            screening (tuple): Resultado de screen_coarse já calculado para a página, se houver.
+            metrics (Metrics): Onde registrar os tempos e os contadores (por padrão, descartados).
+            dedup_index (DedupIndex): Índice de deduplicação do OCR; None desativa.
+        Retorna:
+            PageVerdict; tier indica a etapa que decidiu se a página é em branco.
+        """
+        if not isinstance(img, np.ndarray):
+            with metrics.stage("crop_gray"):
+                img = self.to_cropped_gray(img)
+
+        if screening is None and self.coarse_screening:
+            screening = self.screen_coarse(self.downsample(img))
+
+        if screening is not None and screening[0] is not None:
+            # A triagem decidiu; a limiarização completa é dispensada
+            return self.classify_page(screening[0], screening[1], img, TIER_COARSE, metrics, dedup_index)
+
         # Verifica se a página é em branco ou ruidosa
-        is_blank, white_pixel_percentage, cropped_img = self.is_blank_or_noisy(img)
-        extracted_text = ""
-        ocr_performed = False
-        status = "OK"  # Status padrão se a página não for em branco
-
-        if is_blank:
-            # Incrementa o contador de páginas em branco
-            self.pages_blank_count += 1
-            # Realiza OCR na imagem recortada para reclassificar a página
-            ocr_successful, extracted_text = self.perform_ocr_and_reclassify(cropped_img)
-            ocr_performed = True
-
-            # Obtém o número de caracteres do texto extraído
-            quantidade_caracteres = len(extracted_text)
-
-            # Classificação com base nos resultados do OCR
-            if (ocr_successful or quantidade_caracteres >= 20) and white_pixel_percentage <= self.pixel_threshold:
-                # Se o OCR foi bem-sucedido ou houver 20 ou mais caracteres, classifica como tendo conteúdo após reanálise
-                status = "Identificado conteúdo após reanálise"
-                self.pages_ocr_analyzed_count += 1
-            elif quantidade_caracteres <= 15 and white_pixel_percentage >= self.pixel_threshold:
-                # Se houver 15 ou menos caracteres e uma alta porcentagem de pixels brancos, classifica como em branco com texto irrelevante
-                status = "Página em branco após reanálise"
-                self.pages_blank_after_ocr_count += 1
-            else:
-                # Caso contrário, classifica como em branco
-                status = "Página em branco"
-                self.pages_blank_after_ocr_count += 1
+        with metrics.stage("threshold"):
+            is_blank, white_pixel_percentage, gray_image = self.is_blank_or_noisy(img)
+        return self.classify_page(is_blank, white_pixel_percentage, gray_image, TIER_FULL, metrics, dedup_index)
+
+    def classify_page(self, is_blank, white_pixel_percentage, gray_image, tier, metrics=NULL_METRICS,
+                      dedup_index=None):
+        """
+        Classifica a página a partir da decisão de página em branco, realizando OCR quando necessário
+        (com as métricas e o índice de deduplicação de quem chama, como em analyze_page).
+        Com tier TIER_COARSE, white_pixel_percentage é a estimativa da triagem e vai para coarse_white_ratio.
+        Retorna:
+            PageVerdict
+        """
+        white_pixel_percentage = float(white_pixel_percentage)
+        # A estimativa em baixa resolução não é comparável à medida da limiarização completa e fica em um
+        # campo próprio
+        if tier == TIER_COARSE:
+            full_ratio, coarse_ratio = None, white_pixel_percentage
+        else:
+            full_ratio, coarse_ratio = white_pixel_percentage, None
+        if not is_blank:
+            return PageVerdict(STATUS_OK, full_ratio, False, "", tier=tier, coarse_white_ratio=coarse_ratio)
+
+        # Realiza OCR nas regiões de texto da imagem recortada para reclassificar a página
+        ocr_successful, extracted_text, regions = self.perform_ocr_and_reclassify(gray_image, metrics, dedup_index)
+        # Sem regiões de texto o OCR é dispensado; com o resultado reaproveitado pela deduplicação, o OCR
+        # não é executado nesta página (o reaproveitamento fica registrado só em dedup)
+        dedup = regions.get("dedup", False)
+        ocr_performed = regions["text_regions"] > 0 and not dedup
+
+        # Obtém o número de caracteres do texto extraído
+        quantidade_caracteres = len(extracted_text)
+
+        # Classificação com base nos resultados do OCR
+        if (ocr_successful or quantidade_caracteres >= 20) and white_pixel_percentage <= self.pixel_threshold:
+            # Se o OCR foi bem-sucedido ou houver 20 ou mais caracteres, classifica como tendo conteúdo após reanálise
+            status = STATUS_CONTENT_AFTER_OCR
+        elif quantidade_caracteres <= 15 and white_pixel_percentage >= self.pixel_threshold:
+            # Se houver 15 ou menos caracteres e uma alta porcentagem de pixels brancos, classifica como em branco com texto irrelevante
+            status = STATUS_BLANK_AFTER_OCR
+        else:
+            # Caso contrário, classifica como em branco
+            status = STATUS_BLANK
 
-        return status, white_pixel_percentage, ocr_performed, extracted_text
\ No newline at end of file
+        return PageVerdict(status, full_ratio, ocr_performed, extracted_text, tier=tier,
+                           coarse_white_ratio=coarse_ratio, text_regions=regions["text_regions"],
+                           text_region_area=regions["text_region_area"], dedup=dedup)
@@ -0,0 +1,59 @@
+import queue
+import threading
+
+# Marca o fim do gerador produtor na fila
+_END = object()
+
+
+def threaded_stage(items, maxsize=2):
+    """
+    Executa o gerador `items` em uma thread própria e entrega os seus itens por uma fila limitada,
+    para que essa etapa rode em paralelo com a etapa que consome os itens.
+
+    A fila limita a memória: a produtora fica no máximo `maxsize` itens à frente e espera o consumidor
+    (contrapressão). Uma exceção na produtora é relançada no consumidor. Se o consumidor parar antes do
+    fim, a produtora é interrompida e o gerador é fechado na própria thread dela (o que importa para
+    recursos que não podem mudar de thread, como documentos do PyMuPDF).
+
+    Args:
+        items (generator): Gerador da etapa produtora.
+        maxsize (int): Quantidade máxima de itens prontos aguardando o consumidor.
+    """
+    channel = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(entry):
+        # Espera espaço na fila, desistindo se o consumidor tiver parado
+        while not stop.is_set():
+            try:
+                channel.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        error = None
+        try:
+            for item in items:
+                if not put((item, None)):
+                    break
+        except BaseException as e:
+            error = e
+        finally:
+            items.close()
+        put((_END, error))
+
+    thread = threading.Thread(target=produce, name="pipeline-stage", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = channel.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
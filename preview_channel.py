@@ -0,0 +1,42 @@
+import threading
+from collections import namedtuple
+
+# Estado do progresso publicado pela thread de análise
+ProgressSnapshot = namedtuple("ProgressSnapshot", ["pages_processed", "total_pages", "pages_blank"])
+
+
+class PreviewChannel:
+    """
+    Canal entre a thread de análise e a interface. Guarda apenas o estado mais recente (última
+    miniatura e último progresso), sobrescrito a cada publicação; a interface o consulta em
+    intervalos fixos. Assim a memória e o custo da interface não dependem da velocidade da análise.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._progress = None
+        self._done = None
+
+    def publish_frame(self, thumbnail):
+        with self._lock:
+            self._frame = thumbnail
+
+    def publish_progress(self, pages_processed, total_pages, pages_blank):
+        with self._lock:
+            self._progress = ProgressSnapshot(pages_processed, total_pages, pages_blank)
+
+    def finish(self, summary):
+        with self._lock:
+            self._done = summary
+
+    def take(self):
+        """
+        Retorna o que mudou desde a última consulta e limpa o canal.
+        Retorna:
+            frame (PIL.Image | None), progress (ProgressSnapshot | None), done (str | None)
+        """
+        with self._lock:
+            frame, progress, done = self._frame, self._progress, self._done
+            self._frame = self._progress = self._done = None
+        return frame, progress, done
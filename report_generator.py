@@ -1,93 +1,302 @@
+import csv
+import logging
 import os
-from openpyxl import Workbook
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import PatternFill
+import shutil
+import sqlite3
+import tempfile
+import warnings
+
+from metrics import Metrics
+from results_store import build_indexes, create_schema
+
+logger = logging.getLogger(__name__)
+
+# Campos dos registros gravados nas saídas para consumo por máquina (CSV e Parquet)
+MACHINE_FIELDS = ["pdf_name", "page_num", "status", "white_pixel_percentage", "ocr_performed",
+                  "extracted_text", "decision_tier", "image_source", "text_regions", "text_region_area", "dedup",
+                  "coarse_white_ratio"]
+
+
+def report_row(pdf_name, page_num, status, white_pixel_percentage, ocr_performed, extracted_text, details):
+    """
+    Monta as duas formas de um registro do relatório.
+    Retorna:
+        row (colunas de ReportGenerator.headers, para a planilha), record (campos de MACHINE_FIELDS)
+    """
+    row = [
+        pdf_name,
+        page_num,
+        status,
+        # Páginas decididas pela triagem não têm a medida da limiarização completa, só a estimativa
+        f"{white_pixel_percentage:.2%}" if white_pixel_percentage is not None else "",
+        details.get("tier", ""),
+        details.get("source", ""),
+        details.get("text_regions", ""),
+        # Páginas cujo OCR foi reaproveitado de uma página quase idêntica
+        "Sim" if details.get("dedup") else "",
+        f"{details['coarse_white_ratio']:.2%}" if details.get("coarse_white_ratio") is not None else ""
+    ]
+    # Páginas que não passaram pela detecção de regiões (não chegaram ao OCR) ficam sem valor, assim como
+    # a proporção de pixels brancos das decididas pela triagem e a estimativa das demais
+    record = [pdf_name, page_num, status, white_pixel_percentage, bool(ocr_performed),
+              extracted_text, details.get("tier", ""), details.get("source", ""),
+              details.get("text_regions"), details.get("text_region_area"), bool(details.get("dedup")),
+              details.get("coarse_white_ratio")]
+    return row, record
+
+
+class XlsxReportSink:
+    """
+    Planilha Excel gerada no modo write-only do openpyxl, que grava cada linha assim que ela chega: nem a
+    memória nem o tempo do finalize crescem com o tamanho do relatório. No modo write-only as larguras das
+    colunas precisam ser definidas antes da primeira linha, então são estimadas pelos cabeçalhos e pelas
+    primeiras width_sample_rows linhas (guardadas até lá), com no máximo max_width caracteres.
+    """
+    extension = ".xlsx"
+    width_sample_rows = 1000
+    max_width = 60
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.row_count = 0
+        self.sample = []
+        self.workbook = self.sheet = self.fill = None
+
+    def write(self, row, record):
+        self.row_count += 1
+        if self.sheet is None:
+            self.sample.append(row)
+            if len(self.sample) >= self.width_sample_rows:
+                self._start()
+        else:
+            self._append(row)
+
+    def _start(self):
+        # O openpyxl só é importado quando a planilha é de fato gerada (a importação é lenta)
+        from openpyxl import Workbook
+        from openpyxl.styles import PatternFill
+        from openpyxl.utils import get_column_letter
+
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("PDF Analysis Report")
+        widths = [len(header) for header in self.headers]
+        for row in self.sample:
+            widths = [max(width, len(str(value))) for width, value in zip(widths, row)]
+        for column, width in enumerate(widths, start=1):
+            self.sheet.column_dimensions[get_column_letter(column)].width = min(width, self.max_width) + 2
+        self.fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
+        self.sheet.append(self.headers)
+        for row in self.sample:
+            self._append(row)
+        self.sample = []
+
+    def _append(self, row):
+        from openpyxl.cell import WriteOnlyCell
+
+        # Destaca em vermelho as linhas com status "Precisa de Atenção"
+        if row[2] == "Precisa de Atenção":
+            cells = []
+            for value in row:
+                cell = WriteOnlyCell(self.sheet, value=value)
+                cell.fill = self.fill
+                cells.append(cell)
+            row = cells
+        self.sheet.append(row)
+
+    def finalize(self, output_path):
+        from openpyxl.worksheet.filters import AutoFilter
+        from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+        from openpyxl.utils import get_column_letter
+
+        if self.sheet is None:
+            self._start()
+        ws = self.sheet
+
+        table_ref = f"A1:{get_column_letter(len(self.headers))}{self.row_count + 1}"
+        logger.debug("Criando tabela com referência: %s", table_ref)
+        # No modo write-only as colunas da tabela (com os nomes dos cabeçalhos) e o filtro são informados na criação
+        tab = Table(displayName="PDFAnalysisTable", ref=table_ref, autoFilter=AutoFilter(ref=table_ref),
+                    tableColumns=[TableColumn(id=index, name=header)
+                                  for index, header in enumerate(self.headers, start=1)])
+        tab.tableStyleInfo = TableStyleInfo(
+            name="TableStyleMedium9",
+            showFirstColumn=False,
+            showLastColumn=False,
+            showRowStripes=True,
+            showColumnStripes=True
+        )
+        with warnings.catch_warnings():
+            # O aviso sobre colunas da tabela no modo write-only não se aplica: elas foram nomeadas acima
+            warnings.simplefilter("ignore", UserWarning)
+            ws.add_table(tab)
+        self.workbook.save(output_path)
+
+
+class CsvReportSink:
+    """
+    Arquivo CSV com os campos de MACHINE_FIELDS, escrito à medida que os registros chegam.
+    """
+    extension = ".csv"
+
+    def __init__(self, headers):
+        self.file = tempfile.NamedTemporaryFile(mode="w", encoding="utf-8", newline="", suffix=".csv",
+                                                delete=False)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(MACHINE_FIELDS)
+
+    def write(self, row, record):
+        self.writer.writerow(record)
+
+    def finalize(self, output_path):
+        self.file.close()
+        shutil.move(self.file.name, output_path)
+
+
+class ParquetReportSink:
+    """
+    Arquivo Parquet com os campos de MACHINE_FIELDS, escrito em row groups de batch_size registros.
+    Requer o pyarrow, que é opcional.
+    """
+    extension = ".parquet"
+    batch_size = 50000
+
+    def __init__(self, headers):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("A saída Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("pdf_name", pa.string()), ("page_num", pa.int32()), ("status", pa.string()),
+            ("white_pixel_percentage", pa.float64()), ("ocr_performed", pa.bool_()),
+            ("extracted_text", pa.string()), ("decision_tier", pa.string()), ("image_source", pa.string()),
+            ("text_regions", pa.int32()), ("text_region_area", pa.float64()), ("dedup", pa.bool_()),
+            ("coarse_white_ratio", pa.float64()),
+        ])
+        self.path = tempfile.NamedTemporaryFile(suffix=".parquet", delete=False).name
+        self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.batch = []
+
+    def write(self, row, record):
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            columns = list(zip(*self.batch))
+            self.writer.write_table(self.pa.Table.from_arrays(
+                [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+                schema=self.schema))
+            self.batch = []
+
+    def finalize(self, output_path):
+        self.flush()
+        self.writer.close()
+        shutil.move(self.path, output_path)
+
+
+class SqliteReportSink:
+    """
+    Arquivo SQLite com os campos de MACHINE_FIELDS e índices por status e por arquivo/página, lido pela
+    tela de análises (ResultsStore) sem carregar o relatório inteiro. Os índices são criados no finalize,
+    depois da carga, que é feita em lotes de batch_size registros.
+    """
+    extension = ".sqlite3"
+    batch_size = 5000
+
+    def __init__(self, headers):
+        self.path = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False).name
+        self.connection = sqlite3.connect(self.path)
+        # Arquivo temporário até o finalize: não precisa de journal nem de sincronização a cada lote
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+        create_schema(self.connection, MACHINE_FIELDS)
+        self.insert = f"INSERT INTO pages VALUES ({', '.join('?' * len(MACHINE_FIELDS))})"
+        self.batch = []
+
+    def write(self, row, record):
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            with self.connection:
+                self.connection.executemany(self.insert, self.batch)
+            self.batch = []
+
+    def finalize(self, output_path):
+        self.flush()
+        with self.connection:
+            build_indexes(self.connection)
+        self.connection.close()
+        shutil.move(self.path, output_path)
+
+
+# Saídas disponíveis, por formato
+REPORT_SINKS = {
+    "xlsx": XlsxReportSink,
+    "csv": CsvReportSink,
+    "parquet": ParquetReportSink,
+    "sqlite": SqliteReportSink,
+}
 
 
 class ReportGenerator:
-    def __init__(self):
-        print("Inicializando ReportGenerator...")
-        self.wb = Workbook()
-        self.ws = self.wb.active
-        self.ws.title = "PDF Analysis Report"
-        self.headers = ["Arquivo PDF", "Página", "Status", "Porcentagem de Pixels Brancos"]
-        self.ws.append(self.headers)
-        print("Worksheet inicializada com cabeçalhos.")
-
-    def add_record(self, pdf_name, page_num, status, white_pixel_percentage, ocr_performed, extracted_text):
+    def __init__(self, formats=("xlsx",), metrics=None):
+        """
+        Gera o relatório da análise em um ou mais formatos, sem manter as linhas em memória.
+
+        Args:
+            formats (tuple): Formatos de saída (chaves de REPORT_SINKS). Cada formato é salvo no caminho
+                passado a finalize, com a extensão do formato.
+            metrics (Metrics): Onde registrar os tempos de escrita do relatório. None cria um novo.
+        """
+        logger.debug("Inicializando ReportGenerator...")
+        self.headers = ["Arquivo PDF", "Página", "Status", "Porcentagem de Pixels Brancos", "Etapa de Decisão",
+                        "Origem da Imagem", "Regiões de Texto", "Deduplicação", "Estimativa da Triagem"]
+        self.sinks = [REPORT_SINKS[report_format](self.headers) for report_format in formats]
+        self.metrics = metrics if metrics is not None else Metrics()
+        logger.debug("Saídas do relatório: %s", ", ".join(formats))
+
+    def add_record(self, pdf_name, page_num, status, white_pixel_percentage, ocr_performed, extracted_text,
+                   details=None):
+        details = details or {}
         try:
-            print(f"Adicionando registro: PDF Name={pdf_name}, Página={page_num}, Status={status}, Porcentagem de Pixels Brancos={white_pixel_percentage}")
-            row = [
-                pdf_name,
-                page_num,
-                status,
-                f"{white_pixel_percentage:.2%}"
-            ]
-            self.ws.append(row)
-            print(f"Linha adicionada na planilha: {row}")
-
-            # Highlight row in red if the status is "Precisa de Atenção"
-            if status == "Precisa de Atenção":
-                print("Status 'Precisa de Atenção' detectado. Destacando a linha em vermelho.")
-                fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-                for col_idx in range(1, len(row) + 1):
-                    cell = self.ws.cell(row=self.ws.max_row, column=col_idx)
-                    cell.fill = fill
-                    print(f"Célula {cell.coordinate} destacada em vermelho.")
-
-            print("Registro adicionado com sucesso.")
+            with self.metrics.stage("report_write"):
+                self._write_record(pdf_name, page_num, status, white_pixel_percentage, ocr_performed,
+                                   extracted_text, details)
         except Exception as e:
-            print(f"Erro ao adicionar registro: {e}")
+            logger.error("Erro ao adicionar registro: %s", e)
+
+    def _write_record(self, pdf_name, page_num, status, white_pixel_percentage, ocr_performed, extracted_text,
+                      details):
+        row, record = report_row(pdf_name, page_num, status, white_pixel_percentage, ocr_performed,
+                                 extracted_text, details)
+        for sink in self.sinks:
+            sink.write(row, record)
 
     def finalize(self, output_path):
-        print("Finalizando o relatório...")
+        logger.debug("Finalizando o relatório...")
 
         # Garantir que o diretório de destino existe
         dir_path = os.path.dirname(output_path)
-        if not os.path.exists(dir_path):
+        if dir_path and not os.path.exists(dir_path):
             try:
                 os.makedirs(dir_path)
-                print(f"Diretório criado: {dir_path}")
+                logger.info("Diretório criado: %s", dir_path)
             except OSError as e:
-                print(f"Erro ao criar o diretório: {e}")
+                logger.error("Erro ao criar o diretório: %s", e)
                 return
 
-        # Estilo da tabela e ajuste das colunas
-        try:
-            max_row = self.ws.max_row
-            max_col = self.ws.max_column
-            table_ref = f"A1:{get_column_letter(max_col)}{max_row}"
-            print(f"Criando tabela com referência: {table_ref}")
-            tab = Table(displayName="PDFAnalysisTable", ref=table_ref)
-            style = TableStyleInfo(
-                name="TableStyleMedium9",
-                showFirstColumn=False,
-                showLastColumn=False,
-                showRowStripes=True,
-                showColumnStripes=True
-            )
-            tab.tableStyleInfo = style
-            self.ws.add_table(tab)
-            print("Tabela criada com estilo aplicado.")
-
-            for col in self.ws.columns:
-                max_length = 0
-                column = col[0].column
-                column_letter = get_column_letter(column)
-                print(f"Ajustando largura da coluna {column_letter}...")
-                for cell in col:
-                    cell_value_length = len(str(cell.value))
-                    print(f"Célula {cell.coordinate} valor: '{cell.value}', comprimento: {cell_value_length}")
-                    max_length = max(max_length, cell_value_length)
-                adjusted_width = max_length + 2
-                self.ws.column_dimensions[column_letter].width = adjusted_width
-                print(f"Largura da coluna {column_letter} ajustada para {adjusted_width}.")
-
-            # Salvar o relatório
-            print(f"Salvando o relatório no caminho: {output_path}")
-            self.wb.save(output_path)
-            print(f"Relatório salvo em: {output_path}")
-
-        except Exception as e:
-            print(f"Erro ao salvar o relatório: {e}")
+        base_path = os.path.splitext(output_path)[0]
+        for sink in self.sinks:
+            sink_path = base_path + sink.extension
+            try:
+                with self.metrics.stage("report_finalize"):
+                    sink.finalize(sink_path)
+                logger.info("Relatório salvo em: %s", sink_path)
+            except Exception as e:
+                logger.error("Erro ao salvar o relatório: %s", e)
@@ -0,0 +1,135 @@
+import numpy as np
+
+from pdf_analyzer import BLANK_STATUSES, STATUSES
+
+# Bits da coluna flags
+FLAG_OCR_PERFORMED = 1
+FLAG_DEDUP = 2
+FLAG_CACHE_HIT = 4
+
+# Capacidade inicial das colunas; dobra sempre que enche
+INITIAL_CAPACITY = 1024
+
+
+class ResultsAccumulator:
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        """
+        Resultados das páginas em colunas NumPy (arquivo, página, código do status, código da etapa de
+        decisão, proporção de pixels brancos e flags), com os textos extraídos concatenados em um único
+        buffer UTF-8 endereçado por offsets. Cada página ocupa alguns bytes além do próprio texto, em vez
+        de uma tupla e um dicionário por página, e o resumo é calculado de uma vez sobre as colunas.
+
+        Args:
+            capacity (int): Capacidade inicial das colunas.
+        """
+        capacity = max(1, capacity)
+        self.count = 0
+        # Status e etapas viram códigos pequenos; valores fora de STATUSES ganham um código novo
+        self.status_names = list(STATUSES)
+        self._status_codes = {name: code for code, name in enumerate(self.status_names)}
+        self.tier_names = []
+        self._tier_codes = {}
+        self._blank_codes = {self._status_codes[name] for name in BLANK_STATUSES}
+        # Páginas em branco acumuladas, para o progresso na interface sem recalcular o resumo a cada página
+        self.blank_count = 0
+
+        self.file_index = np.empty(capacity, dtype=np.int32)
+        self.page_num = np.empty(capacity, dtype=np.int32)
+        self.status = np.empty(capacity, dtype=np.uint8)
+        self.tier = np.empty(capacity, dtype=np.uint8)
+        self.white_ratio = np.empty(capacity, dtype=np.float32)
+        self.flags = np.empty(capacity, dtype=np.uint8)
+        # O texto da página i ocupa text_offsets[i]:text_offsets[i + 1] no buffer
+        self.text_offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._text = bytearray()
+
+    def _grow(self):
+        capacity = len(self.status) * 2
+        for name in ("file_index", "page_num", "status", "tier", "white_ratio", "flags"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+        offsets = np.zeros(capacity + 1, dtype=np.int64)
+        offsets[:self.count + 1] = self.text_offsets[:self.count + 1]
+        self.text_offsets = offsets
+
+    @staticmethod
+    def _code(name, names, codes):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def _append(self, file_index, page_num, status, white_pixel_percentage, ocr_performed, extracted_text, tier,
+                dedup, cache):
+        if self.count == len(self.status):
+            self._grow()
+        index = self.count
+        status_code = self._code(status, self.status_names, self._status_codes)
+        self.file_index[index] = file_index
+        self.page_num[index] = page_num
+        self.status[index] = status_code
+        self.tier[index] = self._code(tier, self.tier_names, self._tier_codes)
+        # Páginas decididas pela triagem não têm a medida da limiarização completa (NaN na coluna)
+        self.white_ratio[index] = np.nan if white_pixel_percentage is None else white_pixel_percentage
+        self.flags[index] = ((FLAG_OCR_PERFORMED if ocr_performed else 0)
+                             | (FLAG_DEDUP if dedup else 0)
+                             | (FLAG_CACHE_HIT if cache == "hit" else 0))
+        if extracted_text:
+            self._text += extracted_text.encode("utf-8")
+        self.text_offsets[index + 1] = len(self._text)
+        self.count += 1
+        if status_code in self._blank_codes:
+            self.blank_count += 1
+
+    def add(self, file_index, page_num, status, white_pixel_percentage, ocr_performed, extracted_text, details=None):
+        """
+        Acrescenta uma página a partir de um registro serializado (manifesto, log da pasta monitorada, jobs).
+        """
+        details = details or {}
+        self._append(file_index, page_num, status, white_pixel_percentage, ocr_performed, extracted_text,
+                     details.get("tier", ""), details.get("dedup", False), details.get("cache"))
+
+    def add_result(self, result):
+        # PageResult: os campos são lidos diretamente, sem montar o dicionário details
+        self._append(result.file_index, result.page_num, result.status, result.white_pixel_percentage,
+                     result.ocr_performed, result.extracted_text, result.tier or "", result.dedup, result.cache)
+
+    def text(self, index):
+        return self._text[self.text_offsets[index]:self.text_offsets[index + 1]].decode("utf-8")
+
+    def blank_mask(self):
+        return np.isin(self.status[:self.count], sorted(self._blank_codes))
+
+    def summary(self):
+        """
+        Resume as páginas acumuladas com operações sobre as colunas inteiras.
+        Retorna:
+            dict com o total de páginas, as contagens por status e por etapa de decisão, as páginas em
+            branco (total e por arquivo, indexado por file_index), com OCR, com OCR reaproveitado por
+            deduplicação e resolvidas pelo cache, a média da proporção de pixels brancos (só das páginas medidas
+            pela limiarização completa) e o tamanho dos textos
+        """
+        count = self.count
+        status = self.status[:count]
+        flags = self.flags[:count]
+        blank = self.blank_mask()
+        status_counts = np.bincount(status, minlength=len(self.status_names))
+        tier_counts = np.bincount(self.tier[:count], minlength=len(self.tier_names))
+        files = int(self.file_index[:count].max()) + 1 if count else 0
+        white_ratio = self.white_ratio[:count]
+        white_ratio = white_ratio[~np.isnan(white_ratio)]
+        return {
+            "pages": count,
+            "status": {name: int(total) for name, total in zip(self.status_names, status_counts) if total},
+            "tier": {name: int(total) for name, total in zip(self.tier_names, tier_counts) if total and name},
+            "blank": int(np.count_nonzero(blank)),
+            "blank_per_file": np.bincount(self.file_index[:count][blank], minlength=files).tolist(),
+            "ocr_performed": int(np.count_nonzero(flags & FLAG_OCR_PERFORMED)),
+            "dedup": int(np.count_nonzero(flags & FLAG_DEDUP)),
+            "cache_hits": int(np.count_nonzero(flags & FLAG_CACHE_HIT)),
+            "mean_white_ratio": float(white_ratio.mean(dtype=np.float64)) if len(white_ratio) else 0.0,
+            "text_bytes": int(self.text_offsets[count]),
+        }
@@ -0,0 +1,121 @@
+import sqlite3
+
+# Status das páginas que não precisam de revisão
+STATUS_OK = "OK"
+
+
+def create_schema(connection, fields):
+    """
+    Cria a tabela `pages`, com uma coluna por campo (na ordem de MACHINE_FIELDS), e a tabela
+    `pending`, com as páginas a revisar numeradas em sequência (position), na ordem do relatório.
+    """
+    connection.execute(f"CREATE TABLE IF NOT EXISTS pages ({', '.join(fields)})")
+    connection.execute("CREATE TABLE IF NOT EXISTS pending (position INTEGER PRIMARY KEY, pdf_name TEXT,"
+                       " page_num INTEGER)")
+
+
+def build_indexes(connection):
+    """
+    Cria os índices por status e por arquivo/página e preenche a tabela `pending` (uma entrada por
+    arquivo e página, mesmo que repetidos no relatório). Executado uma vez, depois da carga.
+    """
+    connection.execute("CREATE INDEX IF NOT EXISTS pages_status ON pages (status)")
+    connection.execute("CREATE INDEX IF NOT EXISTS pages_file_page ON pages (pdf_name, page_num)")
+    connection.execute("DELETE FROM pending")
+    connection.execute(
+        "INSERT INTO pending (position, pdf_name, page_num)"
+        " SELECT ROW_NUMBER() OVER (ORDER BY first_row) - 1, pdf_name, page_num FROM"
+        " (SELECT MIN(rowid) AS first_row, pdf_name, page_num FROM pages WHERE status != ?"
+        "  GROUP BY pdf_name, page_num)", (STATUS_OK,))
+    connection.execute("CREATE INDEX IF NOT EXISTS pending_file_page ON pending (pdf_name, page_num)")
+
+
+def append_pending(connection, first_rowid):
+    """
+    Acrescenta à tabela `pending` as páginas a revisar das linhas de `pages` a partir de first_rowid,
+    com os índices já criados (relatório gravado aos poucos, como o do monitoramento de pasta).
+    """
+    connection.execute(
+        "INSERT INTO pending (position, pdf_name, page_num)"
+        " SELECT (SELECT COALESCE(MAX(position), -1) FROM pending) + ROW_NUMBER() OVER (ORDER BY first_row),"
+        " pdf_name, page_num FROM"
+        " (SELECT MIN(rowid) AS first_row, pdf_name, page_num FROM pages WHERE rowid >= ? AND status != ?"
+        "  AND NOT EXISTS (SELECT 1 FROM pending WHERE pending.pdf_name = pages.pdf_name"
+        "   AND pending.page_num = pages.page_num)"
+        "  GROUP BY pdf_name, page_num)", (first_rowid, STATUS_OK))
+
+
+class ResultsStore:
+    def __init__(self, path):
+        """
+        Acesso ao arquivo SQLite gerado ao lado do relatório (formato "sqlite" do ReportGenerator).
+        As consultas usam os índices, então o custo não cresce com o tamanho do relatório.
+
+        Args:
+            path (str): Caminho do arquivo SQLite.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+
+    @classmethod
+    def from_pending(cls, pending_pages):
+        """
+        Cria um store em memória a partir de uma lista de (pdf_name, page_num) a revisar, para
+        relatórios que não têm o arquivo SQLite (gerados por versões anteriores).
+        """
+        store = cls(":memory:")
+        with store.connection:
+            create_schema(store.connection, ["pdf_name", "page_num", "status"])
+            store.connection.executemany("INSERT INTO pending (position, pdf_name, page_num) VALUES (?, ?, ?)",
+                                         [(position, pdf_name, int(page_num))
+                                          for position, (pdf_name, page_num) in enumerate(pending_pages)])
+        return store
+
+    def pending_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def pending_rows(self, offset, limit):
+        """
+        Retorna:
+            lista de (pdf_name, page_num) das páginas a revisar nas posições offset .. offset + limit - 1
+        """
+        return self.connection.execute(
+            "SELECT pdf_name, page_num FROM pending WHERE position >= ? ORDER BY position LIMIT ?",
+            (offset, limit)).fetchall()
+
+    def apply_deletions(self, deleted):
+        """
+        Atualiza o store depois da exclusão de páginas dos PDFs: remove as páginas excluídas,
+        renumera as demais páginas dos documentos alterados e as posições da lista de revisão.
+
+        Args:
+            deleted (dict): {pdf_name: índices (a partir de zero) excluídos, ordenados}
+        """
+        # Importado aqui: page_deletion depende do PyMuPDF, desnecessário para só consultar o store
+        from page_deletion import remap_page
+
+        with self.connection:
+            for pdf_name, pages in deleted.items():
+                for table, key in (("pages", "rowid"), ("pending", "position")):
+                    removed, renumbered = [], []
+                    for row_key, page_num in self.connection.execute(
+                            f"SELECT {key}, page_num FROM {table} WHERE pdf_name = ?", (pdf_name,)).fetchall():
+                        page_index = remap_page(int(page_num) - 1, pages)
+                        if page_index is None:
+                            removed.append((row_key,))
+                        else:
+                            renumbered.append((page_index + 1, row_key))
+                    self.connection.executemany(f"DELETE FROM {table} WHERE {key} = ?", removed)
+                    self.connection.executemany(f"UPDATE {table} SET page_num = ? WHERE {key} = ?", renumbered)
+
+            # Posições contíguas de novo; os valores negativos intermediários evitam colisões na chave
+            self.connection.execute("CREATE TEMP TABLE renumber (old INTEGER PRIMARY KEY, new INTEGER)")
+            self.connection.execute("INSERT INTO renumber SELECT position, ROW_NUMBER() OVER (ORDER BY position) - 1"
+                                    " FROM pending")
+            self.connection.execute("UPDATE pending SET position = -1 - (SELECT new FROM renumber"
+                                    " WHERE old = pending.position)")
+            self.connection.execute("UPDATE pending SET position = -1 - position")
+            self.connection.execute("DROP TABLE renumber")
+
+    def close(self):
+        self.connection.close()
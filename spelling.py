@@ -0,0 +1,227 @@
+import logging
+import os
+import re
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Diretório padrão do índice pré-calculado, ao lado do cache de vereditos
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".blank_analyzer")
+
+# Vogais usadas no filtro de tokens sem chance de correção
+VOWELS = set("aeiouáéíóúâêôãõàüy")
+
+
+def _deletes(term, max_distance):
+    """
+    Gera o termo e todas as variações obtidas removendo até max_distance caracteres.
+    """
+    results = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) > 1:
+                for index in range(len(item)):
+                    next_frontier.add(item[:index] + item[index + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def strip_accents(text):
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def _hash(term):
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def osa_distance(source, target, max_distance):
+    """
+    Distância de edição com transposições adjacentes (as mesmas operações do pyspellchecker),
+    interrompida assim que ultrapassa max_distance. Retorna max_distance + 1 nesse caso.
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        row_min = i
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1 and source[i - 1] == target[j - 2]
+                    and source[i - 2] == target[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SymSpellCorrector:
+    def __init__(self, language='pt', max_distance=2, prefix_length=6, max_token_length=20, memo_size=100000,
+                 index_dir=DEFAULT_INDEX_DIR):
+        """
+        Corretor ortográfico com índice de deleções simétricas (estilo SymSpell) sobre o dicionário
+        do pyspellchecker. O índice é calculado uma vez e salvo em disco.
+
+        Args:
+            language (str): Idioma do dicionário do pyspellchecker.
+            max_distance (int): Distância máxima de edição das correções (a mesma do pyspellchecker).
+            prefix_length (int): Só o prefixo das palavras entra no índice, o que limita o seu tamanho.
+            max_token_length (int): Tokens maiores que isso não são corrigidos.
+            memo_size (int): Tamanho do memo LRU token -> correção, compartilhado entre as páginas.
+            index_dir (str): Diretório do índice em disco.
+        """
+        self.language = language
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.max_token_length = max_token_length
+        self.memo_size = memo_size
+        self.memo = OrderedDict()
+
+        index_path = os.path.join(index_dir, f"symspell_{language}_d{max_distance}_p{prefix_length}.npz")
+        if os.path.exists(index_path):
+            self._load(index_path)
+        else:
+            self._build(index_path)
+        self.frequencies = dict(zip(self.words, self.word_frequencies.tolist()))
+        self._build_histograms()
+
+    def _build(self, index_path):
+        from spellchecker import SpellChecker
+        logger.info("Construindo o índice de correção ortográfica (somente na primeira execução)...")
+        dictionary = SpellChecker(language=self.language).word_frequency.dictionary
+        self.words = list(dictionary)
+        self.word_frequencies = np.fromiter((dictionary[word] for word in self.words), dtype=np.int64,
+                                            count=len(self.words))
+
+        keys = []
+        word_ids = []
+        for word_id, word in enumerate(self.words):
+            for term in _deletes(word[:self.prefix_length], self.max_distance):
+                keys.append(_hash(term))
+                word_ids.append(word_id)
+        keys = np.array(keys, dtype=np.uint32)
+        word_ids = np.array(word_ids, dtype=np.int32)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.word_ids = word_ids[order]
+
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        # Nome temporário por processo: vários workers podem construir o índice ao mesmo tempo
+        temp_path = f"{index_path}.{os.getpid()}.tmp.npz"
+        np.savez(temp_path, keys=self.keys, word_ids=self.word_ids, word_frequencies=self.word_frequencies,
+                 words=np.frombuffer("\n".join(self.words).encode("utf-8"), dtype=np.uint8))
+        os.replace(temp_path, index_path)
+        logger.info("Índice salvo em %s", index_path)
+
+    def _build_histograms(self):
+        """
+        Calcula, de forma vetorizada, o tamanho e o histograma de caracteres de cada palavra.
+        Cada edição altera a soma das diferenças entre histogramas em no máximo 2, o que permite
+        descartar candidatos sem calcular a distância de edição.
+        """
+        self.word_lengths = np.fromiter((len(word) for word in self.words), dtype=np.int16, count=len(self.words))
+        codepoints = np.frombuffer("".join(self.words).encode("utf-32-le"), dtype=np.uint32)
+        self.alphabet = np.unique(codepoints)
+        codes = np.searchsorted(self.alphabet, codepoints)
+        owners = np.repeat(np.arange(len(self.words)), self.word_lengths)
+        # Um caractere fora do alfabeto do dicionário ocupa a última coluna
+        alphabet_size = len(self.alphabet) + 1
+        self.histograms = np.bincount(owners * alphabet_size + codes, minlength=len(self.words) * alphabet_size) \
+            .reshape(len(self.words), alphabet_size).astype(np.uint8)
+
+    def _token_histogram(self, token):
+        codepoints = np.frombuffer(token.encode("utf-32-le"), dtype=np.uint32)
+        codes = np.searchsorted(self.alphabet, codepoints)
+        known = codes < len(self.alphabet)
+        known[known] = self.alphabet[codes[known]] == codepoints[known]
+        codes[~known] = len(self.alphabet)
+        return np.bincount(codes, minlength=len(self.alphabet) + 1).astype(np.int16)
+
+    def _load(self, index_path):
+        with np.load(index_path) as data:
+            self.keys = data["keys"]
+            self.word_ids = data["word_ids"]
+            self.word_frequencies = data["word_frequencies"]
+            self.words = data["words"].tobytes().decode("utf-8").split("\n")
+
+    def __contains__(self, word):
+        return word in self.frequencies
+
+    def is_hopeless(self, token):
+        """
+        Filtra tokens que não vale a pena corrigir: longos demais, com dígitos, sem vogais
+        ou com um mesmo caractere repetido três vezes seguidas (ruído típico de OCR).
+        """
+        return (len(token) > self.max_token_length or len(token) < 2 or any(char.isdigit() for char in token)
+                or not VOWELS.intersection(token) or re.search(r"(.)\1\1", token) is not None)
+
+    def lookup(self, token):
+        """
+        Procura a palavra do dicionário mais próxima do token: menor distância e, no empate,
+        maior frequência. Retorna None se não houver palavra a até max_distance edições.
+        """
+        hashes = np.array([_hash(term) for term in _deletes(token[:self.prefix_length], self.max_distance)],
+                          dtype=np.uint32)
+        starts = np.searchsorted(self.keys, hashes, side="left")
+        stops = np.searchsorted(self.keys, hashes, side="right")
+        if not (stops > starts).any():
+            return None
+        candidate_ids = np.unique(np.concatenate([self.word_ids[start:stop] for start, stop in zip(starts, stops)]))
+        # O índice só cobre o prefixo; palavras com diferença de tamanho maior que max_distance são descartadas
+        candidate_ids = candidate_ids[np.abs(self.word_lengths[candidate_ids] - len(token)) <= self.max_distance]
+        histogram_distance = np.abs(self.histograms[candidate_ids].astype(np.int16)
+                                    - self._token_histogram(token)).sum(axis=1)
+        # Mais frequentes primeiro: dentro de uma mesma distância, o primeiro candidato aceito é o melhor
+        order = np.argsort(-self.word_frequencies[candidate_ids], kind="stable")
+        candidate_ids = candidate_ids[order]
+        histogram_distance = histogram_distance[order]
+
+        # Procura da menor para a maior distância, só entre os candidatos que o histograma permite.
+        # Como no pyspellchecker, uma palavra que só difere do token na acentuação tem preferência.
+        unaccented_token = strip_accents(token)
+        for distance in range(1, self.max_distance + 1):
+            best = None
+            for word_id in candidate_ids[histogram_distance <= 2 * distance].tolist():
+                word = self.words[word_id]
+                if osa_distance(token, word, distance) <= distance:
+                    if strip_accents(word) == unaccented_token:
+                        return word
+                    if best is None:
+                        best = word
+            if best is not None:
+                return best
+        return None
+
+    def correction(self, word):
+        """
+        Retorna a correção da palavra (em minúsculas, como o pyspellchecker), ou None quando não há
+        correção ou o token é descartado pelo filtro. O resultado fica no memo LRU.
+        """
+        token = word.lower()
+        if token in self.memo:
+            self.memo.move_to_end(token)
+            return self.memo[token]
+
+        if token in self.frequencies:
+            correction = token
+        elif self.is_hopeless(token):
+            correction = None
+        else:
+            correction = self.lookup(token)
+
+        self.memo[token] = correction
+        if len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return correction
@@ -1,19 +1,27 @@
+import logging
+import multiprocessing
 import tkinter as tk
 from PIL import Image, ImageTk
-from tesseract_config import TesseractConfig
-from gui import PDFAnalyzerGUI
+# A configuração do Tesseract e a interface principal são importadas só ao iniciar a análise,
+# para que a tela inicial apareça sem esperar pelas bibliotecas pesadas
 
 # Caminho para a imagem de fundo
 image_path = 'img/logo.webp'
 
 def configurar_tesseract():
+    from tesseract_config import TesseractConfig
     # Configuração do Tesseract OCR
     tessdata_prefix = r'C:/Program Files/Tesseract-OCR/tessdata/'
     tesseract_cmd = r'C:/Program Files/Tesseract-OCR/tesseract.exe'
     tesseract_config = TesseractConfig(tessdata_prefix, tesseract_cmd)
     tesseract_config.test_setup()
 
-def iniciar_interface_principal():
+def criar_tela_inicial():
+    """
+    Cria a tela inicial, sem iniciar o loop da interface gráfica.
+    Retorna:
+        root (tk.Tk), ou None se a imagem de fundo não puder ser carregada.
+    """
     # Criando a janela principal
     print("Iniciando a criação da janela principal")
     root = tk.Tk()
@@ -41,10 +49,12 @@ def iniciar_interface_principal():
         print("Imagem de fundo carregada com sucesso.")
     except Exception as e:
         print(f"Erro ao carregar a imagem de fundo: {e}")
-        return
+        root.destroy()
+        return None
 
     # Rótulo para a imagem de fundo
     background_label = tk.Label(root, image=bg_image)
+    background_label.image = bg_image  # Mantém a referência da imagem enquanto a janela existir
     background_label.place(relwidth=1, relheight=1)
 
     # Nome da aplicação no centro
@@ -56,6 +66,7 @@ def iniciar_interface_principal():
         print("Botão Iniciar Análise pressionado")
         root.destroy()
         configurar_tesseract()
+        from gui import PDFAnalyzerGUI
         PDFAnalyzerGUI()
         print("Interface principal do PDFAnalyzerGUI iniciada.")
 
@@ -66,6 +77,12 @@ def iniciar_interface_principal():
     # Direitos autorais no final da tela
     copyright_label = tk.Label(root, text="Direitos Autorais © Wayster Cruz de Melo", font=("Helvetica", 12, "italic"), fg="#FFFFFF", bg="#1C2833", padx=5, pady=5)
     copyright_label.place(relx=0.01, rely=0.95, anchor='w')
+    return root
+
+def iniciar_interface_principal():
+    root = criar_tela_inicial()
+    if root is None:
+        return
 
     # Inicia o loop da interface gráfica
     print("Iniciando o loop da interface gráfica")
@@ -73,4 +90,7 @@ def iniciar_interface_principal():
 
 if __name__ == "__main__":
     print("Executando tela_inicial.py como script principal")
+    multiprocessing.freeze_support()  # Necessário para o pool de processos em executáveis congelados no Windows
+    # Mensagens por página ficam no nível DEBUG e não aparecem por padrão
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     iniciar_interface_principal()
\ No newline at end of file
@@ -2,7 +2,6 @@
 import os
 import sys
 import pytesseract
-from tkinter import messagebox
 
 class TesseractConfig:
     def __init__(self, tessdata_path, tesseract_cmd):
@@ -15,6 +14,8 @@ class TesseractConfig:
         pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
 
     def test_setup(self):
+        # Importado aqui para que a configuração do Tesseract possa ser usada sem interface gráfica
+        from tkinter import messagebox
         try:
             print("Verificando a configuração do Tesseract OCR...")
             tessdata_prefix_env = os.environ.get('TESSDATA_PREFIX')
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+
+class TextRegionDetector:
+    def __init__(self, min_height=4, max_height_ratio=0.3, min_width=3, min_density=0.05, max_density=0.85,
+                 speckle_area=3, merge_kernel=(9, 3), padding=6):
+        """
+        Detecta regiões com aparência de texto (palavras, linhas, carimbos, números de página) na página
+        binarizada, por componentes conexos, para que o OCR rode apenas sobre esses recortes.
+
+        Args:
+            min_height (int): Altura mínima, em pixels, de uma região de texto (abaixo disso é poeira ou traço).
+            max_height_ratio (float): Altura máxima de uma região em relação à altura da página.
+            min_width (int): Largura mínima, em pixels, de uma região de texto.
+            min_density (float): Proporção mínima de tinta na caixa da região (abaixo disso são linhas finas
+                e contornos, como réguas e bordas do scanner).
+            max_density (float): Proporção máxima de tinta na caixa (acima disso são manchas e blocos sólidos).
+            speckle_area (int): Componentes com até esse número de pixels são descartados antes do agrupamento.
+            merge_kernel (tuple): Elemento estruturante (largura, altura) que une letras em palavras e linhas.
+            padding (int): Margem branca, em pixels, adicionada em volta de cada recorte enviado ao OCR.
+        """
+        self.min_height = min_height
+        self.max_height_ratio = max_height_ratio
+        self.min_width = min_width
+        self.min_density = min_density
+        self.max_density = max_density
+        self.speckle_area = speckle_area
+        self.merge_kernel = merge_kernel
+        self.padding = padding
+
+    def signature(self):
+        """
+        Identifica os parâmetros do detector (entra na chave do cache de vereditos).
+        """
+        return "|".join(str(value) for value in (
+            self.min_height, self.max_height_ratio, self.min_width, self.min_density, self.max_density,
+            self.speckle_area, self.merge_kernel, self.padding,
+        ))
+
+    def detect(self, binary_image):
+        """
+        Args:
+            binary_image (np.ndarray): Página binarizada (tinta 0, papel 255), saída do pré-processamento do OCR.
+        Retorna:
+            lista de caixas (x, y, largura, altura) já com a margem, sem sobreposição, em ordem de leitura.
+        """
+        height, width = binary_image.shape[:2]
+        ink = (binary_image == 0).astype(np.uint8)
+        if not ink.any():
+            return []
+
+        # Remove a poeira antes de agrupar, para que pontos isolados não se unam ao texto
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        speckles = stats[:, cv2.CC_STAT_AREA] <= self.speckle_area
+        speckles[0] = True
+        ink[speckles[labels]] = 0
+
+        # Une letras vizinhas em palavras e linhas
+        merged = cv2.dilate(ink, np.ones(self.merge_kernel[::-1], np.uint8))
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(merged, connectivity=8)
+        x, y, w, h = (stats[1:, index] for index in (cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP,
+                                                     cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT))
+
+        # Proporção de tinta (da imagem original, não da dilatada) dentro de cada caixa, pela imagem integral
+        integral = cv2.integral(ink)
+        ink_area = integral[y + h, x + w] - integral[y, x + w] - integral[y + h, x] + integral[y, x]
+        density = ink_area / (w * h)
+
+        text_like = ((h >= self.min_height) & (h <= height * self.max_height_ratio) & (w >= self.min_width)
+                     & (density >= self.min_density) & (density <= self.max_density))
+        if not text_like.any():
+            return []
+
+        # Caixas com margem; as que se sobrepõem depois da margem são unidas em um único recorte
+        mask = np.zeros((height, width), np.uint8)
+        for left, top, box_width, box_height in zip(x[text_like], y[text_like], w[text_like], h[text_like]):
+            cv2.rectangle(mask, (max(0, int(left) - self.padding), max(0, int(top) - self.padding)),
+                          (min(width, int(left + box_width) + self.padding) - 1,
+                           min(height, int(top + box_height) + self.padding) - 1), 1, thickness=-1)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+        boxes = [tuple(int(value) for value in stats[index, :4]) for index in range(1, count)]
+        return sorted(boxes, key=lambda box: (box[1], box[0]))
+
+    @staticmethod
+    def crops(binary_image, boxes):
+        """
+        Recorta as regiões da imagem binarizada para o OCR.
+        """
+        return [binary_image[top:top + box_height, left:left + box_width] for left, top, box_width, box_height in boxes]
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Local padrão do cache, compartilhado entre execuções e diretórios analisados
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".blank_analyzer", "verdict_cache.sqlite3")
+
+
+def page_digest(page):
+    """
+    Calcula um digest do conteúdo da página (fitz.Page) sem renderizá-la: dimensões, rotação,
+    stream de conteúdo e os streams brutos das imagens e XObjects de formulário usados por ela.
+    Fontes não entram no digest; duas páginas que só diferem na fonte embutida colidem.
+    """
+    pdf_document = page.parent
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(pdf_document.xref_stream_raw(image[0]) or b"")
+    for xobject in page.get_xobjects():
+        digest.update(pdf_document.xref_stream_raw(xobject[0]) or b"")
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=200000):
+        """
+        Cache persistente (SQLite) de vereditos de página, endereçado pelo conteúdo.
+
+        Args:
+            path (str): Caminho do arquivo SQLite.
+            max_entries (int): Número máximo de entradas; as menos usadas recentemente são descartadas.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_eviction = 0
+
+        dir_path = os.path.dirname(path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+        # Vários workers podem usar o mesmo arquivo; o WAL permite leituras concorrentes à escrita.
+        # Dentro de um worker, a consulta (etapa de renderização) e a gravação (etapa de análise) rodam
+        # em threads diferentes e compartilham a conexão, protegida por _lock
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY, status TEXT, white_pixel_percentage REAL, ocr_performed INTEGER,"
+            " extracted_text TEXT, details TEXT, last_used REAL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts (last_used)")
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(content_digest, signature):
+        """
+        Combina o digest da página com a assinatura dos parâmetros do analisador.
+        """
+        return hashlib.blake2b(f"{content_digest}|{signature}".encode(), digest_size=20).hexdigest()
+
+    def get(self, key):
+        """
+        Retorna:
+            (status, white_pixel_percentage, ocr_performed, extracted_text, details) ou None.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT status, white_pixel_percentage, ocr_performed, extracted_text, details FROM verdicts"
+                " WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.connection:
+                self.connection.execute("UPDATE verdicts SET last_used = ? WHERE key = ?", (time.time(), key))
+        status, white_pixel_percentage, ocr_performed, extracted_text, details = row
+        return status, white_pixel_percentage, bool(ocr_performed), extracted_text, json.loads(details)
+
+    def put(self, key, status, white_pixel_percentage, ocr_performed, extracted_text, details):
+        # white_pixel_percentage é None (NULL) nas páginas decididas pela triagem em baixa resolução
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, status, white_pixel_percentage, int(ocr_performed), extracted_text,
+                 json.dumps(details), time.time()))
+        # Verifica o tamanho só de tempos em tempos para não contar a tabela a cada página
+        self._puts_since_eviction += 1
+        if self._puts_since_eviction >= 1000:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove as entradas menos usadas recentemente acima de max_entries.
+        """
+        self._puts_since_eviction = 0
+        with self._lock:
+            count = self.connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                with self.connection:
+                    self.connection.execute(
+                        "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts ORDER BY last_used LIMIT ?)",
+                        (excess,))
+
+    def close(self):
+        self.evict()
+        self.connection.close()
@@ -0,0 +1,129 @@
+from tkinter import Frame, Listbox, ttk
+from tkinter import font as tkfont
+
+
+class VirtualList(Frame):
+    def __init__(self, master, fetch_rows, on_select=None, **listbox_options):
+        """
+        Lista virtualizada: só as linhas visíveis existem no Listbox; as demais são buscadas sob demanda
+        ao rolar. O custo de abrir e de rolar não depende da quantidade total de linhas.
+
+        Args:
+            master: Widget pai.
+            fetch_rows (callable): fetch_rows(offset, limit) -> lista de (texto, cor de fundo ou "")
+                das linhas offset .. offset + limit - 1.
+            on_select (callable): Chamado sem argumentos quando a seleção muda.
+            listbox_options: Opções repassadas ao Listbox (width, height, ...).
+        """
+        super().__init__(master)
+        self.fetch_rows = fetch_rows
+        self.on_select = on_select
+        self.total = 0
+        self.offset = 0
+        self.selected = set()  # Índices absolutos selecionados
+        self.active = None  # Último índice selecionado, usado na navegação pelo teclado
+
+        self.listbox = Listbox(self, selectmode='extended', exportselection=False, activestyle='none',
+                               **listbox_options)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.listbox.pack(side='left', fill='both', expand=True)
+        self.visible_rows = int(self.listbox.cget('height'))
+        self.line_height = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+
+        self.listbox.bind('<<ListboxSelect>>', self._on_listbox_select)
+        self.listbox.bind('<Configure>', self._on_configure)
+        self.listbox.bind('<MouseWheel>', self._on_mousewheel)
+        self.listbox.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.listbox.bind('<Button-5>', lambda event: self.scroll(3))
+        self.listbox.bind('<Up>', lambda event: self._step(-1))
+        self.listbox.bind('<Down>', lambda event: self._step(1))
+
+    def set_total(self, total):
+        # Atualiza a quantidade de linhas (por exemplo, depois de excluir páginas) e redesenha
+        self.total = total
+        self.selected = {index for index in self.selected if index < total}
+        if self.active is not None and self.active >= total:
+            self.active = total - 1 if total else None
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        self.refresh()
+
+    def selection(self):
+        return sorted(self.selected)
+
+    def clear_selection(self):
+        self.selected = set()
+        self.active = None
+        self.listbox.selection_clear(0, 'end')
+
+    def select(self, index):
+        # Seleciona só a linha `index`, rolando até ela se necessário
+        self.selected = {index}
+        self.active = index
+        self.see(index)
+        if self.on_select:
+            self.on_select()
+
+    def see(self, index):
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.visible_rows:
+            self.offset = index - self.visible_rows + 1
+        self.refresh()
+
+    def scroll(self, rows):
+        self.offset = max(0, min(self.offset + rows, self.total - self.visible_rows))
+        self.refresh()
+        return "break"
+
+    def refresh(self):
+        # Materializa só as linhas visíveis
+        rows = self.fetch_rows(self.offset, self.visible_rows) if self.total else []
+        self.listbox.delete(0, 'end')
+        for position, (text, background) in enumerate(rows):
+            self.listbox.insert('end', text)
+            if background:
+                self.listbox.itemconfig(position, background=background)
+            if self.offset + position in self.selected:
+                self.listbox.selection_set(position)
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + self.visible_rows) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_listbox_select(self, event):
+        # Troca a seleção da janela visível pela seleção atual do Listbox
+        window = range(self.offset, self.offset + self.listbox.size())
+        current = {self.offset + position for position in self.listbox.curselection()}
+        newly_selected = current - self.selected
+        self.selected = {index for index in self.selected if index not in window} | current
+        if newly_selected:
+            self.active = max(newly_selected)
+        elif current:
+            self.active = max(current)
+        if self.on_select:
+            self.on_select()
+
+    def _on_configure(self, event):
+        visible_rows = max(1, event.height // self.line_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.offset = max(0, min(self.offset, self.total - self.visible_rows))
+            self.refresh()
+
+    def _on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.offset = max(0, min(int(float(amount) * self.total), self.total - self.visible_rows))
+            self.refresh()
+        elif action == 'scroll':
+            self.scroll(int(amount) * (self.visible_rows if unit == 'pages' else 1))
+
+    def _step(self, delta):
+        # Setas do teclado: seleciona a linha anterior ou a próxima, rolando a lista se necessário
+        if self.total:
+            current = self.active if self.active is not None else self.offset - delta
+            self.select(max(0, min(current + delta, self.total - 1)))
+        return "break"
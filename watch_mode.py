@@ -0,0 +1,655 @@
+"""
+Modo de pasta monitorada: cada PDF é analisado assim que termina de chegar na pasta (por exemplo, a pasta
+compartilhada onde os scanners gravam) e o resultado entra no relatório do dia, sem intervenção manual.
+
+Uso:
+    python watch_mode.py /mnt/scanner [--output /mnt/relatorios] [--workers N] [--report-format xlsx sqlite]
+
+A detecção usa o inotify (Linux) quando disponível, com uma varredura de segurança a cada
+--rescan-interval segundos (o inotify não vê arquivos gravados por outras máquinas em compartilhamentos
+de rede); nos demais sistemas, a pasta é varrida a cada --poll-interval segundos. Um arquivo está
+completo quando o tamanho e a data de modificação param de mudar e o PyMuPDF o abre sem precisar
+repará-lo (um PDF ainda incompleto não tem a tabela xref do final).
+
+O resultado de cada arquivo é acrescentado (com fsync) ao log do dia, watch_log_AAAAMMDD.jsonl. A cada
+--report-interval segundos, as linhas novas do log são acrescentadas ao relatório do dia,
+analysis_report_AAAAMMDD_watch (.sqlite3, .csv); os formatos que só podem ser gravados inteiros (.xlsx,
+.parquet) são regenerados a partir do log a cada --rebuild-interval segundos, na virada do dia e ao
+parar. Um arquivo é identificado pelo nome, tamanho e data de modificação: o que já está no log não é
+analisado de novo enquanto não mudar, e um arquivo novo com o nome de um já analisado (scanners
+reutilizam nomes) ou regravado no lugar é analisado. Ao iniciar, só os logs dos últimos --lookback-days
+dias são lidos.
+"""
+import argparse
+import asyncio
+import csv
+import ctypes
+import ctypes.util
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from cli import add_analyzer_options, analyzer_kwargs_from_args
+from metrics import Metrics
+from report_generator import MACHINE_FIELDS, REPORT_SINKS, ReportGenerator, report_row
+from results_store import append_pending, build_indexes, create_schema
+from verdict_cache import DEFAULT_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Prefixo dos logs diários, no diretório de saída
+WATCH_LOG_PREFIX = "watch_log_"
+
+# Intervalo entre as verificações de que um arquivo parou de mudar (s)
+DEFAULT_SETTLE_SECONDS = 0.5
+# Tempo (s) que um arquivo estável, mas que o PyMuPDF não abre, continua sendo verificado
+DEFAULT_SETTLE_TIMEOUT = 60.0
+# Varredura da pasta sem inotify (s)
+DEFAULT_POLL_INTERVAL = 1.0
+# Varredura de segurança com inotify (s)
+DEFAULT_RESCAN_INTERVAL = 30.0
+# Intervalo mínimo entre duas atualizações do relatório do dia (s)
+DEFAULT_REPORT_INTERVAL = 30.0
+# Intervalo mínimo entre duas regenerações dos formatos gravados inteiros (xlsx, Parquet) (s)
+DEFAULT_REBUILD_INTERVAL = 600.0
+# Formatos do relatório do dia que recebem só as linhas novas do log
+APPENDABLE_FORMATS = ("csv", "sqlite")
+# Dias de logs (incluindo hoje) lidos ao iniciar, para não analisar de novo os arquivos já analisados
+DEFAULT_LOOKBACK_DAYS = 2
+
+# Constantes do inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# Cabeçalho de struct inotify_event: wd, mask, cookie, len (seguido do nome, com len bytes)
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _in_thread(function, *args):
+    # Executa uma chamada bloqueante (disco, análise) fora do loop; equivale a asyncio.to_thread (Python 3.9+)
+    return asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+def watch_log_path(output_dir, day):
+    return os.path.join(output_dir, f"{WATCH_LOG_PREFIX}{day}.jsonl")
+
+
+def daily_report_path(output_dir, day):
+    return os.path.join(output_dir, f"analysis_report_{day}_watch.xlsx")
+
+
+def list_pdf_files(directory):
+    """
+    Retorna:
+        lista de (nome, (tamanho, mtime)) dos PDFs do diretório
+    """
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith('.pdf') and entry.is_file():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((entry.name, (stat.st_size, stat.st_mtime)))
+    return files
+
+
+def is_complete_pdf(pdf_path):
+    """
+    Verifica se o PDF já pode ser analisado: abre sem reparo e tem ao menos uma página.
+    """
+    import fitz
+
+    try:
+        with fitz.open(pdf_path) as pdf_document:
+            return pdf_document.page_count > 0 and not pdf_document.is_repaired
+    except Exception:
+        return False
+
+
+def read_watch_log(log_path):
+    """
+    Gera as entradas (uma por arquivo) de um log diário, ignorando uma última linha truncada.
+    """
+    with open(log_path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning("Linha incompleta ignorada em %s", log_path)
+
+
+def build_daily_report(log_path, report_path, formats):
+    # Regenera o relatório do dia a partir do log, na ordem de chegada dos arquivos
+    report_generator = ReportGenerator(formats=formats)
+    for entry in read_watch_log(log_path):
+        for page_num, status, white_pixel_percentage, ocr_performed, extracted_text, details in entry["records"]:
+            report_generator.add_record(entry["pdf_name"], page_num, status, white_pixel_percentage,
+                                        ocr_performed, extracted_text, details)
+    report_generator.finalize(report_path)
+
+
+class DailyReport:
+    def __init__(self, output_dir, day, formats):
+        """
+        Relatório de um dia do monitoramento. Os formatos de APPENDABLE_FORMATS ficam abertos e, em
+        update, recebem só as linhas do log gravadas desde a última atualização; os demais são
+        regenerados do log inteiro em rebuild. Ao abrir, os arquivos incrementais são recriados a partir
+        do início do log, para incluir o que foi analisado antes de reiniciar o monitoramento.
+
+        Args:
+            output_dir (str): Diretório dos logs e relatórios diários.
+            day (str): Dia (AAAAMMDD).
+            formats (tuple): Formatos do relatório (chaves de REPORT_SINKS).
+        """
+        self.log_path = watch_log_path(output_dir, day)
+        self.report_path = daily_report_path(output_dir, day)
+        self.full_formats = [report_format for report_format in formats if report_format not in APPENDABLE_FORMATS]
+        self.stale = False  # Linhas novas ainda fora dos formatos gravados inteiros
+        self.offset = 0  # Posição do log até a qual as linhas já estão nos arquivos incrementais
+        base_path = os.path.splitext(self.report_path)[0]
+        self.csv_file = self.csv_writer = self.connection = None
+        if "csv" in formats:
+            self.csv_file = open(base_path + ".csv", "w", encoding="utf-8", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(MACHINE_FIELDS)
+        if "sqlite" in formats:
+            sqlite_path = base_path + ".sqlite3"
+            if os.path.exists(sqlite_path):
+                os.remove(sqlite_path)
+            self.connection = sqlite3.connect(sqlite_path, check_same_thread=False)
+            with self.connection:
+                create_schema(self.connection, MACHINE_FIELDS)
+                build_indexes(self.connection)
+        self.insert = f"INSERT INTO pages VALUES ({', '.join('?' * len(MACHINE_FIELDS))})"
+
+    def update(self):
+        # Lê só as linhas completas gravadas depois de offset; uma última linha ainda incompleta fica para a próxima
+        with open(self.log_path, "rb") as file:
+            file.seek(self.offset)
+            data = file.read()
+        data = data[:data.rfind(b"\n") + 1]
+        if not data:
+            return
+        self.offset += len(data)
+        self.stale = True
+        records = []
+        for line in data.decode("utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning("Linha inválida ignorada em %s", self.log_path)
+                continue
+            for page_num, status, white_pixel_percentage, ocr_performed, extracted_text, details in entry["records"]:
+                records.append(report_row(entry["pdf_name"], page_num, status, white_pixel_percentage,
+                                          ocr_performed, extracted_text, details)[1])
+        if self.csv_writer is not None:
+            self.csv_writer.writerows(records)
+            self.csv_file.flush()
+        if self.connection is not None:
+            with self.connection:
+                first_rowid = self.connection.execute("SELECT COALESCE(MAX(rowid), 0) + 1 FROM pages").fetchone()[0]
+                self.connection.executemany(self.insert, records)
+                append_pending(self.connection, first_rowid)
+
+    def rebuild(self):
+        if self.stale and self.full_formats:
+            build_daily_report(self.log_path, self.report_path, self.full_formats)
+        self.stale = False
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+        if self.connection is not None:
+            self.connection.close()
+
+
+class InotifyWatcher:
+    def __init__(self, directory):
+        """
+        Observa a chegada de arquivos em um diretório pelo inotify do Linux, chamado via ctypes.
+        Levanta OSError se o inotify não estiver disponível (outros sistemas, limite de watches).
+        """
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify disponível apenas no Linux")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("a libc não tem inotify_init1")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch")
+
+    def read_names(self):
+        # Nomes dos arquivos de todos os eventos pendentes; o descritor é não bloqueante
+        names = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    names.append(os.fsdecode(name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class HotFolderWatcher:
+    def __init__(self, watch_dir, output_dir=None, engine=None, formats=("xlsx", "sqlite"), use_inotify=True,
+                 settle_seconds=DEFAULT_SETTLE_SECONDS, settle_timeout=DEFAULT_SETTLE_TIMEOUT,
+                 poll_interval=DEFAULT_POLL_INTERVAL, rescan_interval=DEFAULT_RESCAN_INTERVAL,
+                 report_interval=DEFAULT_REPORT_INTERVAL, rebuild_interval=DEFAULT_REBUILD_INTERVAL,
+                 lookback_days=DEFAULT_LOOKBACK_DAYS, on_file=None, engine_kwargs=None):
+        """
+        Monitora uma pasta e analisa cada PDF novo assim que ele fica completo. A detecção, a espera
+        e o relatório rodam em um loop asyncio; a análise roda em uma thread, com o AnalysisEngine
+        iniciado uma única vez (start), e os arquivos que ficam prontos juntos são analisados juntos.
+
+        Args:
+            watch_dir (str): Pasta monitorada.
+            output_dir (str): Onde ficam os logs e os relatórios diários. None usa a própria pasta.
+            engine (AnalysisEngine): Motor de análise. None cria um no início do monitoramento, com
+                engine_kwargs (o cache de vereditos padrão, se não indicado).
+            formats (tuple): Formatos do relatório do dia (chaves de REPORT_SINKS).
+            use_inotify (bool): Usa o inotify quando disponível; False força a varredura periódica.
+            report_interval (float): Intervalo entre as atualizações do relatório do dia (s).
+            rebuild_interval (float): Intervalo entre as regenerações dos formatos que só podem ser gravados
+                inteiros (xlsx, Parquet), que também são regenerados na virada do dia e ao parar (s).
+            lookback_days (int): Dias de logs (incluindo hoje) lidos ao iniciar; os arquivos registrados
+                neles, com o mesmo tamanho e data de modificação, não são analisados de novo.
+            on_file (callable): Chamado na thread de análise com (pdf_name, lista de PageResult, latência em
+                segundos) a cada arquivo concluído.
+            engine_kwargs (dict): Parâmetros do AnalysisEngine criado quando engine é None.
+        """
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir or watch_dir
+        self.engine = engine
+        self.engine_kwargs = dict({"cache_path": DEFAULT_CACHE_PATH, "thumbnails": False}, **(engine_kwargs or {}))
+        self.metrics = engine.metrics if engine is not None else Metrics()
+        self.formats = formats
+        self.use_inotify = use_inotify
+        self.settle_seconds = settle_seconds
+        self.settle_timeout = settle_timeout
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.report_interval = report_interval
+        self.rebuild_interval = rebuild_interval
+        self.lookback_days = lookback_days
+        self.on_file = on_file
+
+        self.files_processed = 0
+        self.pages_processed = 0
+        self.pages_blank = 0
+        self._in_progress = set()  # Nomes aguardando, na fila ou em análise
+        # (nome, tamanho, mtime) dos arquivos analisados ou com erro: ignorados enquanto não mudarem
+        self._analyzed = set()
+        self._dirty_days = set()  # Dias com arquivos novos no log
+        self._reports = {}  # Dia -> DailyReport aberto
+        self._last_rebuild = time.monotonic()
+        self._lock = threading.Lock()
+        self._report_lock = threading.Lock()
+        self._loop = None
+        self._stop = None
+        self._stop_requested = False
+
+    def stop(self):
+        # Pode ser chamado de qualquer thread (por exemplo, da interface gráfica)
+        self._stop_requested = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def run(self):
+        """
+        Monitora a pasta até stop. Ao parar, os arquivos já prontos são analisados e o relatório do
+        dia é regenerado; os que ainda estavam chegando são analisados no próximo monitoramento.
+        """
+        # O evento existe antes do loop ficar visível para stop; o pedido feito antes disso é visto aqui
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self._stop_requested:
+            self._stop.set()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._analyzed = await _in_thread(self._logged_files)
+        if self.engine is None:
+            # Importado aqui: o motor (fitz, cv2) só é carregado quando o monitoramento começa
+            from analysis_engine import AnalysisEngine
+            self.engine = AnalysisEngine(metrics=self.metrics, **self.engine_kwargs)
+        await _in_thread(self.engine.start)
+        logger.info("Monitorando %s (%d arquivos já analisados).", self.watch_dir, len(self._analyzed))
+
+        ready = asyncio.Queue()
+        analyzer = asyncio.create_task(self._analyze(ready))
+        background = [asyncio.create_task(self._detect(ready)), asyncio.create_task(self._report_periodically())]
+        try:
+            await self._stop.wait()
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            ready.put_nowait(None)
+            await analyzer
+            await _in_thread(self._flush_reports, True)
+            await _in_thread(self.engine.close)
+            logger.info("Monitoramento encerrado. %s", self.summary())
+
+    def _logged_files(self):
+        # (nome, tamanho, mtime) dos arquivos nos logs dos últimos lookback_days dias
+        files = set()
+        if self.lookback_days <= 0:
+            return files
+        first_day = (datetime.now() - timedelta(days=self.lookback_days - 1)).strftime("%Y%m%d")
+        for name in os.listdir(self.output_dir):
+            if name.startswith(WATCH_LOG_PREFIX) and name.endswith(".jsonl") and \
+                    name[len(WATCH_LOG_PREFIX):-len(".jsonl")] >= first_day:
+                for entry in read_watch_log(os.path.join(self.output_dir, name)):
+                    # Entradas de versões anteriores não têm tamanho nem mtime: o arquivo é analisado de novo
+                    if "size" in entry:
+                        files.add((entry["pdf_name"], entry["size"], entry["mtime"]))
+        return files
+
+    async def _detect(self, ready):
+        settling = set()
+
+        def found(name, state=None):
+            # state (tamanho, mtime) vem da varredura; os eventos do inotify trazem só o nome, e o arquivo
+            # já analisado é reconhecido em _settle
+            if name in self._in_progress or not name.lower().endswith('.pdf'):
+                return
+            if state is not None and (name,) + state in self._analyzed:
+                return
+            self._in_progress.add(name)
+            task = asyncio.create_task(self._settle(name, time.time(), ready))
+            settling.add(task)
+            task.add_done_callback(settling.discard)
+
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = InotifyWatcher(self.watch_dir)
+            except OSError as e:
+                logger.info("inotify indisponível (%s); a pasta será varrida a cada %.1f s.", e, self.poll_interval)
+        try:
+            if inotify:
+                self._loop.add_reader(inotify.fd, lambda: [found(name) for name in inotify.read_names()])
+            # A primeira varredura encontra os arquivos que chegaram com o monitoramento parado
+            while True:
+                for name, state in await _in_thread(list_pdf_files, self.watch_dir):
+                    found(name, state)
+                await asyncio.sleep(self.rescan_interval if inotify else self.poll_interval)
+        finally:
+            if inotify:
+                self._loop.remove_reader(inotify.fd)
+                inotify.close()
+            for task in list(settling):
+                task.cancel()
+
+    async def _settle(self, name, detected_at, ready):
+        # Espera o arquivo parar de mudar e abrir sem reparo, e o coloca na fila de análise
+        pdf_path = os.path.join(self.watch_dir, name)
+        previous = None
+        deadline = time.monotonic() + self.settle_timeout
+        while True:
+            try:
+                stat = os.stat(pdf_path)
+            except FileNotFoundError:
+                self._in_progress.discard(name)  # Removido ou renomeado antes de ficar completo
+                return
+            current = (stat.st_size, stat.st_mtime)
+            if current != previous:
+                # Ainda sendo gravado: o prazo conta a partir da última mudança
+                deadline = time.monotonic() + self.settle_timeout
+            elif (name,) + current in self._analyzed:
+                self._in_progress.discard(name)  # Evento de um arquivo já analisado, sem mudança
+                return
+            elif stat.st_size and await _in_thread(is_complete_pdf, pdf_path):
+                break
+            elif time.monotonic() > deadline:
+                logger.error("%s está estável mas não pôde ser aberto em %.0f s; ignorado até ser modificado.",
+                             name, self.settle_timeout)
+                self._finish_file(name, current)
+                return
+            previous = current
+            await asyncio.sleep(self.settle_seconds)
+        self.metrics.record("watch_settle", time.time() - detected_at, 0.0)
+        ready.put_nowait((pdf_path, detected_at, current))
+
+    async def _analyze(self, ready):
+        # Analisa juntos todos os arquivos que estiverem prontos, até receber None (parada)
+        while True:
+            batch = [await ready.get()]
+            while not ready.empty():
+                batch.append(ready.get_nowait())
+            stop = None in batch
+            batch = [item for item in batch if item is not None]
+            if batch:
+                await _in_thread(self._analyze_batch, batch)
+            if stop:
+                return
+
+    def _analyze_batch(self, batch):
+        # Um PDF com erro não derruba o lote: os arquivos não concluídos são analisados de novo, um a um,
+        # e só o que falhar sozinho fica de fora
+        remaining = self._run_batch(batch)
+        if len(batch) > 1:
+            for item in remaining:
+                self._run_batch([item])
+
+    def _run_batch(self, batch):
+        """
+        Analisa os arquivos juntos. Os resultados chegam em ordem de arquivo; cada arquivo é registrado
+        assim que a última página fica pronta.
+        Retorna:
+            itens do lote não concluídos por causa de um erro
+        """
+        finished = set()
+        try:
+            with self.metrics.stage("watch_batch"):
+                tasks, _ = self.engine.plan([pdf_path for pdf_path, _, _ in batch])
+                for file_index, results in groupby(self.engine.run(tasks), key=lambda result: result.file_index):
+                    results = list(results)
+                    # Marcado antes de registrar: um erro no registro não leva a analisar o arquivo de novo
+                    finished.add(file_index)
+                    self._file_done(*batch[file_index], results)
+        except Exception as e:
+            remaining = [item for index, item in enumerate(batch) if index not in finished]
+            if len(batch) > 1:
+                logger.warning("Erro ao analisar o lote (%s); %d arquivos serão analisados um a um.",
+                               e, len(remaining))
+            else:
+                pdf_path, _, state = batch[0]
+                logger.error("Erro ao analisar %s (ignorado até ser modificado ou até reiniciar o "
+                             "monitoramento): %s", os.path.basename(pdf_path), e)
+                self.metrics.increment("watch_errors")
+                self._finish_file(os.path.basename(pdf_path), state)
+            return remaining
+        return []
+
+    def _finish_file(self, name, state):
+        # Registra primeiro o arquivo como analisado: a varredura nunca o vê fora dos dois conjuntos
+        self._analyzed.add((name,) + state)
+        self._in_progress.discard(name)
+
+    def _file_done(self, pdf_path, detected_at, state, results):
+        from pdf_analyzer import BLANK_STATUSES
+
+        finished_at = time.time()
+        latency = finished_at - detected_at
+        pdf_name = os.path.basename(pdf_path)
+        day = datetime.fromtimestamp(finished_at).strftime("%Y%m%d")
+        records = [[result.page_num, result.status, result.white_pixel_percentage, bool(result.ocr_performed),
+                    result.extracted_text, result.details] for result in results]
+        size, mtime = state
+        entry = {"pdf_name": pdf_name, "pdf_path": os.path.abspath(pdf_path), "size": size, "mtime": mtime,
+                 "detected_at": detected_at, "finished_at": finished_at, "records": records}
+        # Uma linha por arquivo, gravada com fsync: o log é a fonte do relatório do dia
+        with open(watch_log_path(self.output_dir, day), "a", encoding="utf-8") as file:
+            file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+        pages_blank = sum(1 for result in results if result.status in BLANK_STATUSES)
+        with self._lock:
+            self.files_processed += 1
+            self.pages_processed += len(results)
+            self.pages_blank += pages_blank
+            self._dirty_days.add(day)
+        self._finish_file(pdf_name, state)
+        # Latência da chegada do arquivo ao veredito (a CPU é a dos workers, registrada nas outras etapas)
+        self.metrics.record("watch_latency", latency, 0.0)
+        self.metrics.increment("watch_files")
+        logger.info("%s: %d páginas, %d em branco, latência %.1f s", pdf_name, len(results), pages_blank, latency)
+        if self.on_file:
+            self.on_file(pdf_name, results, latency)
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            await _in_thread(self._flush_reports)
+
+    def _flush_reports(self, final=False):
+        # Acrescenta as linhas novas aos relatórios dos dias com arquivos novos, com as métricas ao lado; os
+        # formatos gravados inteiros são regenerados a cada rebuild_interval, na virada do dia e ao parar
+        with self._report_lock:
+            with self._lock:
+                days, self._dirty_days = self._dirty_days, set()
+            for day in sorted(days):
+                if day not in self._reports:
+                    self._reports[day] = DailyReport(self.output_dir, day, self.formats)
+                self._reports[day].update()
+                self.metrics.save_json(os.path.splitext(daily_report_path(self.output_dir, day))[0]
+                                       + "_metrics.json")
+            rebuild = final or time.monotonic() - self._last_rebuild >= self.rebuild_interval
+            if rebuild:
+                self._last_rebuild = time.monotonic()
+            today = datetime.now().strftime("%Y%m%d")
+            for day in sorted(self._reports):
+                report = self._reports[day]
+                if rebuild or day != today:
+                    report.rebuild()
+                if final or day != today:
+                    report.close()
+                    del self._reports[day]
+            if days:
+                logger.info(self.summary())
+
+    def summary(self):
+        """
+        Resumo do monitoramento: arquivos, páginas, vazão durante a análise e latência da chegada ao veredito.
+        """
+        stages = self.metrics.summary()["stages"]
+        busy = stages.get("watch_batch", {}).get("wall_total", 0.0)
+        latency = stages.get("watch_latency", {})
+        latency_max = latency.get("wall_max", 0.0)
+        throughput = self.pages_processed / busy if busy else 0.0
+        # Os percentis do histograma são o limite do bucket; a máxima observada é um limite melhor
+        return (f"Arquivos: {self.files_processed}, páginas: {self.pages_processed} "
+                f"({self.pages_blank} em branco), vazão: {throughput:.1f} páginas/s, "
+                f"latência p50: {min(latency.get('wall_p50', 0.0), latency_max):.1f} s, "
+                f"p95: {min(latency.get('wall_p95', 0.0), latency_max):.1f} s, máxima: {latency_max:.1f} s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Analisa continuamente os PDFs que chegam em uma pasta.")
+    parser.add_argument("directory", help="Pasta monitorada.")
+    parser.add_argument("--output", default=None,
+                        help="Diretório dos logs e relatórios diários (padrão: a própria pasta).")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Número de processos workers (padrão: todos os núcleos).")
+    parser.add_argument("--report-format", nargs="+", default=["xlsx", "sqlite"], choices=sorted(REPORT_SINKS),
+                        help="Formatos do relatório do dia (padrão: xlsx sqlite).")
+    parser.add_argument("--poll", action="store_true", help="Usa a varredura periódica mesmo com inotify.")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Intervalo da varredura sem inotify, em segundos (padrão: %(default)s).")
+    parser.add_argument("--rescan-interval", type=float, default=DEFAULT_RESCAN_INTERVAL,
+                        help="Intervalo da varredura de segurança com inotify (padrão: %(default)s).")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="Intervalo entre as verificações de que o arquivo parou de mudar, em segundos "
+                             "(padrão: %(default)s).")
+    parser.add_argument("--report-interval", type=float, default=DEFAULT_REPORT_INTERVAL,
+                        help="Intervalo mínimo entre as atualizações do relatório do dia (padrão: %(default)s).")
+    parser.add_argument("--rebuild-interval", type=float, default=DEFAULT_REBUILD_INTERVAL,
+                        help="Intervalo mínimo entre as regenerações dos formatos gravados inteiros (xlsx, "
+                             "Parquet), também regenerados na virada do dia e ao parar (padrão: %(default)s).")
+    parser.add_argument("--lookback-days", type=int, default=DEFAULT_LOOKBACK_DAYS,
+                        help="Dias de logs (incluindo hoje) lidos ao iniciar para não analisar de novo os "
+                             "arquivos já analisados (padrão: %(default)s).")
+    parser.add_argument("--tesseract-cmd", default=None, help="Caminho do executável do Tesseract.")
+    parser.add_argument("--tessdata", default=None, help="Diretório tessdata (define TESSDATA_PREFIX).")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="Arquivo do cache de vereditos (padrão: %(default)s).")
+    parser.add_argument("--no-cache", action="store_true", help="Desativa o cache de vereditos.")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Desativa o reaproveitamento do OCR de páginas quase idênticas.")
+    add_analyzer_options(parser)
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Nível de log (padrão: INFO).")
+    return parser
+
+
+async def _watch_until_signal(watcher):
+    # SIGINT/SIGTERM encerram o monitoramento de forma ordenada (onde o loop suporta sinais)
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, watcher.stop)
+        except (NotImplementedError, RuntimeError):
+            pass
+    await watcher.run()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not os.path.isdir(args.directory):
+        print(f"Pasta não encontrada: {args.directory}", file=sys.stderr)
+        return 2
+
+    from analysis_engine import AnalysisEngine
+
+    if args.tesseract_cmd:
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = args.tesseract_cmd
+    if args.tessdata:
+        os.environ['TESSDATA_PREFIX'] = args.tessdata
+
+    engine = AnalysisEngine(num_workers=args.workers, analyzer_kwargs=analyzer_kwargs_from_args(args),
+                            cache_path=None if args.no_cache else args.cache, thumbnails=False,
+                            dedup=not args.no_dedup)
+    watcher = HotFolderWatcher(args.directory, args.output, engine, formats=args.report_format,
+                               use_inotify=not args.poll, settle_seconds=args.settle, poll_interval=args.poll_interval,
+                               rescan_interval=args.rescan_interval, report_interval=args.report_interval,
+                               rebuild_interval=args.rebuild_interval, lookback_days=args.lookback_days)
+    try:
+        asyncio.run(_watch_until_signal(watcher))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Necessário para o pool de processos em executáveis congelados no Windows
+    sys.exit(main())